@@ -0,0 +1,67 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiting import RateLimitExceeded, TokenBucketLimiter
+
+# bcrypt work runs on its own small pool so a registration burst cannot take
+# every request thread; bcrypt releases the GIL, so threads use all cores
+AUTH_WORKERS = int(os.getenv('AUTH_WORKERS', str(min(4, os.cpu_count() or 1))))
+AUTH_QUEUE_MAX = int(os.getenv('AUTH_QUEUE_MAX', '64'))            # waiting + running
+
+# Login/registration throttles: per username (brute force on one account)
+# and per client address (spraying many accounts); campus NATs share an
+# address, so the address budget is the larger one
+AUTH_USER_RATE = float(os.getenv('AUTH_USER_RATE', '0.1'))         # attempts per second
+AUTH_USER_BURST = float(os.getenv('AUTH_USER_BURST', '5'))
+AUTH_IP_RATE = float(os.getenv('AUTH_IP_RATE', '5'))
+AUTH_IP_BURST = float(os.getenv('AUTH_IP_BURST', '50'))
+
+class AuthPool:
+    """Bounded executor for password hashing and verification.
+
+    run() rejects with RateLimitExceeded once max_queue calls are waiting or
+    running, so excess auth traffic is shed instead of queueing CPU work.
+    """
+
+    def __init__(self, workers=AUTH_WORKERS, max_queue=AUTH_QUEUE_MAX):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auth')
+        self._pending = 0
+        self._stats = {'completed': 0, 'rejected': 0}
+
+    async def run(self, func, *args):
+        if self._pending >= self.max_queue:
+            self._stats['rejected'] += 1
+            raise RateLimitExceeded("Too many sign-in requests, please retry shortly", retry_after=2.0)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self._stats['completed'] += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {**self._stats, 'pending': self._pending, 'workers': self.workers}
+
+class LoginThrottle:
+    """Per-username and per-address token buckets for auth attempts"""
+
+    def __init__(self):
+        message = "Too many sign-in attempts, please wait"
+        self.users = TokenBucketLimiter(AUTH_USER_RATE, AUTH_USER_BURST, message=message)
+        self.addresses = TokenBucketLimiter(AUTH_IP_RATE, AUTH_IP_BURST, message=message)
+
+    def check(self, address, username=None):
+        """Charge one attempt, or raise RateLimitExceeded"""
+        self.addresses.check(address)
+        if username:
+            self.users.check(username.strip().lower())
+
+    def stats(self):
+        return {'users': self.users.stats(), 'addresses': self.addresses.stats()}
@@ -0,0 +1,36 @@
+"""Render benchmark for the fallback templates.
+
+Usage: python bench_fallback_templates.py [iterations]
+"""
+import sys
+import timeit
+from types import SimpleNamespace
+
+import fallback_templates
+
+SAMPLE_PORTFOLIO = SimpleNamespace(
+    user_id=1,
+    name="Asha <Dev>",
+    skills=["Python", "FastAPI", "JavaScript", "SQL", "Docker", "Git"],
+    projects=[
+        {"name": f"Project {i}", "description": "A completed project & more.", "technologies": "Python, JS"}
+        for i in range(5)
+    ],
+    education={"college": "City College", "branch": "CSE", "semester": "6"},
+    contact={"bio": "Student developer.", "email": "asha@example.com",
+             "github": "https://github.com/asha", "linkedin": "https://linkedin.com/in/asha"}
+)
+SAMPLE_DETAILS = "Task manager with user accounts, reminders and a REST API. " * 20
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    cases = {
+        "portfolio": lambda: fallback_templates.render_fallback_portfolio(SAMPLE_PORTFOLIO),
+        "documentation": lambda: fallback_templates.render_fallback_documentation(SAMPLE_DETAILS),
+    }
+    for name, render in cases.items():
+        seconds = min(timeit.repeat(render, number=iterations, repeat=3))
+        print(f"{name:<14} {seconds / iterations * 1e6:8.1f} µs/render  ({len(render())} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,150 @@ import bcrypt
 from datetime import datetime
 import os
 import json
+import time
+from db_pool import ConnectionPool
+from write_behind import WRITE_BEHIND_ENABLED, WriteBehindBuffer
 
-# Initialize database connection
+DB_PATH = os.getenv('DB_PATH', 'project_assistant.db')
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# bcrypt work factor for new hashes; older hashes are upgraded on login
+AUTH_BCRYPT_ROUNDS = int(os.getenv('AUTH_BCRYPT_ROUNDS', '12'))
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30'))
+
+# PRAGMA profiles. "database" settings are persisted in the file and applied
+# once by init_db(); "connection" settings are applied to every pooled connection.
+PRAGMA_PROFILES = {
+    'wal': {
+        'database': {
+            'journal_mode': 'WAL',
+            'wal_autocheckpoint': 1000,      # pages (~4 MB) between automatic checkpoints
+            'journal_size_limit': 67108864,  # truncate the WAL back to 64 MB after checkpoints
+        },
+        'connection': {
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -16000,            # KiB (~16 MB page cache per connection)
+            'mmap_size': 268435456,          # 256 MB
+            'temp_store': 'MEMORY',
+        },
+    },
+    'durable': {
+        'database': {
+            'journal_mode': 'WAL',
+            'wal_autocheckpoint': 1000,
+            'journal_size_limit': 67108864,
+        },
+        'connection': {
+            'synchronous': 'FULL',
+            'busy_timeout': 5000,
+            'cache_size': -16000,
+            'temp_store': 'MEMORY',
+        },
+    },
+    'legacy': {
+        'database': {
+            'journal_mode': 'DELETE',
+        },
+        'connection': {
+            'busy_timeout': 5000,
+        },
+    },
+}
+
+DB_PRAGMA_PROFILE = os.getenv('DB_PRAGMA_PROFILE', 'wal')
+
+# WAL checkpoint mode used on shutdown (PASSIVE, FULL, RESTART or TRUNCATE)
+DB_CHECKPOINT_MODE = os.getenv('DB_CHECKPOINT_MODE', 'TRUNCATE').upper()
+
+def get_pragma_profile():
+    """Return the active PRAGMA profile"""
+    return PRAGMA_PROFILES.get(DB_PRAGMA_PROFILE, PRAGMA_PROFILES['wal'])
+
+def _apply_pragmas(conn, pragmas):
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+def _init_connection(conn):
+    """Apply per-connection settings to a freshly opened connection"""
+    _apply_pragmas(conn, get_pragma_profile()['connection'])
+
+_pool = ConnectionPool(
+    DB_PATH,
+    max_size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+    on_connect=_init_connection
+)
+
+# Borrow a connection from the pool
 def get_connection():
-    """Get database connection"""
+    """Get database connection (close() returns it to the pool)"""
     try:
-        conn = sqlite3.connect('project_assistant.db', check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        return conn
+        return _pool.acquire()
     except sqlite3.Error as e:
         print(f"❌ Database connection error: {e}")
         return None
 
+# Small per-click writes (complete_exercise, add_project_history) are
+# group-committed by one background thread; see write_behind.py
+_write_buffer = WriteBehindBuffer(get_connection)
+
+def _write(op, *args, wait):
+    """Run op(cursor, *args) through the write buffer, or in its own transaction when disabled"""
+    if WRITE_BEHIND_ENABLED:
+        return _write_buffer.submit(op, *args, wait=wait)
+
+    conn = get_connection()
+    if not conn:
+        raise sqlite3.OperationalError("No database connection")
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        result = op(c, *args)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def flush_writes():
+    """Commit queued writes and stop buffering (call on shutdown)"""
+    _write_buffer.close()
+
+def write_buffer_stats():
+    return {**_write_buffer.stats(), 'enabled': WRITE_BEHIND_ENABLED}
+
+def close_pool():
+    """Close all pooled connections (call on shutdown)"""
+    flush_writes()
+    _pool.close_all()
+
+def checkpoint_wal(mode=None):
+    """Run a WAL checkpoint, returning (busy, log_pages, checkpointed_pages)"""
+    mode = (mode or DB_CHECKPOINT_MODE).upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        mode = 'PASSIVE'
+
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        row = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        return tuple(row) if row else None
+    except sqlite3.Error as e:
+        print(f"❌ WAL checkpoint error: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Initialize database tables
 def init_db():
     """Initialize database tables"""
@@ -26,6 +158,11 @@ def init_db():
     try:
         c = conn.cursor()
         
+        # Database-wide settings (journal mode etc.) persist in the file
+        _apply_pragmas(conn, get_pragma_profile()['database'])
+        journal_mode = c.execute("PRAGMA journal_mode").fetchone()[0]
+        print(f"🔧 Journal mode: {journal_mode} (profile: {DB_PRAGMA_PROFILE})")
+        
         # Users table with hashed passwords
         c.execute('''CREATE TABLE IF NOT EXISTS users
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -93,7 +230,8 @@ def init_db():
         
         conn.commit()
         print("✅ Database tables created/verified")
-        return True
+        
+        return run_migrations(conn)
         
     except sqlite3.Error as e:
         print(f"❌ Database initialization error: {e}")
@@ -101,11 +239,86 @@ def init_db():
     finally:
         conn.close()
 
+# Schema migrations
+def _list_migrations():
+    """Return [(version, name, path)] for every migration file, in order"""
+    migrations = []
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return migrations
+
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.sql'):
+            continue
+        prefix = filename.split('_', 1)[0]
+        if not prefix.isdigit():
+            continue
+        migrations.append((int(prefix), filename[:-4], os.path.join(MIGRATIONS_DIR, filename)))
+
+    return migrations
+
+def _split_sql(sql):
+    """Split a migration script into complete statements"""
+    statements = []
+    buffer = ''
+    for line in sql.splitlines(keepends=True):
+        if line.strip().startswith('--'):
+            continue
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ''
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+def get_schema_version(conn):
+    """Get the highest applied migration version"""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def run_migrations(conn):
+    """Apply pending migrations from MIGRATIONS_DIR, each in its own transaction"""
+    try:
+        conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                        (version INTEGER PRIMARY KEY,
+                         name TEXT NOT NULL,
+                         applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        conn.commit()
+
+        for version, name, path in _list_migrations():
+            # BEGIN IMMEDIATE serializes workers that start up together;
+            # the version is re-checked once the write lock is held.
+            conn.execute("BEGIN IMMEDIATE")
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+
+            with open(path, encoding='utf-8') as f:
+                statements = _split_sql(f.read())
+
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                             (version, name))
+                conn.commit()
+                print(f"✅ Applied migration {name}")
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        print(f"✅ Schema at version {get_schema_version(conn)}")
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Migration error: {e}")
+        return False
+
 # Password utilities
 def hash_password(password):
-    """Hash password using bcrypt"""
+    """Hash password using bcrypt (AUTH_BCRYPT_ROUNDS)"""
     try:
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=AUTH_BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     except Exception as e:
@@ -122,6 +335,13 @@ def verify_password(password, hashed_password):
         print(f"❌ Password verification error: {e}")
         return False
 
+def password_needs_rehash(hashed_password):
+    """True when a hash ($2b$<rounds>$...) was made with a different work factor"""
+    try:
+        return int(hashed_password.split('$')[2]) != AUTH_BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
 # User operations
 def create_user(username, password, email=None):
     """Create a new user"""
@@ -131,6 +351,12 @@ def create_user(username, password, email=None):
         print("❌ Username and password required")
         return None
     
+    # Hash password first: no pooled connection is held during bcrypt
+    password_hash = hash_password(password)
+    if not password_hash:
+        print("❌ Failed to hash password")
+        return None
+    
     conn = get_connection()
     if not conn:
         return None
@@ -138,28 +364,20 @@ def create_user(username, password, email=None):
     try:
         c = conn.cursor()
         
-        # Check if user already exists
-        c.execute("SELECT id FROM users WHERE username = ?", (username,))
-        existing_user = c.fetchone()
+        # One statement: username is UNIQUE, so a taken name returns no row
+        row = c.execute(
+            """INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)
+               ON CONFLICT(username) DO NOTHING
+               RETURNING id""",
+            (username, password_hash, email)
+        ).fetchone()
+        conn.commit()
         
-        if existing_user:
+        if not row:
             print(f"⚠️ User '{username}' already exists")
             return None
         
-        # Hash password
-        password_hash = hash_password(password)
-        if not password_hash:
-            print("❌ Failed to hash password")
-            return None
-        
-        # Insert new user
-        c.execute(
-            "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
-            (username, password_hash, email)
-        )
-        conn.commit()
-        
-        user_id = c.lastrowid
+        user_id = row['id']
         print(f"✅ User '{username}' created with ID: {user_id}")
         return user_id
         
@@ -190,27 +408,51 @@ def authenticate_user(username, password):
             (username,)
         )
         user_data = c.fetchone()
-        
-        if not user_data:
-            print(f"❌ User '{username}' not found")
-            return None
-        
-        user_id = user_data['id']
-        stored_hash = user_data['password_hash']
-        
-        # Verify password
-        if verify_password(password, stored_hash):
-            print(f"✅ Authentication successful for user '{username}'")
-            return user_id
-        else:
-            print(f"❌ Invalid password for user '{username}'")
-            return None
             
     except sqlite3.Error as e:
         print(f"❌ Database authentication error: {e}")
         return None
     finally:
         conn.close()
+    
+    if not user_data:
+        print(f"❌ User '{username}' not found")
+        return None
+    
+    user_id = user_data['id']
+    stored_hash = user_data['password_hash']
+    
+    # Verify password (connection already returned to the pool)
+    if not verify_password(password, stored_hash):
+        print(f"❌ Invalid password for user '{username}'")
+        return None
+    
+    print(f"✅ Authentication successful for user '{username}'")
+    if password_needs_rehash(stored_hash):
+        rehash_password(user_id, password, stored_hash)
+    return user_id
+
+def rehash_password(user_id, password, old_hash):
+    """Store a hash at the current work factor, unless the password changed meanwhile"""
+    new_hash = hash_password(password)
+    if not new_hash:
+        return False
+    
+    conn = get_connection()
+    if not conn:
+        return False
+    
+    try:
+        conn.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                     (new_hash, user_id, old_hash))
+        conn.commit()
+        print(f"🔐 Rehashed password for user_id {user_id} at cost {AUTH_BCRYPT_ROUNDS}")
+        return True
+    except sqlite3.Error as e:
+        print(f"❌ Error rehashing password: {e}")
+        return False
+    finally:
+        conn.close()
 
 def get_user_by_id(user_id):
     """Get user by ID"""
@@ -229,6 +471,115 @@ def get_user_by_id(user_id):
     finally:
         conn.close()
 
+# Session refresh tokens (see session_tokens.py)
+def _session_skill_level(c, user_id):
+    row = c.execute("SELECT skill_level FROM student_profiles WHERE user_id = ?", (user_id,)).fetchone()
+    return row['skill_level'] if row else None
+
+def open_session(user_id, token_hash, expires_at):
+    """Store a new refresh token; returns {'skill_level'} for the access token, or None"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        c = conn.cursor()
+        # Drop this user's dead tokens while we are writing anyway
+        c.execute("DELETE FROM refresh_tokens WHERE user_id = ? AND (revoked = 1 OR expires_at <= ?)",
+                  (user_id, time.time()))
+        c.execute('''INSERT INTO refresh_tokens (token_hash, user_id, expires_at, created_at)
+                     VALUES (?, ?, ?, ?)''',
+                  (token_hash, user_id, expires_at, time.time()))
+        skill_level = _session_skill_level(c, user_id)
+        conn.commit()
+        return {'skill_level': skill_level}
+
+    except sqlite3.Error as e:
+        print(f"❌ Error opening session: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+def rotate_refresh_token(old_hash, new_hash, expires_at):
+    """Spend a valid refresh token and store its replacement in one transaction.
+
+    Returns {'user_id', 'skill_level'}, or None when the old token is unknown,
+    expired or already used.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        c = conn.cursor()
+        now = time.time()
+        c.execute('''UPDATE refresh_tokens SET revoked = 1
+                     WHERE token_hash = ? AND revoked = 0 AND expires_at > ?''',
+                  (old_hash, now))
+        if c.rowcount != 1:
+            conn.rollback()
+            return None
+
+        user_id = c.execute("SELECT user_id FROM refresh_tokens WHERE token_hash = ?",
+                            (old_hash,)).fetchone()['user_id']
+        c.execute('''INSERT INTO refresh_tokens (token_hash, user_id, expires_at, created_at)
+                     VALUES (?, ?, ?, ?)''',
+                  (new_hash, user_id, expires_at, now))
+        skill_level = _session_skill_level(c, user_id)
+        conn.commit()
+        return {'user_id': user_id, 'skill_level': skill_level}
+
+    except sqlite3.Error as e:
+        print(f"❌ Error rotating refresh token: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+def revoke_refresh_token(token_hash):
+    """Mark a refresh token as used (logout)"""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        conn.execute("UPDATE refresh_tokens SET revoked = 1 WHERE token_hash = ?", (token_hash,))
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Error revoking refresh token: {e}")
+        return False
+    finally:
+        conn.close()
+
+# Per-user data versions (ETags and /sync)
+def _bump_user_version(c, user_id):
+    """Advance the user's data version in the caller's transaction; returns the new version"""
+    return c.execute('''INSERT INTO user_data_versions (user_id, version) VALUES (?, 1)
+                        ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+                        RETURNING version''', (user_id,)).fetchone()[0]
+
+def _get_user_version(c, user_id):
+    row = c.execute("SELECT version FROM user_data_versions WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def get_user_version(user_id):
+    """Current data version for a user (0 before the first write), or None on error"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        return _get_user_version(conn.cursor(), user_id)
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting user version: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Student profile operations - FIXED VERSION
 def save_student_profile(user_id, college_name, branch, semester, skill_level, current_projects):
     """Save or update student profile"""
@@ -244,45 +595,33 @@ def save_student_profile(user_id, college_name, branch, semester, skill_level, c
     
     try:
         c = conn.cursor()
+        version = _bump_user_version(c, user_id)
         
-        # Check if profile exists
-        c.execute("SELECT user_id FROM student_profiles WHERE user_id = ?", (user_id,))
-        existing = c.fetchone()
-        
-        if existing:
-            # Update existing profile
-            c.execute('''UPDATE student_profiles 
-                         SET college_name = ?, 
-                             branch = ?, 
-                             semester = ?, 
-                             skill_level = ?, 
-                             current_projects = ?,
-                             updated_at = CURRENT_TIMESTAMP
-                         WHERE user_id = ?''',
-                      (college_name or '',
-                       branch or '',
-                       semester or '',
-                       skill_level or 'beginner',
-                       current_projects or '',
-                       user_id))
-            print(f"✅ Updated existing profile for user_id: {user_id}")
-        else:
-            # Insert new profile
-            c.execute('''INSERT INTO student_profiles 
-                         (user_id, college_name, branch, semester, skill_level, current_projects)
-                         VALUES (?, ?, ?, ?, ?, ?)''',
-                      (user_id,
-                       college_name or '',
-                       branch or '',
-                       semester or '',
-                       skill_level or 'beginner',
-                       current_projects or ''))
-            print(f"✅ Created new profile for user_id: {user_id}")
+        # Insert or update in one statement (user_id is the primary key)
+        c.execute('''INSERT INTO student_profiles 
+                     (user_id, college_name, branch, semester, skill_level, current_projects, version)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT(user_id) DO UPDATE SET
+                         college_name = excluded.college_name,
+                         branch = excluded.branch,
+                         semester = excluded.semester,
+                         skill_level = excluded.skill_level,
+                         current_projects = excluded.current_projects,
+                         updated_at = CURRENT_TIMESTAMP,
+                         version = excluded.version''',
+                  (user_id,
+                   college_name or '',
+                   branch or '',
+                   semester or '',
+                   skill_level or 'beginner',
+                   current_projects or '',
+                   version))
         
+        # Assign initial exercises in the same transaction (and connection:
+        # borrowing a second one here could exhaust the pool under load)
+        _insert_initial_exercises(c, user_id, skill_level or 'beginner', version)
         conn.commit()
-        
-        # Assign initial exercises
-        assign_initial_exercises(user_id, skill_level or 'beginner')
+        print(f"✅ Saved profile for user_id: {user_id}")
         
         return True
         
@@ -328,31 +667,45 @@ def get_student_profile(user_id):
         conn.close()
 
 # Project history operations
-def add_project_history(user_id, project_name, project_type, domain, status, notes):
-    """Add project to user's history"""
-    conn = get_connection()
-    if not conn:
-        return False
-    
+def _add_project_history(c, user_id, project_name, project_type, domain, status, notes):
+    version = _bump_user_version(c, user_id)
+    c.execute('''INSERT INTO project_history 
+                 (user_id, project_name, project_type, domain, status, notes, version)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+              (user_id,
+               project_name or '',
+               project_type or '',
+               domain or '',
+               status or 'planned',
+               notes or '',
+               version))
+    print(f"✅ Added project '{project_name}' to history for user_id: {user_id}")
+    return c.lastrowid
+
+def add_project_history(user_id, project_name, project_type, domain, status, notes, wait=True):
+    """Add project to user's history.
+
+    Returns the new project id once committed, or True when wait=False and
+    the write was only queued; False on error.
+    """
     try:
-        c = conn.cursor()
-        c.execute('''INSERT INTO project_history 
-                     (user_id, project_name, project_type, domain, status, notes)
-                     VALUES (?, ?, ?, ?, ?, ?)''',
-                  (user_id,
-                   project_name or '',
-                   project_type or '',
-                   domain or '',
-                   status or 'planned',
-                   notes or ''))
-        conn.commit()
-        print(f"✅ Added project '{project_name}' to history for user_id: {user_id}")
-        return True
-    except sqlite3.Error as e:
+        project_id = _write(_add_project_history, user_id, project_name, project_type,
+                            domain, status, notes, wait=wait)
+        return project_id if wait else True
+    except (sqlite3.Error, TimeoutError, RuntimeError) as e:
         print(f"❌ Error adding project to history: {e}")
         return False
-    finally:
-        conn.close()
+
+def _project_row_to_dict(project):
+    return {
+        'project_name': project['project_name'],
+        'project_type': project['project_type'],
+        'domain': project['domain'],
+        'status': project['status'],
+        'created_date': project['created_date'],
+        'completed_date': project['completed_date'],
+        'notes': project['notes']
+    }
 
 def get_project_history(user_id):
     """Get project history for user"""
@@ -368,73 +721,153 @@ def get_project_history(user_id):
                      WHERE user_id = ? 
                      ORDER BY created_date DESC''', 
                   (user_id,))
-        projects = c.fetchall()
-        
-        result = []
-        for project in projects:
-            result.append({
-                'project_name': project['project_name'],
-                'project_type': project['project_type'],
-                'domain': project['domain'],
-                'status': project['status'],
-                'created_date': project['created_date'],
-                'completed_date': project['completed_date'],
-                'notes': project['notes']
-            })
-        
-        return result
-        
+        return [_project_row_to_dict(project) for project in c.fetchall()]
+
     except sqlite3.Error as e:
         print(f"❌ Error getting project history: {e}")
         return []
     finally:
         conn.close()
 
+# Columns a caller may project from project_history (see get_project_history_page)
+PROJECT_HISTORY_FIELDS = ('project_name', 'project_type', 'domain', 'status',
+                          'created_date', 'completed_date', 'notes')
+
+def _query_project_page(c, user_id, limit, after=None, fields=PROJECT_HISTORY_FIELDS):
+    """One page of a user's projects, newest first, using cursor c.
+
+    Keyset pagination on (created_date, id): after is the key of the last row
+    of the previous page, so every page is an index range read regardless of
+    depth. Returns (projects, next_key); next_key is None on the last page.
+    """
+    # Only whitelisted names ever reach the SQL text
+    fields = [field for field in fields if field in PROJECT_HISTORY_FIELDS]
+    columns = ''.join(', ' + field for field in fields)
+    query = f'''SELECT id, created_date AS cursor_date{columns}
+                  FROM project_history
+                  WHERE user_id = ?'''
+    params = [user_id]
+    if after:
+        query += " AND (created_date, id) < (?, ?)"
+        params.extend(after)
+    # One extra row tells whether another page follows
+    query += " ORDER BY created_date DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    rows = c.execute(query, params).fetchall()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]['cursor_date'], rows[-1]['id'])
+
+    projects = [{field: row[field] for field in fields} for row in rows]
+    return projects, next_key
+
+def _count_projects(c, user_id):
+    row = c.execute('''SELECT COUNT(*) AS total,
+                               COALESCE(SUM(notes IS NOT NULL AND notes != ''), 0) AS with_notes
+                        FROM project_history WHERE user_id = ?''', (user_id,)).fetchone()
+    return {'total': row['total'], 'with_notes': row['with_notes']}
+
+def get_project_history_page(user_id, limit, after=None, fields=PROJECT_HISTORY_FIELDS):
+    """A keyset page of project history as {'projects', 'next_key'}"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        projects, next_key = _query_project_page(conn.cursor(), user_id, limit, after, fields)
+        return {'projects': projects, 'next_key': next_key}
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting project history page: {e}")
+        return None
+    finally:
+        conn.close()
+
+def count_project_history(user_id):
+    """Number of projects for a user, and how many have notes"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        return _count_projects(conn.cursor(), user_id)
+
+    except sqlite3.Error as e:
+        print(f"❌ Error counting project history: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Enhanced Skill exercises operations with AI cache
+INITIAL_EXERCISES = {
+    'beginner': [
+        ('form_validation', 'Add form validation to login page', 'https://youtube.com/form-validation', 'Easy', '2 hours'),
+        ('error_handling', 'Implement proper error messages', 'https://youtube.com/error-handling', 'Easy', '1 hour'),
+        ('responsive_design', 'Make the UI responsive for mobile', 'https://youtube.com/responsive-design', 'Medium', '3 hours')
+    ],
+    'intermediate': [
+        ('jwt_auth', 'Implement JWT authentication', 'https://youtube.com/jwt-auth', 'Medium', '4 hours'),
+        ('api_integration', 'Integrate with external API', 'https://youtube.com/api-integration', 'Medium', '3 hours'),
+        ('database_optimization', 'Optimize database queries', 'https://youtube.com/database-optimization', 'Hard', '5 hours')
+    ],
+    'advanced': [
+        ('websockets', 'Add real-time features with WebSockets', 'https://youtube.com/websockets', 'Hard', '6 hours'),
+        ('caching', 'Implement Redis caching', 'https://youtube.com/redis-caching', 'Hard', '4 hours'),
+        ('testing', 'Write unit tests for all endpoints', 'https://youtube.com/unit-testing', 'Medium', '3 hours')
+    ]
+}
+
+def _insert_initial_exercises(c, user_id, skill_level, version):
+    """Insert the level's exercises the user does not have yet; returns how many were added"""
+    level = skill_level if skill_level in INITIAL_EXERCISES else 'beginner'
+    # Unique (user_id, exercise_type): re-saving a profile adds nothing
+    c.executemany('''INSERT INTO skill_exercises 
+                     (user_id, exercise_type, description, video_url, difficulty, estimated_time, version)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT(user_id, exercise_type) DO NOTHING''',
+                  [(user_id, ex_type, description, video_url, difficulty, estimated_time, version)
+                   for ex_type, description, video_url, difficulty, estimated_time in INITIAL_EXERCISES[level]])
+    return c.rowcount
+
 def assign_initial_exercises(user_id, skill_level):
-    """Assign initial skill exercises based on level"""
-    exercises = {
-        'beginner': [
-            ('form_validation', 'Add form validation to login page', 'https://youtube.com/form-validation', 'Easy', '2 hours'),
-            ('error_handling', 'Implement proper error messages', 'https://youtube.com/error-handling', 'Easy', '1 hour'),
-            ('responsive_design', 'Make the UI responsive for mobile', 'https://youtube.com/responsive-design', 'Medium', '3 hours')
-        ],
-        'intermediate': [
-            ('jwt_auth', 'Implement JWT authentication', 'https://youtube.com/jwt-auth', 'Medium', '4 hours'),
-            ('api_integration', 'Integrate with external API', 'https://youtube.com/api-integration', 'Medium', '3 hours'),
-            ('database_optimization', 'Optimize database queries', 'https://youtube.com/database-optimization', 'Hard', '5 hours')
-        ],
-        'advanced': [
-            ('websockets', 'Add real-time features with WebSockets', 'https://youtube.com/websockets', 'Hard', '6 hours'),
-            ('caching', 'Implement Redis caching', 'https://youtube.com/redis-caching', 'Hard', '4 hours'),
-            ('testing', 'Write unit tests for all endpoints', 'https://youtube.com/unit-testing', 'Medium', '3 hours')
-        ]
-    }
-    
+    """Assign initial skill exercises based on level (exercises already assigned are kept)"""
     conn = get_connection()
     if not conn:
         return False
     
     try:
         c = conn.cursor()
-        level = skill_level if skill_level in exercises else 'beginner'
-        
-        for ex_type, description, video_url, difficulty, estimated_time in exercises[level]:
-            c.execute('''INSERT INTO skill_exercises 
-                         (user_id, exercise_type, description, video_url, difficulty, estimated_time)
-                         VALUES (?, ?, ?, ?, ?, ?)''',
-                      (user_id, ex_type, description, video_url, difficulty, estimated_time))
-        
-        conn.commit()
-        print(f"✅ Assigned {len(exercises[level])} exercises for user_id: {user_id}")
+        added = _insert_initial_exercises(c, user_id, skill_level, _bump_user_version(c, user_id))
+        if added > 0:
+            conn.commit()
+            print(f"✅ Assigned {added} exercises for user_id: {user_id}")
+        else:
+            # Nothing new: keep the old version so cached copies stay valid
+            conn.rollback()
         return True
-        
+
     except sqlite3.Error as e:
         print(f"❌ Error assigning exercises: {e}")
         return False
     finally:
         conn.close()
 
+def _exercise_row_to_dict(exercise):
+    return {
+        'exercise_type': exercise['exercise_type'],
+        'title': exercise['description'].split(':')[0] if ':' in exercise['description'] else exercise['description'],
+        'description': exercise['description'],
+        'completed': bool(exercise['completed']),
+        'date_assigned': exercise['date_assigned'],
+        'date_completed': exercise['date_completed'],
+        'video_url': exercise['video_url'],
+        'difficulty': exercise['difficulty'] or 'Medium',
+        'estimated_time': exercise['estimated_time'] or '2 hours',
+        'learning_outcome': 'Practice ' + exercise['description'].split()[0] + ' skills'
+    }
+
 def get_skill_exercises(user_id):
     """Get skill exercises for user"""
     conn = get_connection()
@@ -449,85 +882,63 @@ def get_skill_exercises(user_id):
                      WHERE user_id = ? 
                      ORDER BY date_assigned''', 
                   (user_id,))
-        exercises = c.fetchall()
-        
-        result = []
-        for exercise in exercises:
-            result.append({
-                'exercise_type': exercise['exercise_type'],
-                'title': exercise['description'].split(':')[0] if ':' in exercise['description'] else exercise['description'],
-                'description': exercise['description'],
-                'completed': bool(exercise['completed']),
-                'date_assigned': exercise['date_assigned'],
-                'date_completed': exercise['date_completed'],
-                'video_url': exercise['video_url'],
-                'difficulty': exercise['difficulty'] or 'Medium',
-                'estimated_time': exercise['estimated_time'] or '2 hours',
-                'learning_outcome': 'Practice ' + exercise['description'].split()[0] + ' skills'
-            })
-        
-        return result
-        
+        return [_exercise_row_to_dict(exercise) for exercise in c.fetchall()]
+
     except sqlite3.Error as e:
         print(f"❌ Error getting exercises: {e}")
         return []
     finally:
         conn.close()
 
-def complete_exercise(user_id, exercise_type):
-    """Mark exercise as complete"""
-    conn = get_connection()
-    if not conn:
+def _complete_exercise(c, user_id, exercise_type):
+    row = c.execute('''SELECT MIN(completed) AS completed FROM skill_exercises
+                        WHERE user_id = ? AND exercise_type = ?''',
+                     (user_id, exercise_type)).fetchone()
+    if row['completed'] is None:
+        print(f"⚠️ Exercise '{exercise_type}' not found for user_id: {user_id}")
         return False
-    
+    if row['completed']:
+        # Already complete: no write, so the version and cached copies stay valid
+        return True
+
+    version = _bump_user_version(c, user_id)
+    c.execute('''UPDATE skill_exercises 
+                 SET completed = 1, date_completed = CURRENT_TIMESTAMP, version = ?
+                 WHERE user_id = ? AND exercise_type = ? AND completed = 0''',
+              (version, user_id, exercise_type))
+    print(f"✅ Marked exercise '{exercise_type}' as complete for user_id: {user_id}")
+    return True
+
+def complete_exercise(user_id, exercise_type, wait=True):
+    """Mark exercise as complete.
+
+    Blocks until committed and returns whether the exercise exists.
+    wait=False only queues the write for the next group commit and returns
+    True at once (write-behind; the write is lost if the process dies first).
+    """
     try:
-        c = conn.cursor()
-        c.execute('''UPDATE skill_exercises 
-                     SET completed = 1, date_completed = CURRENT_TIMESTAMP
-                     WHERE user_id = ? AND exercise_type = ?''',
-                  (user_id, exercise_type))
-        conn.commit()
-        
-        if c.rowcount > 0:
-            print(f"✅ Marked exercise '{exercise_type}' as complete for user_id: {user_id}")
-            return True
-        else:
-            print(f"⚠️ Exercise '{exercise_type}' not found for user_id: {user_id}")
-            return False
-            
-    except sqlite3.Error as e:
+        completed = _write(_complete_exercise, user_id, exercise_type, wait=wait)
+        return completed if wait else True
+    except (sqlite3.Error, TimeoutError, RuntimeError) as e:
         print(f"❌ Error marking exercise complete: {e}")
         return False
-    finally:
-        conn.close()
 
 def save_ai_exercises_cache(user_id, skill_level, field, exercises_json):
-    """Save AI-generated exercises to cache"""
+    """Save AI-generated exercises to the shared cache (keyed by skill_level + field)"""
     conn = get_connection()
     if not conn:
         return False
     
     try:
-        c = conn.cursor()
-        
-        # Check if cache exists
-        c.execute("SELECT id FROM ai_exercises_cache WHERE user_id = ? AND skill_level = ? AND field = ?",
-                  (user_id, skill_level, field))
-        existing = c.fetchone()
-        
-        if existing:
-            # Update existing cache
-            c.execute('''UPDATE ai_exercises_cache 
-                         SET exercises_json = ?, created_at = CURRENT_TIMESTAMP
-                         WHERE user_id = ? AND skill_level = ? AND field = ?''',
-                      (exercises_json, user_id, skill_level, field))
-        else:
-            # Insert new cache
-            c.execute('''INSERT INTO ai_exercises_cache 
-                         (user_id, skill_level, field, exercises_json)
-                         VALUES (?, ?, ?, ?)''',
-                      (user_id, skill_level, field, exercises_json))
-        
+        # Insert or refresh in one statement (unique on skill_level, field)
+        conn.execute('''INSERT INTO ai_exercises_cache 
+                        (user_id, skill_level, field, exercises_json)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(skill_level, field) DO UPDATE SET
+                            user_id = excluded.user_id,
+                            exercises_json = excluded.exercises_json,
+                            created_at = CURRENT_TIMESTAMP''',
+                     (user_id, skill_level, field, exercises_json))
         conn.commit()
         return True
         
@@ -537,27 +948,28 @@ def save_ai_exercises_cache(user_id, skill_level, field, exercises_json):
     finally:
         conn.close()
 
-def get_ai_exercises_cache(user_id, skill_level, field):
-    """Get cached AI exercises"""
+def get_ai_exercises_cache(skill_level, field, max_age_days=7):
+    """Get cached AI exercises with their age, or None if missing/older than max_age_days"""
     conn = get_connection()
     if not conn:
         return None
     
     try:
         c = conn.cursor()
-        c.execute('''SELECT exercises_json, created_at 
+        # One row per key (unique index), so no ORDER BY; age is computed in
+        # SQL because created_at is stored in UTC
+        c.execute('''SELECT exercises_json,
+                            (julianday('now') - julianday(created_at)) * 86400 AS age_seconds
                      FROM ai_exercises_cache 
-                     WHERE user_id = ? AND skill_level = ? AND field = ?
-                     ORDER BY created_at DESC LIMIT 1''',
-                  (user_id, skill_level, field))
+                     WHERE skill_level = ? AND field = ?''',
+                  (skill_level, field))
         cache = c.fetchone()
         
-        if cache:
-            # Check if cache is fresh (less than 7 days old)
-            from datetime import datetime, timedelta
-            cache_date = datetime.strptime(cache['created_at'], '%Y-%m-%d %H:%M:%S')
-            if datetime.now() - cache_date < timedelta(days=7):
-                return json.loads(cache['exercises_json'])
+        if cache and cache['age_seconds'] < max_age_days * 86400:
+            return {
+                'exercises': json.loads(cache['exercises_json']),
+                'age_seconds': cache['age_seconds']
+            }
         
         return None
         
@@ -568,33 +980,25 @@ def get_ai_exercises_cache(user_id, skill_level, field):
         conn.close()
 
 # Portfolio operations
-def save_portfolio_data(user_id, portfolio_data):
-    """Save portfolio data"""
+def save_portfolio_data(user_id, portfolio_data, input_hash=None, portfolio_html=None):
+    """Save portfolio data (and optionally the HTML generated from it)"""
     conn = get_connection()
     if not conn:
         return False
     
     try:
         portfolio_json = json.dumps(portfolio_data)
-        c = conn.cursor()
-        
-        # Check if portfolio exists
-        c.execute("SELECT id FROM portfolio_data WHERE user_id = ?", (user_id,))
-        existing = c.fetchone()
-        
-        if existing:
-            # Update existing portfolio
-            c.execute('''UPDATE portfolio_data 
-                         SET portfolio_json = ?, last_updated = CURRENT_TIMESTAMP
-                         WHERE user_id = ?''',
-                      (portfolio_json, user_id))
-        else:
-            # Insert new portfolio
-            c.execute('''INSERT INTO portfolio_data 
-                         (user_id, portfolio_json)
-                         VALUES (?, ?)''',
-                      (user_id, portfolio_json))
         
+        # Insert or update in one statement (user_id is UNIQUE)
+        conn.execute('''INSERT INTO portfolio_data 
+                        (user_id, portfolio_json, input_hash, portfolio_html)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            portfolio_json = excluded.portfolio_json,
+                            input_hash = excluded.input_hash,
+                            portfolio_html = excluded.portfolio_html,
+                            last_updated = CURRENT_TIMESTAMP''',
+                     (user_id, portfolio_json, input_hash, portfolio_html))
         conn.commit()
         return True
         
@@ -625,6 +1029,326 @@ def get_portfolio_data(user_id):
     finally:
         conn.close()
 
+def get_cached_portfolio_html(user_id, input_hash):
+    """Get the generated portfolio HTML if it was built from the same inputs"""
+    conn = get_connection()
+    if not conn:
+        return None
+    
+    try:
+        c = conn.cursor()
+        c.execute('''SELECT portfolio_html FROM portfolio_data
+                     WHERE user_id = ? AND input_hash = ? AND portfolio_html IS NOT NULL''',
+                  (user_id, input_hash))
+        row = c.fetchone()
+        return row['portfolio_html'] if row else None
+        
+    except sqlite3.Error as e:
+        print(f"❌ Error getting cached portfolio: {e}")
+        return None
+    finally:
+        conn.close()
+
+# AI response cache operations (persistent tier of response_cache.ResponseCache)
+def get_ai_response_cache(cache_key):
+    """Get a cached AI response (JSON text) if it has not expired"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute('''SELECT response_json, expires_at FROM ai_response_cache
+                     WHERE cache_key = ? AND expires_at > ?''',
+                  (cache_key, time.time()))
+        row = c.fetchone()
+        return (row['response_json'], row['expires_at']) if row else None
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting AI response cache: {e}")
+        return None
+    finally:
+        conn.close()
+
+def save_ai_response_cache(cache_key, feature, response_json, expires_at):
+    """Save an AI response to the persistent cache"""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        c = conn.cursor()
+        c.execute('''INSERT INTO ai_response_cache (cache_key, feature, response_json, expires_at)
+                     VALUES (?, ?, ?, ?)
+                     ON CONFLICT(cache_key) DO UPDATE SET
+                         feature = excluded.feature,
+                         response_json = excluded.response_json,
+                         expires_at = excluded.expires_at,
+                         created_at = CURRENT_TIMESTAMP''',
+                  (cache_key, feature, response_json, expires_at))
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Error saving AI response cache: {e}")
+        return False
+    finally:
+        conn.close()
+
+def prune_ai_response_cache(max_rows):
+    """Delete expired entries, then the oldest ones beyond max_rows"""
+    conn = get_connection()
+    if not conn:
+        return 0
+
+    try:
+        c = conn.cursor()
+        c.execute("DELETE FROM ai_response_cache WHERE expires_at <= ?", (time.time(),))
+        removed = c.rowcount
+        c.execute('''DELETE FROM ai_response_cache WHERE cache_key IN (
+                         SELECT cache_key FROM ai_response_cache
+                         ORDER BY expires_at DESC LIMIT -1 OFFSET ?)''',
+                  (max_rows,))
+        removed += c.rowcount
+        conn.commit()
+        return removed
+
+    except sqlite3.Error as e:
+        print(f"❌ Error pruning AI response cache: {e}")
+        return 0
+    finally:
+        conn.close()
+
+# Incremental sync (one connection, one read transaction)
+def get_changes_since(user_id, since):
+    """Profile, projects and exercises written after version since, plus the current version"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        c = conn.cursor()
+        c.execute("BEGIN")
+        version = _get_user_version(c, user_id)
+        if version <= since:
+            return {'version': version, 'profile': None, 'projects': [], 'exercises': []}
+
+        profile = c.execute('''SELECT college_name, branch, semester, skill_level, current_projects
+                               FROM student_profiles
+                               WHERE user_id = ? AND version > ?''', (user_id, since)).fetchone()
+
+        c.execute('''SELECT project_name, project_type, domain, status,
+                     created_date, completed_date, notes
+                     FROM project_history
+                     WHERE user_id = ? AND version > ?
+                     ORDER BY created_date DESC, id DESC''', (user_id, since))
+        projects = [_project_row_to_dict(project) for project in c.fetchall()]
+
+        c.execute('''SELECT exercise_type, description, completed, date_assigned,
+                     date_completed, video_url, difficulty, estimated_time
+                     FROM skill_exercises
+                     WHERE user_id = ? AND version > ?
+                     ORDER BY date_assigned''', (user_id, since))
+        exercises = [_exercise_row_to_dict(exercise) for exercise in c.fetchall()]
+
+        return {
+            'version': version,
+            'profile': dict(profile) if profile else None,
+            'projects': projects,
+            'exercises': exercises
+        }
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting changes: {e}")
+        return None
+    finally:
+        conn.rollback()
+        conn.close()
+
+# Dashboard (one connection, one read transaction)
+def get_dashboard(user_id, project_limit=20, project_after=None, include_exercises=True):
+    """Profile, a page of project history, project counts and exercises in one snapshot"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        c = conn.cursor()
+        # A read transaction gives every query below the same WAL snapshot
+        c.execute("BEGIN")
+        version = _get_user_version(c, user_id)
+
+        c.execute('''SELECT college_name, branch, semester, skill_level, current_projects
+                     FROM student_profiles WHERE user_id = ?''', (user_id,))
+        profile = c.fetchone()
+
+        counts = _count_projects(c, user_id)
+
+        projects, next_key = [], None
+        if project_limit > 0:
+            projects, next_key = _query_project_page(c, user_id, project_limit, project_after)
+
+        exercises = []
+        if include_exercises:
+            c.execute('''SELECT exercise_type, description, completed, date_assigned,
+                         date_completed, video_url, difficulty, estimated_time
+                         FROM skill_exercises
+                         WHERE user_id = ?
+                         ORDER BY date_assigned''',
+                      (user_id,))
+            exercises = [_exercise_row_to_dict(exercise) for exercise in c.fetchall()]
+
+        return {
+            'version': version,
+            'profile': dict(profile) if profile else None,
+            'projects': projects,
+            'next_key': next_key,
+            'project_count': counts['total'],
+            'projects_with_notes': counts['with_notes'],
+            'exercises': exercises
+        }
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting dashboard: {e}")
+        return None
+    finally:
+        conn.rollback()
+        conn.close()
+
+# Background job operations (see jobs.py)
+def _job_row_to_dict(row):
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'user_id': row['user_id'],
+        'status': row['status'],
+        'payload': json.loads(row['payload_json']),
+        'result': json.loads(row['result_json']) if row['result_json'] else None,
+        'error': row['error'],
+        'degraded': bool(row['degraded']),
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at']
+    }
+
+def create_ai_job(job_id, kind, dedup_key, user_id, payload_json):
+    """Insert a queued job"""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        now = time.time()
+        conn.execute('''INSERT INTO ai_jobs
+                        (id, kind, dedup_key, user_id, status, payload_json, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)''',
+                     (job_id, kind, dedup_key, user_id, payload_json, now, now))
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Error creating job: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_ai_job(job_id):
+    """Get a job by id"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        row = conn.execute("SELECT * FROM ai_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_row_to_dict(row) if row else None
+
+    except sqlite3.Error as e:
+        print(f"❌ Error getting job: {e}")
+        return None
+    finally:
+        conn.close()
+
+def find_ai_job(dedup_key, max_age_seconds):
+    """Newest job with the same dedup key that has not failed or degraded, within max_age_seconds"""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        row = conn.execute('''SELECT * FROM ai_jobs
+                              WHERE dedup_key = ? AND status != 'failed' AND degraded = 0
+                                AND created_at > ?
+                              ORDER BY created_at DESC LIMIT 1''',
+                           (dedup_key, time.time() - max_age_seconds)).fetchone()
+        return _job_row_to_dict(row) if row else None
+
+    except sqlite3.Error as e:
+        print(f"❌ Error finding job: {e}")
+        return None
+    finally:
+        conn.close()
+
+def update_ai_job(job_id, status, result_json=None, error=None, degraded=False):
+    """Move a job to a new status, storing its result or error (degraded: fallback result)"""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        conn.execute('''UPDATE ai_jobs SET status = ?, result_json = ?, error = ?, degraded = ?,
+                                           updated_at = ?
+                        WHERE id = ?''',
+                     (status, result_json, error, int(degraded), time.time(), job_id))
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        print(f"❌ Error updating job: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_unfinished_ai_jobs():
+    """Ids of queued or running jobs, oldest first (requeued after a restart)"""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        rows = conn.execute('''SELECT id FROM ai_jobs WHERE status IN ('queued', 'running')
+                               ORDER BY created_at''').fetchall()
+        return [row['id'] for row in rows]
+
+    except sqlite3.Error as e:
+        print(f"❌ Error listing unfinished jobs: {e}")
+        return []
+    finally:
+        conn.close()
+
+def prune_ai_jobs(retention_seconds, max_rows):
+    """Delete finished jobs older than retention_seconds, then the oldest beyond max_rows"""
+    conn = get_connection()
+    if not conn:
+        return 0
+
+    try:
+        c = conn.cursor()
+        c.execute('''DELETE FROM ai_jobs WHERE status IN ('done', 'failed') AND updated_at <= ?''',
+                  (time.time() - retention_seconds,))
+        removed = c.rowcount
+        c.execute('''DELETE FROM ai_jobs WHERE id IN (
+                         SELECT id FROM ai_jobs WHERE status IN ('done', 'failed')
+                         ORDER BY updated_at DESC LIMIT -1 OFFSET ?)''',
+                  (max_rows,))
+        removed += c.rowcount
+        conn.commit()
+        return removed
+
+    except sqlite3.Error as e:
+        print(f"❌ Error pruning jobs: {e}")
+        return 0
+    finally:
+        conn.close()
+
 # Database utility functions
 def get_all_users():
     """Get all users (for debugging)"""
@@ -646,9 +1370,15 @@ def get_all_users():
 def reset_database():
     """Reset database (for testing)"""
     try:
-        if os.path.exists('project_assistant.db'):
-            os.remove('project_assistant.db')
+        close_pool()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
             print("🗑️ Old database removed")
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+        _pool.reopen()
+        _write_buffer.reopen()
         
         return init_db()
     except Exception as e:
@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+import time
+import queue
+
+
+class PooledConnection:
+    """Thin wrapper around a pooled sqlite3 connection.
+
+    Behaves like the raw connection, except that close() hands the
+    connection back to the pool instead of tearing it down.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._conn)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of long-lived SQLite connections"""
+
+    def __init__(self, database, max_size=5, timeout=10.0,
+                 health_check_interval=30.0, on_connect=None):
+        self.database = database
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._last_used = {}
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _is_healthy(self, conn):
+        last_used = self._last_used.get(id(conn), 0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Borrow a connection, opening a new one while under max_size"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+
+            if conn is None:
+                with self._lock:
+                    can_create = self._created < self.max_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return PooledConnection(self, self._connect())
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+
+                # Pool exhausted: wait for another thread to release one
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Timed out waiting for a database connection (pool size {self.max_size})"
+                    )
+                try:
+                    conn = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+
+            if self._is_healthy(conn):
+                return PooledConnection(self, conn)
+            self._discard(conn)
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._last_used[id(conn)] = time.monotonic()
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Close every idle connection and reject further borrowing"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def reopen(self):
+        self._closed = False
+
+    def stats(self):
+        return {
+            "max_size": self.max_size,
+            "open": self._created,
+            "idle": self._idle.qsize(),
+        }
@@ -0,0 +1,511 @@
+import hashlib
+import html
+import os
+from datetime import datetime
+import re
+
+# Fallback content served when the AI is unavailable. Templates are parsed
+# once at import; per request only the (escaped) fields are substituted.
+
+# Set to the public URL of /static/fallback-portfolio.css to link the
+# stylesheet instead of inlining it (inlined pages keep working once saved)
+FALLBACK_PORTFOLIO_CSS_URL = os.getenv('FALLBACK_PORTFOLIO_CSS_URL', '')
+
+class Template:
+    """A $field template split once, at import, into literal and field parts.
+
+    substitute() only interleaves the (already escaped) values with the
+    literals and joins them: none of the per-call parsing of string.Template
+    or str.format. Only used for the trusted templates in this module.
+    """
+
+    _FIELD = re.compile(r"\$([a-z_]+)")
+
+    def __init__(self, text):
+        # Literals at even indexes, field names at odd ones
+        self._parts = self._FIELD.split(text)
+        self._fields = list(enumerate(self._parts))[1::2]
+
+    def substitute(self, **values):
+        out = self._parts.copy()
+        for index, field in self._fields:
+            out[index] = str(values[field])
+        return "".join(out)
+
+PORTFOLIO_CSS = """\
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            background: #f8f9fa;
+        }
+        
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+        
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 60px 40px;
+            text-align: center;
+            border-radius: 0 0 30px 30px;
+            margin-bottom: 30px;
+        }
+        
+        .header h1 {
+            font-size: 3rem;
+            margin-bottom: 10px;
+        }
+        
+        .header p {
+            font-size: 1.2rem;
+            opacity: 0.9;
+            margin-bottom: 5px;
+        }
+        
+        .content {
+            padding: 20px;
+        }
+        
+        .section {
+            margin-bottom: 40px;
+            padding: 30px;
+            background: white;
+            border-radius: 15px;
+            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.1);
+        }
+        
+        .section h2 {
+            color: #667eea;
+            margin-bottom: 20px;
+            font-size: 1.8rem;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+        
+        .section h2 i {
+            font-size: 1.5rem;
+        }
+        
+        .about-text {
+            font-size: 1.1rem;
+            color: #555;
+            line-height: 1.8;
+        }
+        
+        .skills-grid {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 12px;
+            margin-top: 20px;
+        }
+        
+        .skill-tag {
+            background: #667eea;
+            color: white;
+            padding: 8px 16px;
+            border-radius: 20px;
+            font-size: 0.9rem;
+            font-weight: 500;
+        }
+        
+        .projects-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+            gap: 25px;
+            margin-top: 20px;
+        }
+        
+        .project-card {
+            background: white;
+            border-radius: 15px;
+            overflow: hidden;
+            border: 1px solid #eaeaea;
+            transition: all 0.3s ease;
+        }
+        
+        .project-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 10px 25px rgba(0, 0, 0, 0.15);
+        }
+        
+        .project-header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 20px;
+        }
+        
+        .project-header h3 {
+            margin: 0;
+            font-size: 1.3rem;
+        }
+        
+        .project-content {
+            padding: 20px;
+        }
+        
+        .project-content p {
+            color: #666;
+            line-height: 1.6;
+            margin-bottom: 15px;
+        }
+        
+        .tech {
+            color: #667eea;
+            font-size: 0.9rem;
+            font-weight: 500;
+        }
+        
+        .contact-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+            gap: 25px;
+            margin-top: 20px;
+        }
+        
+        .contact-item {
+            display: flex;
+            align-items: center;
+            gap: 15px;
+            padding: 20px;
+            background: #f8f9ff;
+            border-radius: 10px;
+            border: 2px solid #e6e8ff;
+        }
+        
+        .contact-icon {
+            width: 50px;
+            height: 50px;
+            background: #667eea;
+            color: white;
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-size: 1.5rem;
+        }
+        
+        .contact-info h4 {
+            margin: 0 0 5px 0;
+            color: #333;
+        }
+        
+        .contact-info p {
+            margin: 0;
+            color: #666;
+        }
+        
+        .social-links {
+            display: flex;
+            gap: 15px;
+            margin-top: 30px;
+            justify-content: center;
+        }
+        
+        .social-link {
+            width: 45px;
+            height: 45px;
+            background: #667eea;
+            color: white;
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            text-decoration: none;
+            font-size: 1.2rem;
+            transition: all 0.3s ease;
+        }
+        
+        .social-link:hover {
+            background: #764ba2;
+            transform: translateY(-3px);
+        }
+        
+        footer {
+            text-align: center;
+            padding: 30px;
+            color: #666;
+            margin-top: 40px;
+            border-top: 1px solid #eee;
+        }
+        
+        @media (max-width: 768px) {
+            .header h1 {
+                font-size: 2rem;
+            }
+            
+            .projects-grid {
+                grid-template-columns: 1fr;
+            }
+            
+            .section {
+                padding: 20px;
+            }
+        }
+"""
+PORTFOLIO_CSS_ETAG = '"' + hashlib.sha256(PORTFOLIO_CSS.encode('utf-8')).hexdigest()[:16] + '"'
+
+if FALLBACK_PORTFOLIO_CSS_URL:
+    _PORTFOLIO_STYLE = f'    <link rel="stylesheet" href="{html.escape(FALLBACK_PORTFOLIO_CSS_URL)}">\n'
+else:
+    _PORTFOLIO_STYLE = f"    <style>\n{PORTFOLIO_CSS}    </style>\n"
+
+_PORTFOLIO_HEAD = Template("""\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$name - Portfolio</title>
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
+""")
+
+_PORTFOLIO_BODY = Template("""\
+</head>
+<body>
+    <div class="header">
+        <h1>$name</h1>
+        <p>$college | $branch</p>
+        <p>Semester $semester | Student Portfolio</p>
+    </div>
+
+    <div class="container">
+        <div class="content">
+            <div class="section">
+                <h2><i class="fas fa-user"></i> About Me</h2>
+                <div class="about-text">
+                    <p>$bio</p>
+                </div>
+            </div>
+
+            <div class="section">
+                <h2><i class="fas fa-code"></i> Skills</h2>
+                <div class="skills-grid">
+                    $skills_html
+                </div>
+            </div>
+
+            <div class="section">
+                <h2><i class="fas fa-project-diagram"></i> Projects</h2>
+                <div class="projects-grid">
+                    $projects_html
+                </div>
+            </div>
+
+            <div class="section">
+                <h2><i class="fas fa-envelope"></i> Contact</h2>
+                <div class="contact-grid">
+                    <div class="contact-item">
+                        <div class="contact-icon">
+                            <i class="fas fa-graduation-cap"></i>
+                        </div>
+                        <div class="contact-info">
+                            <h4>Education</h4>
+                            <p>$college</p>
+                            <p>$branch</p>
+                        </div>
+                    </div>
+
+                    <div class="contact-item">
+                        <div class="contact-icon">
+                            <i class="fas fa-envelope"></i>
+                        </div>
+                        <div class="contact-info">
+                            <h4>Email</h4>
+                            <p>$email</p>
+                        </div>
+                    </div>
+
+                    <div class="contact-item">
+                        <div class="contact-icon">
+                            <i class="fas fa-calendar"></i>
+                        </div>
+                        <div class="contact-info">
+                            <h4>Portfolio Date</h4>
+                            <p>$date</p>
+                        </div>
+                    </div>
+                </div>
+
+                $social_html
+            </div>
+        </div>
+    </div>
+
+    <footer>
+        <p>&copy; $year $name - Portfolio</p>
+        <p>Generated by Smart Project Assistant v3.5</p>
+    </footer>
+</body>
+</html>""")
+
+_SKILL_TAG = Template('<span class="skill-tag">$skill</span>\n')
+
+_PROJECT_CARD = Template("""
+        <div class="project-card">
+            <div class="project-header">
+                <h3>$name</h3>
+            </div>
+            <div class="project-content">
+                <p>$description</p>
+                <p class="tech">$technologies</p>
+            </div>
+        </div>
+        """)
+
+_DEFAULT_PROJECT_CARD = _PROJECT_CARD.substitute(
+    name="Smart Project Assistant",
+    description="A comprehensive project management system with AI-powered features for students.",
+    technologies="Python, FastAPI, JavaScript, HTML/CSS"
+)
+
+_SOCIAL_LINK = Template('<a href="$href" class="social-link" target="_blank"><i class="fab fa-$icon"></i></a>')
+
+_SOCIAL_LINKS = Template("""
+                <div class="social-links">
+                    $github
+                    $linkedin
+                </div>
+                """)
+
+_DOCUMENTATION = Template("""\
+# PROJECT DOCUMENTATION
+
+## Project Overview
+$project_details
+
+## Development Roadmap
+
+### Phase 1: Planning & Design (Week 1-2)
+1. Define requirements and specifications
+2. Create wireframes and user flow diagrams
+3. Design database schema
+4. Set up development environment
+
+### Phase 2: Backend Development (Week 3-5)
+1. Set up server and API framework
+2. Implement database models and migrations
+3. Create REST API endpoints
+4. Implement authentication and authorization
+
+### Phase 3: Frontend Development (Week 6-8)
+1. Create responsive UI components
+2. Implement state management
+3. Connect frontend to backend APIs
+4. Add user interaction and validation
+
+### Phase 4: Testing & Deployment (Week 9-10)
+1. Write unit and integration tests
+2. Perform user acceptance testing
+3. Deploy to production environment
+4. Monitor and optimize performance
+
+## Technology Stack
+- Frontend: HTML5, CSS3, JavaScript (ES6+)
+- Backend: Python with FastAPI
+- Database: SQLite/PostgreSQL
+- Version Control: Git & GitHub
+- Deployment: Docker, Cloud Platform (optional)
+
+## Getting Started
+1. Clone the repository
+2. Install dependencies: pip install -r requirements.txt
+3. Configure environment variables
+4. Run database migrations
+5. Start development server
+
+## Features Checklist
+- [ ] User authentication system
+- [ ] CRUD operations
+- [ ] Responsive design
+- [ ] Error handling
+- [ ] Data validation
+- [ ] API documentation
+- [ ] Testing suite
+- [ ] Deployment configuration
+
+## Future Enhancements
+1. Add advanced features based on user feedback
+2. Implement analytics and monitoring
+3. Optimize performance and scalability
+4. Add mobile application version
+
+## Notes
+$project_details
+
+---
+Generated by Smart Project Assistant v3.5
+Date: $date
+""")
+
+def _text(value):
+    return html.escape(str(value), quote=True)
+
+def _safe_href(url):
+    """Escaped link target, or '' for anything but http(s) (no javascript: URLs)"""
+    url = str(url or "").strip()
+    if not url.lower().startswith(("http://", "https://")):
+        return ""
+    return html.escape(url, quote=True)
+
+def _social_link(url, icon):
+    href = _safe_href(url)
+    return _SOCIAL_LINK.substitute(href=href, icon=icon) if href else ""
+
+def render_fallback_portfolio(data, now=None):
+    """Render the template portfolio page for a PortfolioData"""
+    now = now or datetime.now()
+    education = data.education or {}
+    contact = data.contact or {}
+
+    skills_html = "".join([_SKILL_TAG.substitute(skill=_text(skill)) for skill in data.skills])
+
+    projects_html = "".join([
+        _PROJECT_CARD.substitute(
+            name=_text(project.get("name", f"Project {i+1}")),
+            description=_text(project.get("description", "A completed project.")),
+            technologies=_text(project.get("technologies", "Various technologies"))
+        )
+        for i, project in enumerate(data.projects[:5])  # Limit to 5 projects
+    ]) or _DEFAULT_PROJECT_CARD
+
+    github = _social_link(contact.get("github", ""), "github")
+    linkedin = _social_link(contact.get("linkedin", ""), "linkedin")
+    social_html = _SOCIAL_LINKS.substitute(github=github, linkedin=linkedin) if github or linkedin else ""
+
+    name = _text(data.name or "Student")
+    return "".join((
+        _PORTFOLIO_HEAD.substitute(name=name),
+        _PORTFOLIO_STYLE,
+        _PORTFOLIO_BODY.substitute(
+            name=name,
+            college=_text(education.get("college", "University")),
+            branch=_text(education.get("branch", "Computer Science")),
+            semester=_text(education.get("semester", "Current")),
+            bio=_text(contact.get("bio", "Passionate developer and student.")),
+            email=_text(contact.get("email", "") or "Not provided"),
+            skills_html=skills_html,
+            projects_html=projects_html,
+            social_html=social_html,
+            date=now.strftime('%B %d, %Y'),
+            year=now.year
+        )
+    ))
+
+def render_fallback_documentation(project_details, now=None):
+    """Render the plain-text documentation template"""
+    now = now or datetime.now()
+    return _DOCUMENTATION.substitute(
+        project_details=project_details,
+        date=now.strftime('%Y-%m-%d %H:%M:%S')
+    )
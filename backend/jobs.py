@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+
+import database
+from rate_limiting import RateLimitExceeded
+
+AI_JOB_WORKERS = int(os.getenv('AI_JOB_WORKERS', '4'))
+AI_JOB_QUEUE_MAX = int(os.getenv('AI_JOB_QUEUE_MAX', '200'))
+AI_JOB_TIMEOUT = float(os.getenv('AI_JOB_TIMEOUT', '180'))             # seconds per job
+AI_JOB_DEDUP_WINDOW = float(os.getenv('AI_JOB_DEDUP_WINDOW', '600'))   # seconds
+AI_JOB_RETENTION = float(os.getenv('AI_JOB_RETENTION', '3600'))        # seconds after finishing
+AI_JOB_MAX_ROWS = int(os.getenv('AI_JOB_MAX_ROWS', '5000'))
+AI_JOB_PRUNE_EVERY = 50  # finished jobs between prune passes
+
+FINISHED = ('done', 'failed')
+
+class DegradedResult:
+    """Returned by a handler that fell back: the client gets result, dedup skips the job"""
+
+    def __init__(self, result):
+        self.result = result
+
+def make_dedup_key(kind, payload):
+    material = json.dumps([kind, payload], sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+class JobQueue:
+    """In-process asyncio worker pool over the ai_jobs table.
+
+    submit() stores the job and returns at once; workers run the handler
+    registered for the job's kind and write the result back. Identical
+    submissions (same kind and payload) within the dedup window share a job.
+    Jobs left queued or running by a restart are picked up again by start().
+    """
+
+    def __init__(self, workers=AI_JOB_WORKERS, max_queue=AI_JOB_QUEUE_MAX, timeout=AI_JOB_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._events = {}  # job_id -> asyncio.Event set when the job finishes
+        self._finished_since_prune = 0
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'rejected': 0,
+                       'done': 0, 'degraded': 0, 'failed': 0, 'running': 0}
+
+    def register(self, kind, handler):
+        """handler(payload) -> JSON-serializable result, or DegradedResult(result) for fallback content"""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for job_id in await asyncio.to_thread(database.get_unfinished_ai_jobs):
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind, payload, user_id=None):
+        """Queue a job (or return the matching recent one) as a job dict"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        dedup_key = make_dedup_key(kind, payload)
+        existing = await asyncio.to_thread(database.find_ai_job, dedup_key, AI_JOB_DEDUP_WINDOW)
+        if existing:
+            self._stats['deduplicated'] += 1
+            return existing
+
+        if self._queue is None or self._queue.qsize() >= self.max_queue:
+            self._stats['rejected'] += 1
+            raise RateLimitExceeded("Too many queued jobs, please retry shortly", retry_after=10.0)
+
+        job_id = uuid.uuid4().hex
+        created = await asyncio.to_thread(
+            database.create_ai_job, job_id, kind, dedup_key, user_id, json.dumps(payload)
+        )
+        if not created:
+            raise RuntimeError("Could not create job")
+
+        self._stats['submitted'] += 1
+        self._queue.put_nowait(job_id)
+        return await asyncio.to_thread(database.get_ai_job, job_id)
+
+    async def get(self, job_id):
+        return await asyncio.to_thread(database.get_ai_job, job_id)
+
+    async def wait(self, job_id, timeout):
+        """Wait up to timeout seconds for a job to finish; returns the job dict"""
+        # Register before reading the status: a job finishing in between
+        # still sets the event instead of being missed
+        event = self._events.setdefault(job_id, asyncio.Event())
+        job = await self.get(job_id)
+        if job is None or job['status'] in FINISHED:
+            # Drops the event (and wakes anyone else who registered on it)
+            self._notify(job_id)
+            return job
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    def _notify(self, job_id):
+        event = self._events.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"⚠️ Job {job_id} crashed:", e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id):
+        job = await asyncio.to_thread(database.get_ai_job, job_id)
+        if job is None or job['status'] in FINISHED:
+            return
+
+        handler = self._handlers.get(job['kind'])
+        await asyncio.to_thread(database.update_ai_job, job_id, 'running')
+        self._stats['running'] += 1
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            result = await asyncio.wait_for(handler(job['payload']), self.timeout)
+            degraded = isinstance(result, DegradedResult)
+            if degraded:
+                result = result.result
+                self._stats['degraded'] += 1
+            await asyncio.to_thread(database.update_ai_job, job_id, 'done', json.dumps(result), None, degraded)
+            self._stats['done'] += 1
+        except Exception as e:
+            message = "Job timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(f"⚠️ Job {job_id} ({job['kind']}) failed:", message)
+            await asyncio.to_thread(database.update_ai_job, job_id, 'failed', None, message)
+            self._stats['failed'] += 1
+        finally:
+            self._stats['running'] -= 1
+            self._notify(job_id)
+
+        self._finished_since_prune += 1
+        if self._finished_since_prune >= AI_JOB_PRUNE_EVERY:
+            self._finished_since_prune = 0
+            await asyncio.to_thread(database.prune_ai_jobs, AI_JOB_RETENTION, AI_JOB_MAX_ROWS)
+
+    def stats(self):
+        return {
+            **self._stats,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'workers': len(self._tasks),
+        }
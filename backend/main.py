@@ -1,11 +1,29 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import database
+from storage import get_storage
 import openrouter_api
+from streaming import format_sse, JsonStreamAssembler, SSE_HEADERS
+from rate_limiting import (AI_IP_BURST, AI_IP_RATE, RateLimitExceeded, TokenBucketLimiter,
+                           defer_charge)
+from jobs import DegradedResult, JobQueue
+from auth import AuthPool, LoginThrottle
+from session_tokens import (AUTH_REFRESH_TTL, AUTH_REQUIRE_TOKEN, SessionTokens,
+                            hash_refresh_token, new_refresh_token)
+import fallback_templates
+import asyncio
+import base64
+import binascii
+import contextlib
+import hashlib
 import json
+import math
+import re
+import time
 from datetime import datetime
 
 app = FastAPI(
@@ -14,6 +32,10 @@ app = FastAPI(
     version="3.5"
 )
 
+# User data backend (STORAGE_BACKEND: sqlite or postgres); AI jobs and the
+# AI response cache stay in the node-local SQLite database
+storage = get_storage()
+
 # ----------------------------
 # CORS CONFIG
 # ----------------------------
@@ -23,8 +45,86 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# ----------------------------
+# RATE LIMITING
+# ----------------------------
+# Token buckets for AI endpoints, per user and (for anonymous requests) per
+# client address; the global upstream concurrency limit lives on the shared
+# OpenRouterAI instance (ai.limiter)
+user_limiter = TokenBucketLimiter()
+ip_limiter = TokenBucketLimiter(AI_IP_RATE, AI_IP_BURST)
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+def client_address(http_request: Request):
+    # Behind a proxy this is the forwarded client address only when uvicorn
+    # trusts the proxy (--forwarded-allow-ips, see render.yaml)
+    return http_request.client.host if http_request.client else "unknown"
+
+def check_rate_limit(http_request: Request, user_id: Optional[int] = None, deferred=False):
+    """Charge one AI request to the user (or the client address when anonymous).
+
+    deferred=True charges only if the request goes upstream (see
+    rate_limiting.defer_charge); jobs and streams are charged up front.
+    """
+    if user_id is not None:
+        charge = lambda: user_limiter.check(f"user:{user_id}")
+    else:
+        charge = lambda: ip_limiter.check(f"ip:{client_address(http_request)}")
+    if deferred:
+        defer_charge(charge)
+    else:
+        charge()
+
+def check_stream_admission(ai, http_request: Request, user_id: Optional[int] = None):
+    """Reject a stream with 429 up front - once SSE starts the status is fixed"""
+    check_rate_limit(http_request, user_id)
+    if ai:
+        ai.limiter.raise_if_saturated()
+
+# ----------------------------
+# CONDITIONAL READS
+# ----------------------------
+# Per-user reads carry a strong ETag built from the user's data version
+# (bumped by every profile, project and exercise write) and the request URL,
+# so a client revalidating unchanged data gets an empty 304.
+def user_etag(http_request: Request, version: int):
+    digest = hashlib.sha256(str(http_request.url).encode("utf-8")).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+def etag_matches(http_request: Request, etag: str):
+    header = http_request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def conditional_json(http_request: Request, user_id: int, build):
+    """Return 304 when If-None-Match has the current ETag, else build() as JSON.
+
+    The version is read before build() runs: a write racing the read can only
+    make the body newer than its tag, which costs one extra refetch later but
+    never serves stale data under a current tag.
+    """
+    version = storage.get_user_version(user_id)
+    if version is None:
+        return build()
+    
+    etag = user_etag(http_request, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(http_request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=build(), headers=headers)
+
 # ----------------------------
 # DATA MODELS
 # ----------------------------
@@ -37,6 +137,12 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class StudentProfile(BaseModel):
     user_id: int
     college_name: str
@@ -79,12 +185,12 @@ class VersionControlRequest(BaseModel):
 # ----------------------------
 def get_ai():
     try:
-        return openrouter_api.OpenRouterAI()
+        return openrouter_api.get_instance()
     except:
         return None
 
-def safe_call(ai, func_name: str, *args):
-    """Call AI function with appropriate number of arguments"""
+async def safe_call(ai, func_name: str, *args, **kwargs):
+    """Call AI function with appropriate number of arguments (kwargs are passed through)"""
     if not ai:
         return False, {"error": "AI not configured"}
     
@@ -111,24 +217,30 @@ def safe_call(ai, func_name: str, *args):
         
         # Map function names to their expected argument counts
         if func_name in ["generate_project_ideas", "get_project_ideas", "project_ideas"]:
-            result = func(*args[:3])  # domain, skill_level, count
+            result = await func(*args[:3])  # domain, skill_level, count
         elif func_name in ["generate_documentation", "generate_docs", "documentation"]:
-            result = func(*args[:1])  # project_details
+            result = await func(*args[:1])  # project_details
         elif func_name in ["generate_code_snippet", "code_snippet", "generate_code"]:
-            result = func(*args[:3])  # language, prompt, complexity
+            result = await func(*args[:3])  # language, prompt, complexity
         elif func_name in ["generate_skill_recommendations", "skill_exercises", "get_exercises"]:
-            result = func(*args[:2])  # skill_level, interests
+            result = await func(*args[:2], **kwargs)  # skill_level, interests
         elif func_name in ["generate_version_control_help", "vc_help", "version_control"]:
-            result = func(*args[:1])  # request
+            result = await func(*args[:1])  # request
         elif func_name in ["generate_portfolio_html", "portfolio", "generate_portfolio"]:
             if len(args) > 0 and isinstance(args[0], dict):
-                result = func(args[0])
+                result = await func(args[0])
             else:
-                result = func()
+                result = await func()
         else:
-            result = func(*args)
+            result = await func(*args)
         
+        if isinstance(result, dict) and "error" in result:
+            # Upstream failed or the circuit is open: callers serve their fallback
+            print(f"⚠️ AI error ({func_name}):", result["error"])
+            return False, result
         return True, result
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         print(f"⚠️ AI error ({func_name}):", e)
         return False, {"error": str(e)}
@@ -140,28 +252,98 @@ def safe_call(ai, func_name: str, *args):
 def read_root():
     return {"message": "Smart Project Assistant API v3.5"}
 
+# bcrypt runs on the bounded auth pool, never on the request threadpool;
+# attempts are throttled per address (and per username for logins) first
+auth_pool = AuthPool()
+login_throttle = LoginThrottle()
+
+# Stateless sessions: /login issues a short-lived HMAC-signed access token
+# (user id + skill level) and a single-use refresh token stored hashed in
+# SQLite. Per-request checks only verify the signature in memory.
+session_tokens = SessionTokens()
+
+def session_claims(authorization: Optional[str] = Header(None)):
+    """Dependency: claims of the "Authorization: Bearer" token, or None without one"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    claims = session_tokens.verify(token.strip()) if scheme.lower() == "bearer" else None
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+def authorize(claims, user_id):
+    """The token must belong to user_id; no token is allowed only when AUTH_REQUIRE_TOKEN is off"""
+    if claims is None:
+        if AUTH_REQUIRE_TOKEN:
+            raise HTTPException(status_code=401, detail="Authentication required",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return
+    if claims["sub"] != user_id:
+        raise HTTPException(status_code=403, detail="Token does not match user")
+
+def session_response(user_id, skill_level, refresh_token=None):
+    access_token, _ = session_tokens.issue(user_id, skill_level)
+    response = {
+        "user_id": user_id,
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": session_tokens.ttl
+    }
+    if refresh_token:
+        response["refresh_token"] = refresh_token
+    return response
+
 @app.post("/register")
-def register(user: UserCreate):
-    try:
-        user_id = database.register_user(user.username, user.password, user.email)
-        return {"message": "Registration successful", "user_id": user_id}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def register(user: UserCreate, http_request: Request):
+    login_throttle.check(client_address(http_request))
+    user_id = await auth_pool.run(storage.create_user, user.username, user.password, user.email)
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Username already exists or registration failed")
+    return {"message": "Registration successful", "user_id": user_id}
 
 @app.post("/login")
-def login(user: UserLogin):
-    try:
-        user_data = database.login_user(user.username, user.password)
-        if not user_data:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        return {"message": "Login successful", "user_id": user_data["id"]}
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=str(e))
+async def login(user: UserLogin, http_request: Request):
+    login_throttle.check(client_address(http_request), user.username)
+    user_id = await auth_pool.run(storage.authenticate_user, user.username, user.password)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    refresh_token = new_refresh_token()
+    session = await asyncio.to_thread(
+        storage.open_session, user_id, hash_refresh_token(refresh_token), time.time() + AUTH_REFRESH_TTL
+    )
+    if session is None:
+        raise HTTPException(status_code=500, detail="Could not start session")
+    return {"message": "Login successful", **session_response(user_id, session["skill_level"], refresh_token)}
+
+@app.post("/auth/refresh")
+async def refresh_session(request: RefreshRequest, http_request: Request):
+    """Swap a refresh token for a new access token and a new refresh token"""
+    login_throttle.check(client_address(http_request))
+    refresh_token = new_refresh_token()
+    session = await asyncio.to_thread(
+        storage.rotate_refresh_token, hash_refresh_token(request.refresh_token),
+        hash_refresh_token(refresh_token), time.time() + AUTH_REFRESH_TTL
+    )
+    if session is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    return session_response(session["user_id"], session["skill_level"], refresh_token)
+
+@app.post("/logout")
+async def logout(request: LogoutRequest, claims: Optional[dict] = Depends(session_claims)):
+    if claims:
+        session_tokens.revoke(claims)
+    if request.refresh_token:
+        await asyncio.to_thread(storage.revoke_refresh_token, hash_refresh_token(request.refresh_token))
+    return {"message": "Logged out"}
 
 @app.post("/save-profile")
-def save_profile(profile: StudentProfile):
+def save_profile(profile: StudentProfile, claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, profile.user_id)
     try:
-        database.save_student_profile(
+        storage.save_student_profile(
             profile.user_id,
             profile.college_name,
             profile.branch,
@@ -169,27 +351,36 @@ def save_profile(profile: StudentProfile):
             profile.skill_level,
             profile.current_projects
         )
-        return {"message": "Profile saved successfully"}
+        response = {"message": "Profile saved successfully"}
+        if claims:
+            # The skill level is a token claim: hand back a token with the new one
+            response.update(session_response(profile.user_id, profile.skill_level))
+        return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/get-profile/{user_id}")
-def get_profile(user_id: int):
-    try:
-        profile = database.get_student_profile(user_id)
-        if not profile:
-            raise HTTPException(status_code=404, detail="Profile not found")
-        return profile
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+def get_profile(user_id: int, http_request: Request, claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, user_id)
+    def build():
+        try:
+            profile = storage.get_student_profile(user_id)
+            if not profile:
+                raise HTTPException(status_code=404, detail="Profile not found")
+            return profile
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    
+    return conditional_json(http_request, user_id, build)
 
 # ----------------------------
 # AI FEATURES
 # ----------------------------
 @app.post("/get-project-ideas")
-def get_project_ideas(request: ProjectIdeaRequest):
+async def get_project_ideas(request: ProjectIdeaRequest, http_request: Request):
+    check_rate_limit(http_request, deferred=True)
     ai = get_ai()
-    success, result = safe_call(ai, "generate_project_ideas", 
+    success, result = await safe_call(ai, "generate_project_ideas", 
                                request.domain, request.skill_level, request.count)
     
     if success:
@@ -239,9 +430,18 @@ def get_fallback_ideas(domain, skill_level, count):
     return ideas
 
 @app.post("/generate-documentation")
-def generate_documentation(request: DocumentationRequest):
+async def generate_documentation(request: DocumentationRequest, http_request: Request):
+    check_rate_limit(http_request, deferred=True)
+    return await build_documentation(request.project_details)
+
+async def build_documentation(project_details):
+    response, _ = await build_documentation_result(project_details)
+    return response
+
+async def build_documentation_result(project_details):
+    """Documentation response, and whether it is the fallback document"""
     ai = get_ai()
-    success, result = safe_call(ai, "generate_documentation", request.project_details)
+    success, result = await safe_call(ai, "generate_documentation", project_details)
     
     if success:
         # Normalize response
@@ -253,87 +453,52 @@ def generate_documentation(request: DocumentationRequest):
             documentation = str(result)
     else:
         # Fallback documentation
-        documentation = generate_fallback_documentation(request.project_details)
+        documentation = generate_fallback_documentation(project_details)
     
     return {
         "documentation": documentation,
         "filename": f"project_documentation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    }
+    }, not success
+
+@app.post("/generate-documentation/stream")
+async def stream_documentation(request: DocumentationRequest, http_request: Request):
+    """Stream documentation as SSE: "delta" events, then one "result" and "done" """
+    ai = get_ai()
+    check_stream_admission(ai, http_request)
+    
+    async def events():
+        parts = []
+        try:
+            async with contextlib.aclosing(ai.stream_documentation(request.project_details)) as stream:
+                async for delta in stream:
+                    parts.append(delta)
+                    yield format_sse("delta", {"text": delta})
+            documentation = "".join(parts)
+        except Exception as e:
+            print("⚠️ Documentation stream failed:", e)
+            if parts:
+                yield format_sse("error", {"message": str(e)})
+            documentation = None
+        
+        if not documentation:
+            documentation = generate_fallback_documentation(request.project_details)
+        
+        yield format_sse("result", {
+            "documentation": documentation,
+            "filename": f"project_documentation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        })
+        yield format_sse("done", {})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 def generate_fallback_documentation(project_details):
-    return f"""# PROJECT DOCUMENTATION
-
-## Project Overview
-{project_details}
-
-## Development Roadmap
-
-### Phase 1: Planning & Design (Week 1-2)
-1. Define requirements and specifications
-2. Create wireframes and user flow diagrams
-3. Design database schema
-4. Set up development environment
-
-### Phase 2: Backend Development (Week 3-5)
-1. Set up server and API framework
-2. Implement database models and migrations
-3. Create REST API endpoints
-4. Implement authentication and authorization
-
-### Phase 3: Frontend Development (Week 6-8)
-1. Create responsive UI components
-2. Implement state management
-3. Connect frontend to backend APIs
-4. Add user interaction and validation
-
-### Phase 4: Testing & Deployment (Week 9-10)
-1. Write unit and integration tests
-2. Perform user acceptance testing
-3. Deploy to production environment
-4. Monitor and optimize performance
-
-## Technology Stack
-- Frontend: HTML5, CSS3, JavaScript (ES6+)
-- Backend: Python with FastAPI
-- Database: SQLite/PostgreSQL
-- Version Control: Git & GitHub
-- Deployment: Docker, Cloud Platform (optional)
-
-## Getting Started
-1. Clone the repository
-2. Install dependencies: pip install -r requirements.txt
-3. Configure environment variables
-4. Run database migrations
-5. Start development server
-
-## Features Checklist
-- [ ] User authentication system
-- [ ] CRUD operations
-- [ ] Responsive design
-- [ ] Error handling
-- [ ] Data validation
-- [ ] API documentation
-- [ ] Testing suite
-- [ ] Deployment configuration
-
-## Future Enhancements
-1. Add advanced features based on user feedback
-2. Implement analytics and monitoring
-3. Optimize performance and scalability
-4. Add mobile application version
-
-## Notes
-{project_details}
-
----
-Generated by Smart Project Assistant v3.5
-Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
+    return fallback_templates.render_fallback_documentation(project_details)
 
 @app.post("/generate-code-snippet")
-def generate_code_snippet(request: CodeSnippetRequest):
+async def generate_code_snippet(request: CodeSnippetRequest, http_request: Request):
+    check_rate_limit(http_request, deferred=True)
     ai = get_ai()
-    success, result = safe_call(ai, "generate_code_snippet", 
+    success, result = await safe_call(ai, "generate_code_snippet", 
                                request.language, request.prompt, request.complexity)
     
     if success:
@@ -353,6 +518,45 @@ def generate_code_snippet(request: CodeSnippetRequest):
         fallback = get_fallback_code_snippet(request.language, request.prompt, request.complexity)
         return {"snippet": fallback}
 
+@app.post("/generate-code-snippet/stream")
+async def stream_code_snippet(request: CodeSnippetRequest, http_request: Request):
+    """Stream the raw JSON text as "delta" events; "result" carries the parsed snippet"""
+    ai = get_ai()
+    check_stream_admission(ai, http_request)
+    
+    async def events():
+        assembler = JsonStreamAssembler()
+        streamed = False
+        try:
+            # Leaving early (break, client gone) closes the upstream stream and
+            # frees its concurrency slot now rather than at garbage collection
+            stream = ai.stream_code_snippet(request.language, request.prompt, request.complexity)
+            async with contextlib.aclosing(stream):
+                async for delta in stream:
+                    yield format_sse("delta", {"text": delta})
+                    streamed = True
+                    if assembler.feed(delta) is not None:
+                        break
+            result = assembler.finish()
+        except Exception as e:
+            print("⚠️ Code snippet stream failed:", e)
+            # As in the other streams: "error" only when partial output was sent
+            if streamed:
+                yield format_sse("error", {"message": str(e)})
+            result = None
+        
+        if isinstance(result, dict) and "code" in result:
+            snippet = result
+        elif result is not None:
+            snippet = normalize_code_snippet(result, request.language, request.prompt)
+        else:
+            snippet = get_fallback_code_snippet(request.language, request.prompt, request.complexity)
+        
+        yield format_sse("result", {"snippet": snippet})
+        yield format_sse("done", {})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 def normalize_code_snippet(data, language, prompt):
     """Convert various AI responses to standard format"""
     if isinstance(data, str):
@@ -402,37 +606,48 @@ def get_fallback_code_snippet(language, prompt, complexity):
     snippet["title"] = f"{language.title()} Code for: {prompt}"
     return snippet
 
-@app.post("/get-skill-exercises")
-def get_skill_exercises(request: SkillEnhancementRequest):
-    ai = get_ai()
-    
-    # Get skill level and interests
-    skill_level = request.skill_level or "beginner"
-    interests = request.interests or ""
-    
-    success, result = safe_call(ai, "generate_skill_recommendations", skill_level, interests)
-    
+# Shared exercise cache (ai_exercises_cache): entries younger than
+# SKILL_CACHE_FRESH_SECONDS are served as-is; older ones (up to
+# SKILL_CACHE_MAX_AGE_DAYS) are served stale while a background refresh runs.
+SKILL_CACHE_FRESH_SECONDS = 24 * 3600
+SKILL_CACHE_MAX_AGE_DAYS = 7
+
+_background_tasks = set()
+_refreshing_exercise_keys = set()
+
+def _run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def normalize_interests(interests):
+    """Canonical cache field for free-text interests ("Web, AI" == "ai web")"""
+    tokens = re.split(r"[,;/\s]+", (interests or "").lower())
+    return ",".join(sorted({t for t in tokens if t}))
+
+def normalize_skill_exercises(result):
+    """Extract a list of exercises from the AI response and add video links"""
     exercises = []
     
-    if success:
-        # Normalize AI response
-        if isinstance(result, list):
-            exercises = result
-        elif isinstance(result, dict):
-            if "exercises" in result:
-                exercises = result["exercises"]
-            elif "recommendations" in result:
-                exercises = result["recommendations"]
-        else:
-            # Try to parse string
-            try:
-                parsed = json.loads(result)
-                if isinstance(parsed, list):
-                    exercises = parsed
-                elif isinstance(parsed, dict) and "exercises" in parsed:
-                    exercises = parsed["exercises"]
-            except:
-                pass
+    # Normalize AI response
+    if isinstance(result, list):
+        exercises = result
+    elif isinstance(result, dict):
+        if "exercises" in result:
+            exercises = result["exercises"]
+        elif "recommendations" in result:
+            exercises = result["recommendations"]
+    else:
+        # Try to parse string
+        try:
+            parsed = json.loads(result)
+            if isinstance(parsed, list):
+                exercises = parsed
+            elif isinstance(parsed, dict) and "exercises" in parsed:
+                exercises = parsed["exercises"]
+        except:
+            pass
     
     # Add video_url to exercises (hardcoded fallback)
     youtube_search_url = "https://www.youtube.com/results?search_query="
@@ -443,6 +658,61 @@ def get_skill_exercises(request: SkillEnhancementRequest):
                 search_query = title.replace(" ", "+") + "+tutorial"
                 exercise["video_url"] = youtube_search_url + search_query
     
+    return exercises
+
+async def fetch_ai_skill_exercises(user_id, skill_level, interests, field, refresh=False):
+    """Generate exercises with the AI and write them behind to the shared cache.
+
+    refresh=True skips the AI response cache, whose TTL for this feature is
+    longer than the exercise staleness window: without it a refresh would
+    rewrite the same exercises with a new timestamp.
+    """
+    ai = get_ai()
+    success, result = await safe_call(ai, "generate_skill_recommendations", skill_level, interests,
+                                      bypass_cache=refresh)
+    exercises = normalize_skill_exercises(result) if success else []
+    
+    if exercises:
+        _run_in_background(asyncio.to_thread(
+            storage.save_ai_exercises_cache, user_id, skill_level, field, json.dumps(exercises)
+        ))
+    return exercises
+
+async def refresh_skill_exercises(user_id, skill_level, interests, field):
+    key = (skill_level, field)
+    # The task inherited the request's deferred charge; a refresh is not the user's
+    defer_charge(None)
+    try:
+        await fetch_ai_skill_exercises(user_id, skill_level, interests, field, refresh=True)
+    except Exception as e:
+        print(f"⚠️ Background exercise refresh failed for {key}:", e)
+    finally:
+        _refreshing_exercise_keys.discard(key)
+
+@app.post("/get-skill-exercises")
+async def get_skill_exercises(request: SkillEnhancementRequest, http_request: Request,
+                              claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, request.user_id)
+    check_rate_limit(http_request, request.user_id, deferred=True)
+    
+    # Get skill level (falling back to the token's) and interests
+    skill_level = request.skill_level or (claims or {}).get("lvl") or "beginner"
+    interests = request.interests or ""
+    field = normalize_interests(interests)
+    
+    cached = await asyncio.to_thread(
+        storage.get_ai_exercises_cache, skill_level, field, SKILL_CACHE_MAX_AGE_DAYS
+    )
+    if cached and cached["exercises"]:
+        key = (skill_level, field)
+        if cached["age_seconds"] > SKILL_CACHE_FRESH_SECONDS and key not in _refreshing_exercise_keys:
+            # Stale-while-revalidate: answer from cache, refresh in the background
+            _refreshing_exercise_keys.add(key)
+            _run_in_background(refresh_skill_exercises(request.user_id, skill_level, interests, field))
+        return {"exercises": cached["exercises"]}
+    
+    exercises = await fetch_ai_skill_exercises(request.user_id, skill_level, interests, field)
+    
     # If no exercises from AI, provide defaults
     if not exercises:
         exercises = get_default_skill_exercises(skill_level)
@@ -516,7 +786,7 @@ def get_default_skill_exercises(skill_level):
     return default_exercises
 
 @app.post("/get-version-control-help")
-def get_version_control_help(request: VersionControlRequest):
+async def get_version_control_help(request: VersionControlRequest, http_request: Request):
     # Check if request is asking for commands (not code)
     forbidden_keywords = ["code", "program", "function", "algorithm", "application", "snippet", "example"]
     user_request = request.request.lower()
@@ -527,8 +797,9 @@ def get_version_control_help(request: VersionControlRequest):
             detail="This mode only generates commands. Please ask for version control commands only."
         )
     
+    check_rate_limit(http_request, deferred=True)
     ai = get_ai()
-    success, result = safe_call(ai, "generate_version_control_help", request.request)
+    success, result = await safe_call(ai, "generate_version_control_help", request.request)
     
     if success:
         # Ensure result is a string of commands
@@ -649,405 +920,223 @@ git remote -v
 git log --oneline --graph"""
 
 @app.post("/generate-portfolio")
-def generate_portfolio(data: PortfolioData):
-    ai = get_ai()
-    
-    # Try different AI method names
-    portfolio_html = None
-    ai_methods = ["generate_portfolio_html", "generate_portfolio", "generate_portfolio_html_v1"]
-    
-    for method_name in ai_methods:
-        if ai and hasattr(ai, method_name):
-            try:
-                func = getattr(ai, method_name)
-                # Pass portfolio data
-                if method_name == "generate_portfolio_html_v1":
-                    result = func(data.dict())
-                else:
-                    result = func(data.dict())
-                
-                if isinstance(result, dict) and "portfolio_html" in result:
-                    portfolio_html = result["portfolio_html"]
-                elif isinstance(result, str):
-                    portfolio_html = result
-                
-                if portfolio_html:
-                    break
-            except Exception as e:
-                print(f"⚠️ Portfolio AI method {method_name} failed:", e)
-                continue
-    
-    # If AI failed, use fallback
-    if not portfolio_html:
-        portfolio_html = generate_fallback_portfolio(data)
+async def generate_portfolio(data: PortfolioData, http_request: Request,
+                             claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, data.user_id)
+    check_rate_limit(http_request, data.user_id, deferred=True)
+    return await build_portfolio(data)
+
+def portfolio_input_hash(payload):
+    """Hash of the PortfolioData a portfolio is generated from"""
+    material = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def extract_portfolio_html(result):
+    """Pull the HTML document out of an AI response ({"html": ...} or a string)"""
+    if isinstance(result, dict):
+        if "error" in result:
+            return None
+        result = result.get("html") or result.get("portfolio_html")
+    if not isinstance(result, str):
+        return None
     
+    html = result.strip()
+    # Models often wrap the page in a ```html fence
+    fenced = re.match(r"^```[a-zA-Z]*\s*\n(.*?)\n?```$", html, re.S)
+    if fenced:
+        html = fenced.group(1).strip()
+    return html if "<" in html else None
+
+def save_generated_portfolio(user_id, payload, input_hash, portfolio_html):
+    _run_in_background(asyncio.to_thread(
+        storage.save_portfolio_data, user_id, payload, input_hash, portfolio_html
+    ))
+
+def portfolio_response(data: PortfolioData, portfolio_html):
     return {
         "portfolio_html": portfolio_html,
         "filename": f"portfolio_{data.user_id}_{datetime.now().strftime('%Y%m%d')}.html"
     }
 
-def generate_fallback_portfolio(data):
-    name = data.name or "Student"
-    college = data.education.get("college", "University")
-    branch = data.education.get("branch", "Computer Science")
-    semester = data.education.get("semester", "Current")
-    bio = data.contact.get("bio", "Passionate developer and student.")
-    email = data.contact.get("email", "")
-    github = data.contact.get("github", "")
-    linkedin = data.contact.get("linkedin", "")
+async def build_portfolio(data: PortfolioData):
+    response, _ = await build_portfolio_result(data)
+    return response
+
+async def build_portfolio_result(data: PortfolioData):
+    """Portfolio response, and whether it is the fallback page"""
+    payload = data.dict()
+    input_hash = portfolio_input_hash(payload)
     
-    skills_html = ""
-    for skill in data.skills:
-        skills_html += f'<span class="skill-tag">{skill}</span>\n'
+    # Only regenerate when the inputs changed since the last AI portfolio
+    cached = await asyncio.to_thread(storage.get_cached_portfolio_html, data.user_id, input_hash)
+    if cached:
+        return portfolio_response(data, cached), False
     
-    projects_html = ""
-    for i, project in enumerate(data.projects[:5]):  # Limit to 5 projects
-        project_name = project.get("name", f"Project {i+1}")
-        project_desc = project.get("description", "A completed project.")
-        project_tech = project.get("technologies", "Various technologies")
-        projects_html += f"""
-        <div class="project-card">
-            <div class="project-header">
-                <h3>{project_name}</h3>
-            </div>
-            <div class="project-content">
-                <p>{project_desc}</p>
-                <p class="tech">{project_tech}</p>
-            </div>
-        </div>
-        """
+    ai = get_ai()
+    success, result = await safe_call(ai, "generate_portfolio_html", payload)
+    portfolio_html = extract_portfolio_html(result) if success else None
     
-    if not projects_html:
-        projects_html = """
-        <div class="project-card">
-            <div class="project-header">
-                <h3>Smart Project Assistant</h3>
-            </div>
-            <div class="project-content">
-                <p>A comprehensive project management system with AI-powered features for students.</p>
-                <p class="tech">Python, FastAPI, JavaScript, HTML/CSS</p>
-            </div>
-        </div>
-        """
+    if not portfolio_html:
+        # Fallback pages are not cached so the next request retries the AI
+        return portfolio_response(data, generate_fallback_portfolio(data)), True
     
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{name} - Portfolio</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background: #f8f9fa;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 60px 40px;
-            text-align: center;
-            border-radius: 0 0 30px 30px;
-            margin-bottom: 30px;
-        }}
-        
-        .header h1 {{
-            font-size: 3rem;
-            margin-bottom: 10px;
-        }}
-        
-        .header p {{
-            font-size: 1.2rem;
-            opacity: 0.9;
-            margin-bottom: 5px;
-        }}
-        
-        .content {{
-            padding: 20px;
-        }}
-        
-        .section {{
-            margin-bottom: 40px;
-            padding: 30px;
-            background: white;
-            border-radius: 15px;
-            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.1);
-        }}
-        
-        .section h2 {{
-            color: #667eea;
-            margin-bottom: 20px;
-            font-size: 1.8rem;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .section h2 i {{
-            font-size: 1.5rem;
-        }}
-        
-        .about-text {{
-            font-size: 1.1rem;
-            color: #555;
-            line-height: 1.8;
-        }}
-        
-        .skills-grid {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 12px;
-            margin-top: 20px;
-        }}
-        
-        .skill-tag {{
-            background: #667eea;
-            color: white;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.9rem;
-            font-weight: 500;
-        }}
-        
-        .projects-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 25px;
-            margin-top: 20px;
-        }}
-        
-        .project-card {{
-            background: white;
-            border-radius: 15px;
-            overflow: hidden;
-            border: 1px solid #eaeaea;
-            transition: all 0.3s ease;
-        }}
-        
-        .project-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 10px 25px rgba(0, 0, 0, 0.15);
-        }}
-        
-        .project-header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-        }}
-        
-        .project-header h3 {{
-            margin: 0;
-            font-size: 1.3rem;
-        }}
-        
-        .project-content {{
-            padding: 20px;
-        }}
-        
-        .project-content p {{
-            color: #666;
-            line-height: 1.6;
-            margin-bottom: 15px;
-        }}
-        
-        .tech {{
-            color: #667eea;
-            font-size: 0.9rem;
-            font-weight: 500;
-        }}
-        
-        .contact-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 25px;
-            margin-top: 20px;
-        }}
-        
-        .contact-item {{
-            display: flex;
-            align-items: center;
-            gap: 15px;
-            padding: 20px;
-            background: #f8f9ff;
-            border-radius: 10px;
-            border: 2px solid #e6e8ff;
-        }}
-        
-        .contact-icon {{
-            width: 50px;
-            height: 50px;
-            background: #667eea;
-            color: white;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5rem;
-        }}
-        
-        .contact-info h4 {{
-            margin: 0 0 5px 0;
-            color: #333;
-        }}
-        
-        .contact-info p {{
-            margin: 0;
-            color: #666;
-        }}
-        
-        .social-links {{
-            display: flex;
-            gap: 15px;
-            margin-top: 30px;
-            justify-content: center;
-        }}
-        
-        .social-link {{
-            width: 45px;
-            height: 45px;
-            background: #667eea;
-            color: white;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            text-decoration: none;
-            font-size: 1.2rem;
-            transition: all 0.3s ease;
-        }}
+    save_generated_portfolio(data.user_id, payload, input_hash, portfolio_html)
+    return portfolio_response(data, portfolio_html), False
+
+@app.post("/generate-portfolio/stream")
+async def stream_portfolio(data: PortfolioData, http_request: Request,
+                           claims: Optional[dict] = Depends(session_claims)):
+    """Stream portfolio HTML as SSE "delta" events, then the full page as "result" """
+    authorize(claims, data.user_id)
+    payload = data.dict()
+    input_hash = portfolio_input_hash(payload)
+    cached = await asyncio.to_thread(storage.get_cached_portfolio_html, data.user_id, input_hash)
+    
+    ai = get_ai()
+    if not cached:
+        check_stream_admission(ai, http_request, data.user_id)
+    
+    async def events():
+        if cached:
+            yield format_sse("result", portfolio_response(data, cached))
+            yield format_sse("done", {})
+            return
         
-        .social-link:hover {{
-            background: #764ba2;
-            transform: translateY(-3px);
-        }}
+        parts = []
+        try:
+            async with contextlib.aclosing(ai.stream_portfolio_html(payload)) as stream:
+                async for delta in stream:
+                    parts.append(delta)
+                    yield format_sse("delta", {"text": delta})
+            portfolio_html = extract_portfolio_html("".join(parts))
+        except Exception as e:
+            print("⚠️ Portfolio stream failed:", e)
+            if parts:
+                yield format_sse("error", {"message": str(e)})
+            portfolio_html = None
         
-        footer {{
-            text-align: center;
-            padding: 30px;
-            color: #666;
-            margin-top: 40px;
-            border-top: 1px solid #eee;
-        }}
+        if portfolio_html:
+            save_generated_portfolio(data.user_id, payload, input_hash, portfolio_html)
+        else:
+            portfolio_html = generate_fallback_portfolio(data)
         
-        @media (max-width: 768px) {{
-            .header h1 {{
-                font-size: 2rem;
-            }}
-            
-            .projects-grid {{
-                grid-template-columns: 1fr;
-            }}
-            
-            .section {{
-                padding: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>{name}</h1>
-        <p>{college} | {branch}</p>
-        <p>Semester {semester} | Student Portfolio</p>
-    </div>
+        yield format_sse("result", portfolio_response(data, portfolio_html))
+        yield format_sse("done", {})
     
-    <div class="container">
-        <div class="content">
-            <div class="section">
-                <h2><i class="fas fa-user"></i> About Me</h2>
-                <div class="about-text">
-                    <p>{bio}</p>
-                </div>
-            </div>
-            
-            <div class="section">
-                <h2><i class="fas fa-code"></i> Skills</h2>
-                <div class="skills-grid">
-                    {skills_html}
-                </div>
-            </div>
-            
-            <div class="section">
-                <h2><i class="fas fa-project-diagram"></i> Projects</h2>
-                <div class="projects-grid">
-                    {projects_html}
-                </div>
-            </div>
-            
-            <div class="section">
-                <h2><i class="fas fa-envelope"></i> Contact</h2>
-                <div class="contact-grid">
-                    <div class="contact-item">
-                        <div class="contact-icon">
-                            <i class="fas fa-graduation-cap"></i>
-                        </div>
-                        <div class="contact-info">
-                            <h4>Education</h4>
-                            <p>{college}</p>
-                            <p>{branch}</p>
-                        </div>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <div class="contact-icon">
-                            <i class="fas fa-envelope"></i>
-                        </div>
-                        <div class="contact-info">
-                            <h4>Email</h4>
-                            <p>{email or 'Not provided'}</p>
-                        </div>
-                    </div>
-                    
-                    <div class="contact-item">
-                        <div class="contact-icon">
-                            <i class="fas fa-calendar"></i>
-                        </div>
-                        <div class="contact-info">
-                            <h4>Portfolio Date</h4>
-                            <p>{datetime.now().strftime('%B %d, %Y')}</p>
-                        </div>
-                    </div>
-                </div>
-                
-                {(github or linkedin) and '''
-                <div class="social-links">
-                    ''' + (f'<a href="{github}" class="social-link" target="_blank"><i class="fab fa-github"></i></a>' if github else '') + '''
-                    ''' + (f'<a href="{linkedin}" class="social-link" target="_blank"><i class="fab fa-linkedin"></i></a>' if linkedin else '') + '''
-                </div>
-                ''' or ''}
-            </div>
-        </div>
-    </div>
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+def generate_fallback_portfolio(data):
+    return fallback_templates.render_fallback_portfolio(data)
+
+@app.get("/static/fallback-portfolio.css")
+def fallback_portfolio_css(request: Request):
+    """Stylesheet of the fallback portfolio, for FALLBACK_PORTFOLIO_CSS_URL"""
+    headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": fallback_templates.PORTFOLIO_CSS_ETAG
+    }
+    if request.headers.get("if-none-match") == fallback_templates.PORTFOLIO_CSS_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(fallback_templates.PORTFOLIO_CSS, media_type="text/css", headers=headers)
+
+# ----------------------------
+# BACKGROUND JOBS
+# ----------------------------
+# Long generations run on the job queue: POST returns a job id at once and
+# the client polls GET /jobs/{job_id} or subscribes to /jobs/{job_id}/events
+job_queue = JobQueue()
+
+# Fallback results reach the client but are marked degraded, so an identical
+# submission retries the AI instead of reusing them
+async def run_documentation_job(payload):
+    response, degraded = await build_documentation_result(payload["project_details"])
+    return DegradedResult(response) if degraded else response
+
+async def run_portfolio_job(payload):
+    response, degraded = await build_portfolio_result(PortfolioData(**payload))
+    return DegradedResult(response) if degraded else response
+
+job_queue.register("documentation", run_documentation_job)
+job_queue.register("portfolio", run_portfolio_job)
+
+def job_response(job):
+    response = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "poll_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events"
+    }
+    if job["status"] == "done":
+        response["result"] = job["result"]
+        response["degraded"] = job["degraded"]
+    elif job["status"] == "failed":
+        response["error"] = job["error"]
+    return response
+
+@app.post("/jobs/generate-documentation", status_code=202)
+async def submit_documentation_job(request: DocumentationRequest, http_request: Request):
+    check_rate_limit(http_request)
+    job = await job_queue.submit("documentation", request.dict())
+    return job_response(job)
+
+@app.post("/jobs/generate-portfolio", status_code=202)
+async def submit_portfolio_job(data: PortfolioData, http_request: Request,
+                               claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, data.user_id)
+    check_rate_limit(http_request, data.user_id)
+    job = await job_queue.submit("portfolio", data.dict(), user_id=data.user_id)
+    return job_response(job)
+
+async def get_authorized_job(job_id, claims):
+    """The job, if it exists and (for a user's job) the token belongs to its owner"""
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["user_id"] is not None:
+        authorize(claims, job["user_id"])
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0, claims: Optional[dict] = Depends(session_claims)):
+    """Job status and, once done, its result; wait=N long-polls up to 30 seconds"""
+    job = await get_authorized_job(job_id, claims)
+    if wait > 0:
+        job = await job_queue.wait(job_id, min(wait, 30))
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, claims: Optional[dict] = Depends(session_claims)):
+    """SSE: "status" events until the job finishes, then "result" (or "error") and "done" """
+    job = await get_authorized_job(job_id, claims)
     
-    <footer>
-        <p>&copy; {datetime.now().strftime('%Y')} {name} - Portfolio</p>
-        <p>Generated by Smart Project Assistant v3.5</p>
-    </footer>
-</body>
-</html>"""
+    async def events():
+        current = job
+        yield format_sse("status", {"status": current["status"]})
+        while current and current["status"] not in ("done", "failed"):
+            # Wake periodically so proxies see traffic on long jobs
+            current = await job_queue.wait(job_id, 15)
+            if current:
+                yield format_sse("status", {"status": current["status"]})
+        
+        if current and current["status"] == "done":
+            yield format_sse("result", current["result"])
+        else:
+            yield format_sse("error", {"message": current["error"] if current else "Job expired"})
+        yield format_sse("done", {})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 # ----------------------------
 # PROJECT MANAGEMENT
 # ----------------------------
 @app.post("/add-project-history")
-def add_project_history(project: dict):
+def add_project_history(project: dict, claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, project.get("user_id"))
     try:
-        project_id = database.add_project_history(
+        project_id = storage.add_project_history(
             project["user_id"],
             project["project_name"],
             project.get("project_type", "web"),
@@ -1059,61 +1148,186 @@ def add_project_history(project: dict):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/project-history/{user_id}")
-def get_project_history(user_id: int):
+PROJECT_PAGE_DEFAULT = 20
+PROJECT_PAGE_MAX = 100
+
+def encode_project_cursor(key):
+    """Opaque cursor for a (created_date, id) keyset position"""
+    if key is None:
+        return None
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_project_cursor(cursor):
+    if not cursor:
+        return None
     try:
-        projects = database.get_project_history(user_id)
-        return {"projects": projects}
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_date, project_id = json.loads(raw)
+        return str(created_date), int(project_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_project_fields(fields):
+    """fields=name,status,... -> tuple of columns (all columns when omitted)"""
+    if not fields:
+        return database.PROJECT_HISTORY_FIELDS
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in database.PROJECT_HISTORY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(requested)
+
+def clamp_page_limit(limit):
+    return max(1, min(limit, PROJECT_PAGE_MAX))
+
+@app.get("/project-history/{user_id}")
+def get_project_history(user_id: int, http_request: Request, limit: int = PROJECT_PAGE_DEFAULT,
+                        cursor: Optional[str] = None, fields: Optional[str] = None,
+                        claims: Optional[dict] = Depends(session_claims)):
+    """Newest-first page of projects; pass next_cursor back as cursor for the next page.
+    fields=project_name,status,... limits the columns returned (e.g. to skip notes)."""
+    authorize(claims, user_id)
+    after = decode_project_cursor(cursor)
+    columns = parse_project_fields(fields)
+    
+    def build():
+        page = storage.get_project_history_page(user_id, clamp_page_limit(limit), after, columns)
+        if page is None:
+            raise HTTPException(status_code=500, detail="Could not load project history")
+        
+        next_cursor = encode_project_cursor(page["next_key"])
+        return {"projects": page["projects"], "next_cursor": next_cursor, "has_more": next_cursor is not None}
+    
+    return conditional_json(http_request, user_id, build)
+
+@app.get("/project-history/{user_id}/count")
+def get_project_history_count(user_id: int, http_request: Request,
+                              claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, user_id)
+    def build():
+        counts = storage.count_project_history(user_id)
+        if counts is None:
+            raise HTTPException(status_code=500, detail="Could not count project history")
+        return counts
+    
+    return conditional_json(http_request, user_id, build)
 
 # ----------------------------
 # PROJECT CHECKLIST
 # ----------------------------
+DEFAULT_CHECKLIST = {
+    "idea_defined": False,
+    "profile_complete": False,
+    "documentation_started": False,
+    "code_structured": False,
+    "testing_done": False,
+    "deployment_ready": False
+}
+
+def build_checklist(profile, project_count, projects_with_notes):
+    """Checklist and score (0-100) from the profile and project counts"""
+    checklist = {
+        "idea_defined": project_count > 0,
+        "profile_complete": profile is not None,
+        "documentation_started": projects_with_notes > 0,
+        "code_structured": project_count > 1,  # Simplified check
+        "testing_done": False,  # Default
+        "deployment_ready": False  # Default
+    }
+    
+    # Calculate score
+    completed = sum(1 for value in checklist.values() if value)
+    score = int((completed / len(checklist)) * 100)
+    return checklist, score
+
 @app.get("/project-checklist/{user_id}")
-def get_project_checklist(user_id: int):
-    try:
-        # Get user profile to determine completion status
-        profile = database.get_student_profile(user_id)
-        projects = database.get_project_history(user_id)
-        
-        checklist = {
-            "idea_defined": len(projects) > 0,
-            "profile_complete": profile is not None,
-            "documentation_started": any(p.get("notes") for p in projects) if projects else False,
-            "code_structured": len(projects) > 1,  # Simplified check
-            "testing_done": False,  # Default
-            "deployment_ready": False  # Default
-        }
-        
-        # Calculate score
-        completed = sum(1 for value in checklist.values() if value)
-        total = len(checklist)
-        score = int((completed / total) * 100)
-        
-        return {"checklist": checklist, "score": score}
-    except Exception as e:
-        # Return default checklist
-        return {
-            "checklist": {
-                "idea_defined": False,
-                "profile_complete": False,
-                "documentation_started": False,
-                "code_structured": False,
-                "testing_done": False,
-                "deployment_ready": False
-            },
-            "score": 0
-        }
+def get_project_checklist(user_id: int, http_request: Request,
+                          claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, user_id)
+    def build():
+        try:
+            # Counts only: no project rows or exercises needed for the checklist
+            dashboard = storage.get_dashboard(user_id, project_limit=0, include_exercises=False)
+            if dashboard is None:
+                raise RuntimeError("Dashboard query failed")
+            
+            checklist, score = build_checklist(
+                dashboard["profile"], dashboard["project_count"], dashboard["projects_with_notes"]
+            )
+            return {"checklist": checklist, "score": score}
+        except Exception as e:
+            # Return default checklist
+            return {"checklist": dict(DEFAULT_CHECKLIST), "score": 0}
+    
+    return conditional_json(http_request, user_id, build)
+
+# ----------------------------
+# DASHBOARD
+# ----------------------------
+@app.get("/dashboard/{user_id}")
+def get_dashboard(user_id: int, http_request: Request, limit: int = PROJECT_PAGE_DEFAULT,
+                  cursor: Optional[str] = None, claims: Optional[dict] = Depends(session_claims)):
+    """Profile, a page of project history, exercises and the checklist in one response"""
+    authorize(claims, user_id)
+    limit = clamp_page_limit(limit)
+    after = decode_project_cursor(cursor)
+    return conditional_json(http_request, user_id, lambda: build_dashboard(user_id, limit, after))
+
+def build_dashboard(user_id, limit, after):
+    dashboard = storage.get_dashboard(user_id, project_limit=limit, project_after=after)
+    if dashboard is None:
+        raise HTTPException(status_code=500, detail="Could not load dashboard")
+    if dashboard["profile"] is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    checklist, score = build_checklist(
+        dashboard["profile"], dashboard["project_count"], dashboard["projects_with_notes"]
+    )
+    next_cursor = encode_project_cursor(dashboard["next_key"])
+    return {
+        "version": dashboard["version"],
+        "profile": dashboard["profile"],
+        "projects": dashboard["projects"],
+        "pagination": {
+            "total": dashboard["project_count"],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        },
+        "exercises": dashboard["exercises"],
+        "checklist": checklist,
+        "score": score
+    }
+
+# ----------------------------
+# INCREMENTAL SYNC
+# ----------------------------
+@app.get("/sync/{user_id}")
+def sync_user_data(user_id: int, http_request: Request, since: int = 0,
+                   claims: Optional[dict] = Depends(session_claims)):
+    """Rows written after version since; send the returned version as since next time.
+    profile is null when unchanged; projects and exercises hold only changed rows."""
+    authorize(claims, user_id)
+    def build():
+        changes = storage.get_changes_since(user_id, max(0, since))
+        if changes is None:
+            raise HTTPException(status_code=500, detail="Could not load changes")
+        return {**changes, "since": since, "changed": changes["version"] > since}
+    
+    return conditional_json(http_request, user_id, build)
 
 # ----------------------------
 # EXERCISE COMPLETION
 # ----------------------------
 @app.post("/complete-exercise/{user_id}/{exercise_type}")
-def complete_exercise(user_id: int, exercise_type: str):
+def complete_exercise(user_id: int, exercise_type: str, claims: Optional[dict] = Depends(session_claims)):
+    authorize(claims, user_id)
     try:
-        database.complete_exercise(user_id, exercise_type)
-        return {"message": "Exercise marked as complete"}
+        # Wait for the commit so a 200 means the completion is stored
+        if storage.complete_exercise(user_id, exercise_type, wait=True):
+            return {"message": "Exercise marked as complete"}
+        return {"message": "Exercise completion noted"}
     except Exception as e:
         # Don't raise error if exercise tracking fails
         return {"message": "Exercise completion noted"}
@@ -1138,6 +1352,24 @@ def evaluate_project(request: dict):
         }
     }
 
+# ----------------------------
+# LIFECYCLE
+# ----------------------------
+@app.on_event("startup")
+async def startup():
+    # Create the shared AI client (and its connection pool) once per process
+    openrouter_api.get_instance()
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    auth_pool.shutdown()
+    await openrouter_api.shutdown()
+    storage.close()
+    database.checkpoint_wal()
+    database.close_pool()
+
 # ----------------------------
 # HEALTH CHECK
 # ----------------------------
@@ -1145,6 +1377,26 @@ def evaluate_project(request: dict):
 def health_check():
     return {"status": "healthy", "version": "3.5", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+def metrics():
+    ai = get_ai()
+    return {
+        "ai_cache": ai.cache.stats() if ai else None,
+        "ai_single_flight": ai.flights.stats() if ai else None,
+        "ai_concurrency": ai.limiter.stats() if ai else None,
+        "ai_resilience": ai.resilience.stats() if ai else None,
+        "ai_models": ai.router.stats() if ai else None,
+        "ai_tokens": ai.usage.stats() if ai else None,
+        "ai_jobs": job_queue.stats(),
+        "ai_user_rate_limit": user_limiter.stats(),
+        "ai_ip_rate_limit": ip_limiter.stats(),
+        "auth_pool": auth_pool.stats(),
+        "auth_throttle": login_throttle.stats(),
+        "auth_sessions": session_tokens.stats(),
+        "db_pool": database._pool.stats(),
+        "storage": storage.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,21 @@
+-- Per-user lookups: turn WHERE user_id = ? scans into index range reads
+
+CREATE INDEX IF NOT EXISTS idx_project_history_user_created
+    ON project_history (user_id, created_date);
+
+CREATE INDEX IF NOT EXISTS idx_skill_exercises_user_type
+    ON skill_exercises (user_id, exercise_type);
+
+CREATE INDEX IF NOT EXISTS idx_skill_exercises_user_assigned
+    ON skill_exercises (user_id, date_assigned);
+
+-- Keep only the newest cache row per (user_id, skill_level, field) so the
+-- unique index below can be built on existing databases
+DELETE FROM ai_exercises_cache
+WHERE id NOT IN (
+    SELECT MAX(id) FROM ai_exercises_cache
+    GROUP BY user_id, skill_level, field
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_exercises_cache_key
+    ON ai_exercises_cache (user_id, skill_level, field);
@@ -0,0 +1,11 @@
+-- Persistent tier of the OpenRouter response cache (see response_cache.py)
+
+CREATE TABLE IF NOT EXISTS ai_response_cache
+    (cache_key TEXT PRIMARY KEY,
+     feature TEXT,
+     response_json TEXT NOT NULL,
+     expires_at REAL NOT NULL,
+     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+
+CREATE INDEX IF NOT EXISTS idx_ai_response_cache_expires
+    ON ai_response_cache (expires_at);
@@ -0,0 +1,13 @@
+-- AI exercise cache entries are shared across users: key them by
+-- (skill_level, field) and keep user_id only as "last requested by"
+
+DROP INDEX IF EXISTS idx_ai_exercises_cache_key;
+
+DELETE FROM ai_exercises_cache
+WHERE id NOT IN (
+    SELECT MAX(id) FROM ai_exercises_cache
+    GROUP BY skill_level, field
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_exercises_cache_shared_key
+    ON ai_exercises_cache (skill_level, field);
@@ -0,0 +1,19 @@
+-- Background generation jobs (see jobs.py). status: queued | running | done | failed
+
+CREATE TABLE IF NOT EXISTS ai_jobs
+    (id TEXT PRIMARY KEY,
+     kind TEXT NOT NULL,
+     dedup_key TEXT NOT NULL,
+     user_id INTEGER,
+     status TEXT NOT NULL,
+     payload_json TEXT NOT NULL,
+     result_json TEXT,
+     error TEXT,
+     created_at REAL NOT NULL,
+     updated_at REAL NOT NULL);
+
+CREATE INDEX IF NOT EXISTS idx_ai_jobs_dedup
+    ON ai_jobs (dedup_key, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_ai_jobs_status
+    ON ai_jobs (status, updated_at);
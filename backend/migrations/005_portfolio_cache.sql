@@ -0,0 +1,6 @@
+-- Cache the last AI-generated portfolio per user, keyed by a hash of the
+-- PortfolioData it was generated from (see main.build_portfolio)
+
+ALTER TABLE portfolio_data ADD COLUMN input_hash TEXT;
+
+ALTER TABLE portfolio_data ADD COLUMN portfolio_html TEXT;
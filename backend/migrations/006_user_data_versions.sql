@@ -0,0 +1,20 @@
+-- Per-user data version for ETags and incremental sync (see main.conditional_json
+-- and /sync). Every write to a user's profile, projects or exercises bumps
+-- user_data_versions.version and stamps the changed rows with the new value.
+
+CREATE TABLE IF NOT EXISTS user_data_versions
+    (user_id INTEGER PRIMARY KEY,
+     version INTEGER NOT NULL DEFAULT 0,
+     FOREIGN KEY (user_id) REFERENCES users (id));
+
+ALTER TABLE student_profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE project_history ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE skill_exercises ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_project_history_user_version
+    ON project_history (user_id, version);
+
+CREATE INDEX IF NOT EXISTS idx_skill_exercises_user_version
+    ON skill_exercises (user_id, version);
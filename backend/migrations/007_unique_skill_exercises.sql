@@ -0,0 +1,28 @@
+-- One skill_exercises row per (user_id, exercise_type). Earlier versions
+-- inserted a fresh set on every profile save; compact those duplicates,
+-- keeping the oldest row and carrying over any completion, then enforce
+-- uniqueness so assign_initial_exercises can upsert.
+
+UPDATE skill_exercises
+SET completed = 1,
+    date_completed = (SELECT MIN(d.date_completed) FROM skill_exercises d
+                      WHERE d.user_id = skill_exercises.user_id
+                        AND d.exercise_type = skill_exercises.exercise_type
+                        AND d.completed = 1)
+WHERE completed = 0
+  AND EXISTS (SELECT 1 FROM skill_exercises d
+              WHERE d.user_id = skill_exercises.user_id
+                AND d.exercise_type = skill_exercises.exercise_type
+                AND d.completed = 1);
+
+DELETE FROM skill_exercises
+WHERE id NOT IN (
+    SELECT MIN(id) FROM skill_exercises
+    GROUP BY user_id, exercise_type
+);
+
+-- The unique index serves the same lookups as the old non-unique one
+DROP INDEX IF EXISTS idx_skill_exercises_user_type;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_skill_exercises_user_type
+    ON skill_exercises (user_id, exercise_type);
@@ -0,0 +1,14 @@
+-- Long-lived refresh tokens behind the stateless access tokens
+-- (see session_tokens.py). Only the SHA-256 of each token is stored; a token
+-- is single-use and replaced on every refresh.
+
+CREATE TABLE IF NOT EXISTS refresh_tokens
+    (token_hash TEXT PRIMARY KEY,
+     user_id INTEGER NOT NULL,
+     expires_at REAL NOT NULL,
+     revoked INTEGER NOT NULL DEFAULT 0,
+     created_at REAL NOT NULL,
+     FOREIGN KEY (user_id) REFERENCES users (id));
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user
+    ON refresh_tokens (user_id);
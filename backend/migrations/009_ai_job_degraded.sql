@@ -0,0 +1,5 @@
+-- Jobs that finished with fallback content (upstream failure or open
+-- circuit) are marked degraded: the client still gets the fallback result,
+-- but find_ai_job never hands it to a later identical submission.
+
+ALTER TABLE ai_jobs ADD COLUMN degraded INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import time
+
+AI_DEFAULT_MODEL = os.getenv('AI_DEFAULT_MODEL', 'deepseek/deepseek-chat')
+
+# Relative cost per model (USD per 1M output tokens); override with a JSON
+# object in AI_MODEL_COSTS. Models not listed count as cost 0.
+AI_MODEL_COSTS = {
+    'meta-llama/llama-3.1-8b-instruct': 0.05,
+    'openai/gpt-4o-mini': 0.6,
+    'deepseek/deepseek-chat': 1.1,
+}
+AI_MODEL_COSTS.update(json.loads(os.getenv('AI_MODEL_COSTS', '{}')))
+
+# Candidate models per feature, in preference order, and the most a model
+# may cost for that feature. Override with a JSON object in AI_MODEL_ROUTES,
+# e.g. {"version_control": {"models": ["openai/gpt-4o-mini"], "max_cost": 1}}
+AI_MODEL_ROUTES = {
+    # Short, formulaic output: fast small models first
+    'version_control': {'models': ['meta-llama/llama-3.1-8b-instruct', 'openai/gpt-4o-mini', AI_DEFAULT_MODEL], 'max_cost': 1.5},
+    'project_ideas': {'models': ['openai/gpt-4o-mini', AI_DEFAULT_MODEL], 'max_cost': 1.5},
+    'skill_recommendations': {'models': ['openai/gpt-4o-mini', AI_DEFAULT_MODEL], 'max_cost': 1.5},
+    'roadmap': {'models': ['openai/gpt-4o-mini', AI_DEFAULT_MODEL], 'max_cost': 1.5},
+    # Long or code-heavy output: the stronger model first
+    'code_snippet': {'models': [AI_DEFAULT_MODEL, 'openai/gpt-4o-mini'], 'max_cost': 1.5},
+    'documentation': {'models': [AI_DEFAULT_MODEL, 'openai/gpt-4o-mini'], 'max_cost': 1.5},
+    'portfolio': {'models': [AI_DEFAULT_MODEL, 'openai/gpt-4o-mini'], 'max_cost': 1.5},
+}
+AI_MODEL_ROUTES.update(json.loads(os.getenv('AI_MODEL_ROUTES', '{}')))
+
+AI_ROUTER_MIN_SAMPLES = int(os.getenv('AI_ROUTER_MIN_SAMPLES', '5'))
+AI_ROUTER_MAX_ERROR_RATE = float(os.getenv('AI_ROUTER_MAX_ERROR_RATE', '0.5'))
+AI_ROUTER_RECOVERY = float(os.getenv('AI_ROUTER_RECOVERY', '60'))    # seconds
+AI_ROUTER_EXPLORE = float(os.getenv('AI_ROUTER_EXPLORE', '0.05'))    # share of calls probing another model
+AI_ROUTER_FAILOVER_SHARE = float(os.getenv('AI_ROUTER_FAILOVER_SHARE', '0.6'))  # of the remaining timeout, per non-final model
+
+class ModelStats:
+    """Exponentially weighted latency and error rate for one model"""
+
+    def __init__(self, latency_alpha=0.2, error_alpha=0.1):
+        self.latency_alpha = latency_alpha
+        self.error_alpha = error_alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_failure = 0.0
+
+    def record(self, latency, ok):
+        self.calls += 1
+        if ok:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.latency_alpha * (latency - self.latency)
+        else:
+            self.errors += 1
+            self.last_failure = time.monotonic()
+        self.error_rate += self.error_alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def healthy(self):
+        if self.error_rate <= AI_ROUTER_MAX_ERROR_RATE:
+            return True
+        # Errors only decay on use; give an idle failing model another chance
+        return time.monotonic() - self.last_failure > AI_ROUTER_RECOVERY
+
+    def known(self):
+        return self.calls - self.errors >= AI_ROUTER_MIN_SAMPLES
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'latency_ewma': round(self.latency, 3) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+        }
+
+class ModelRouter:
+    """Pick the model order for a feature from its route and observed health.
+
+    Models over the route's cost budget are dropped. Healthy models come
+    first: those with enough samples are ordered fastest first, the rest keep
+    their configured position. Unhealthy models stay at the end as a last
+    resort, so a call can fail over when one provider is slow or down.
+    """
+
+    def __init__(self, routes=None, costs=None, default_model=AI_DEFAULT_MODEL):
+        self.routes = routes if routes is not None else AI_MODEL_ROUTES
+        self.costs = costs if costs is not None else AI_MODEL_COSTS
+        self.default_model = default_model
+        self._models = {}
+
+    def model_stats(self, model):
+        if model not in self._models:
+            self._models[model] = ModelStats()
+        return self._models[model]
+
+    def route_models(self, feature):
+        """Configured candidates for a feature within its cost budget"""
+        route = self.routes.get(feature) or {'models': [self.default_model]}
+        models = list(dict.fromkeys(route.get('models') or [self.default_model]))
+        max_cost = route.get('max_cost')
+        if max_cost is not None:
+            affordable = [m for m in models if self.costs.get(m, 0) <= max_cost]
+            models = affordable or models
+        return models
+
+    def candidates(self, feature):
+        models = self.route_models(feature)
+        healthy = [m for m in models if self.model_stats(m).healthy()]
+        unhealthy = [m for m in models if m not in healthy]
+
+        known = sorted((m for m in healthy if self.model_stats(m).known()),
+                       key=lambda m: self.model_stats(m).latency)
+        # Known models slot into the configured order fastest first
+        known_iter = iter(known)
+        ordered = [next(known_iter) if self.model_stats(m).known() else m for m in healthy]
+
+        if len(ordered) > 1 and random.random() < AI_ROUTER_EXPLORE:
+            probe = random.choice(ordered[1:])
+            ordered.remove(probe)
+            ordered.insert(0, probe)
+        return ordered + unhealthy
+
+    def record(self, model, latency, ok):
+        self.model_stats(model).record(latency, ok)
+
+    def stats(self):
+        return {model: s.stats() for model, s in self._models.items()}
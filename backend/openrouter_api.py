@@ -1,279 +1,391 @@
 import os
-import requests
+import time
+import httpx
 import json
 from dotenv import load_dotenv
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from rate_limiting import AdaptiveConcurrencyLimiter, spend_deferred_charge
+from resilience import Resilience, UpstreamFailure, CircuitOpenError, parse_retry_after
+import prompts
+from model_router import ModelRouter, AI_DEFAULT_MODEL, AI_ROUTER_FAILOVER_SHARE
 
 load_dotenv()
 
+# HTTP/2 needs the optional "h2" package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection pool settings for the shared OpenRouter client
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv('OPENROUTER_MAX_CONNECTIONS', '100'))
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv('OPENROUTER_MAX_KEEPALIVE', '20'))
+OPENROUTER_KEEPALIVE_EXPIRY = float(os.getenv('OPENROUTER_KEEPALIVE_EXPIRY', '60'))
+OPENROUTER_HTTP2 = os.getenv('OPENROUTER_HTTP2', 'auto').lower()
+
+# Upstream responses that mean "back off" to the concurrency limiter
+OVERLOAD_STATUS_CODES = {429, 502, 503, 504}
+
+class OpenRouterError(Exception):
+    """Raised by streaming calls when the upstream request fails"""
+
 class OpenRouterAI:
     def __init__(self):
         self.api_key = os.getenv('OPENROUTER_API_KEY')
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "deepseek/deepseek-chat"
+        self.model = AI_DEFAULT_MODEL
+        self.temperature = 0.7
+        self.cache = ResponseCache()
+        self.flights = SingleFlight()
+        self.limiter = AdaptiveConcurrencyLimiter()
+        self.resilience = Resilience()
+        self.router = ModelRouter(default_model=self.model)
+        self.usage = prompts.TokenUsage()
+        self._client = None
+
+    ###########################################################################
+    # HTTP CLIENT (one pooled keep-alive session per process)
+    ###########################################################################
+    def _create_client(self):
+        if OPENROUTER_HTTP2 == 'auto':
+            http2 = HTTP2_AVAILABLE
+        else:
+            http2 = OPENROUTER_HTTP2 in ('1', 'true', 'yes') and HTTP2_AVAILABLE
+
+        limits = httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE,
+            keepalive_expiry=OPENROUTER_KEEPALIVE_EXPIRY
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     ###########################################################################
     # INTERNAL API CALL FUNCTION
     ###########################################################################
-    def _call_api(self, prompt, json_response=False, timeout=45):
+    async def _call_api(self, prompt, json_response=False, timeout=45, feature=None, bypass_cache=False):
+        """Cached, single-flight upstream call; bypass_cache skips the lookup
+        (a refresh) but still stores a successful result"""
         if not self.api_key:
             return {"error": "API key missing"}
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Keyed on the feature's route (and budget), not the model that happens to answer
+        route = "|".join(self.router.route_models(feature)) + f"#{prompts.max_tokens_for(feature)}"
+        cache_key = make_cache_key(route, prompt, self.temperature, json_response)
+        if not bypass_cache:
+            cached = await self.cache.get(cache_key, feature)
+            if cached is not None:
+                return cached
+
+        # Only the request that leads a new upstream call pays its rate limit
+        # charge; no await between this check and flights.do()
+        if not self.flights.in_flight(cache_key):
+            spend_deferred_charge()
+
+        # Identical concurrent requests share one upstream call (and one limiter slot)
+        async def fetch():
+            async with self.limiter.slot() as report:
+                result = await self._request(prompt, json_response, timeout, report, feature)
+            if not (isinstance(result, dict) and "error" in result):
+                await self.cache.set(cache_key, result, feature)
+            return result
+
+        return await self.flights.do(cache_key, fetch)
+
+    async def _request(self, prompt, json_response=False, timeout=45, report=None, feature=None):
+        """Try the feature's models in router order until one succeeds"""
+        deadline = time.monotonic() + timeout
+        result = {"error": "No AI model available"}
+
+        candidates = self.router.candidates(feature)
+        for index, model in enumerate(candidates):
+            remaining = deadline - time.monotonic()
+            if remaining <= 1:
+                break
+            # Leave time to fail over when a provider is slow
+            if index < len(candidates) - 1:
+                remaining *= AI_ROUTER_FAILOVER_SHARE
+
+            started = time.monotonic()
+            try:
+                result = await self._complete(prompt, model, json_response, remaining, report, feature)
+            except CircuitOpenError as e:
+                # Not a new data point for the model; just skip it
+                result = {"error": str(e)}
+                continue
+            except Exception as e:
+                result = {"error": str(e)}
+
+            ok = not (isinstance(result, dict) and "error" in result)
+            self.router.record(model, time.monotonic() - started, ok)
+            if ok:
+                break
 
+        return result
+
+    async def _complete(self, prompt, model, json_response=False, timeout=45, report=None, feature=None):
+        """One logical completion on one model; raises when upstream fails"""
         payload = {
-            "model": self.model,
+            "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 2000,
-            "temperature": 0.7
+            "max_tokens": prompts.max_tokens_for(feature),
+            "temperature": self.temperature
         }
 
         if json_response:
             payload["response_format"] = {"type": "json_object"}
 
-        try:
-            response = requests.post(
-                self.base_url, json=payload, headers=headers, timeout=timeout
-            )
+        async def attempt(attempt_timeout):
+            try:
+                response = await self.client.post(
+                    self.base_url, json=payload, timeout=attempt_timeout
+                )
+            except httpx.TimeoutException as e:
+                if report:
+                    report(False)
+                raise UpstreamFailure(str(e) or "Request timed out", retryable=True)
+            except httpx.TransportError as e:
+                raise UpstreamFailure(str(e) or type(e).__name__, retryable=True)
+
             if response.status_code != 200:
-                return {"error": response.text}
+                overloaded = response.status_code in OVERLOAD_STATUS_CODES
+                if report and overloaded:
+                    report(False)
+                raise UpstreamFailure(
+                    response.text,
+                    status=response.status_code,
+                    retryable=overloaded or response.status_code >= 500,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+            body = response.json()
+            self.usage.record(feature, body.get("usage"))
+            return body["choices"][0]["message"]["content"]
+
+        # Retries, hedging and the per-model circuit breaker live in Resilience;
+        # an open circuit raises CircuitOpenError without calling upstream
+        content = await self.resilience.call(model, attempt, timeout)
 
-            content = response.json()["choices"][0]["message"]["content"]
+        if json_response:
+            try:
+                return json.loads(content)
+            except:
+                return {"error": "Invalid JSON", "raw": content}
+
+        return content
+
+    def _stream_model(self, feature):
+        """First routed model whose circuit admits a call (streams do not fail over)"""
+        error = None
+        for model in self.router.candidates(feature):
+            try:
+                self.resilience.admit(model)
+                return model
+            except CircuitOpenError as e:
+                error = e
+        raise OpenRouterError(str(error or "No AI model available"))
+
+    async def _stream_api(self, prompt, json_response=False, timeout=45, feature=None):
+        """Yield content deltas from a streamed (stream: true) completion"""
+        if not self.api_key:
+            raise OpenRouterError("API key missing")
+        model = self._stream_model(feature)
+        breaker = self.resilience.breaker(model)
 
-            if json_response:
-                try:
-                    return json.loads(content)
-                except:
-                    return {"error": "Invalid JSON", "raw": content}
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": prompts.max_tokens_for(feature),
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+
+        if json_response:
+            payload["response_format"] = {"type": "json_object"}
 
-            return content
+        async with self.limiter.slot(measure_latency=False) as report, self.client.stream(
+            "POST", self.base_url, json=payload, timeout=timeout
+        ) as response:
+            if response.status_code != 200:
+                if response.status_code in OVERLOAD_STATUS_CODES:
+                    report(False)
+                if response.status_code in OVERLOAD_STATUS_CODES or response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                body = await response.aread()
+                raise OpenRouterError(body.decode("utf-8", "replace"))
+            # Streams are not retried (deltas are already sent); they only feed the breaker
+            breaker.record_success()
+
+            async for line in response.aiter_lines():
+                # Blank lines separate events; ":" lines are keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
 
-        except Exception as e:
-            return {"error": str(e)}
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                if "error" in chunk:
+                    raise OpenRouterError(str(chunk["error"]))
+                if chunk.get("usage"):
+                    self.usage.record(feature, chunk["usage"])
+
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
 
     ###########################################################################
     # 1) PROJECT IDEA GENERATOR
     ###########################################################################
-    def generate_project_ideas(self, domain, skill_level, count=5):
-        prompt = f"""
-        Generate {count} unique, practical {domain} project ideas suitable for {skill_level} students.
-
-        Return STRICT JSON:
-        {{
-            "ideas": [
-                {{
-                    "name": "...",
-                    "description": "...",
-                    "features": ["...", "..."],
-                    "skills": ["...", "..."],
-                    "timeline": "2–4 weeks",
-                    "difficulty": "Easy/Medium/Hard"
-                }}
-            ]
-        }}
-        """
-
-        result = self._call_api(prompt, json_response=True)
+    async def generate_project_ideas(self, domain, skill_level, count=5):
+        prompt = prompts.project_ideas_prompt(domain, skill_level, count)
+
+        result = await self._call_api(prompt, json_response=True, feature="project_ideas")
         if isinstance(result, dict) and "error" in result:
             return result
         return result
 
-    def get_project_ideas(self, domain, skill_level, count=5):
-        return self.generate_project_ideas(domain, skill_level, count)
+    async def get_project_ideas(self, domain, skill_level, count=5):
+        return await self.generate_project_ideas(domain, skill_level, count)
 
     ###########################################################################
     # 2) DOCUMENTATION GENERATOR (TEXT FILE CONTENT)
     ###########################################################################
-    def generate_documentation(self, project_details):
-        prompt = f"""
-        Generate FULL project documentation in clean TEXT format, no markdown.
-
-        PROJECT DETAILS:
-        {project_details}
-
-        INCLUDE:
-        - Overview
-        - Objectives
-        - Tech Stack
-        - Architecture
-        - Features
-        - Installation
-        - Usage
-        - API Reference
-        - Deployment
-        - Future Enhancements
-
-        Return plain text only.
-        """
-
-        result = self._call_api(prompt)
+    def _documentation_prompt(self, project_details):
+        return prompts.documentation_prompt(project_details)
+
+    async def generate_documentation(self, project_details):
+        result = await self._call_api(self._documentation_prompt(project_details), feature="documentation")
         if isinstance(result, dict) and "error" in result:
-            return {"documentation": f"Error generating documentation: {result['error']}"}
+            # Let the caller serve its fallback document instead of the error text
+            return result
         return {"documentation": result}
 
+    def stream_documentation(self, project_details):
+        return self._stream_api(self._documentation_prompt(project_details), feature="documentation")
+
     ###########################################################################
     # 3) CODE SNIPPET GENERATOR
     ###########################################################################
-    def generate_code_snippet(self, language, prompt, complexity="beginner"):
-        full_prompt = f"""
-        Generate a {complexity} level {language} code snippet for: "{prompt}"
-
-        Return STRICT JSON:
-        {{
-            "title": "Descriptive title for the code snippet",
-            "code": "The complete code with proper formatting and comments",
-            "explanation": "Clear explanation of what the code does and how it works",
-            "usage_example": "Example of how to use or call the code"
-        }}
-
-        Make sure the code is suitable for {complexity} level programmers.
-        Include proper comments and error handling where appropriate.
-        """
-
-        result = self._call_api(full_prompt, json_response=True)
+    def _code_snippet_prompt(self, language, prompt, complexity):
+        return prompts.code_snippet_prompt(language, prompt, complexity)
+
+    async def generate_code_snippet(self, language, prompt, complexity="beginner"):
+        full_prompt = self._code_snippet_prompt(language, prompt, complexity)
+        result = await self._call_api(full_prompt, json_response=True, feature="code_snippet")
         if isinstance(result, dict) and "error" in result:
-            # Fallback structure
-            return {
-                "title": f"{language.title()} Code for: {prompt}",
-                "code": f"# {prompt}\n# Code generation failed\n# Please try again",
-                "explanation": f"This code would implement {prompt}",
-                "usage_example": "Example usage would go here"
-            }
+            # Let the caller serve its fallback snippet
+            return result
         return result
 
+    def stream_code_snippet(self, language, prompt, complexity="beginner"):
+        full_prompt = self._code_snippet_prompt(language, prompt, complexity)
+        return self._stream_api(full_prompt, json_response=True, feature="code_snippet")
+
     ###########################################################################
     # 4) SKILL ENHANCEMENT AI
     ###########################################################################
-    def generate_skill_recommendations(self, skill_level, interests, user_id=None):
-        prompt = f"""
-        Generate personalized skill exercises and learning recommendations for a {skill_level} level student.
-
-        Student interests: {interests}
-
-        Return STRICT JSON with an array of exercises:
-        [
-            {{
-                "title": "Exercise Title",
-                "description": "Detailed description of the exercise",
-                "difficulty": "Beginner/Intermediate/Advanced",
-                "estimated_time": "2-3 hours",
-                "video_url": "YouTube search URL for relevant tutorials"
-            }}
-        ]
-
-        Generate 3-5 practical exercises that cover different aspects of programming.
-        Make them hands-on and implementable.
-        """
-
-        result = self._call_api(prompt, json_response=True)
+    async def generate_skill_recommendations(self, skill_level, interests, user_id=None, bypass_cache=False):
+        prompt = prompts.skill_recommendations_prompt(skill_level, interests)
+
+        result = await self._call_api(prompt, json_response=True, feature="skill_recommendations",
+                                      bypass_cache=bypass_cache)
         if isinstance(result, dict) and "error" in result:
             return result
         return result
 
-    def generate_skill_exercises(self, skill_level, interests, user_id=None):
-        return self.generate_skill_recommendations(skill_level, interests, user_id)
+    async def generate_skill_exercises(self, skill_level, interests, user_id=None):
+        return await self.generate_skill_recommendations(skill_level, interests, user_id)
 
     ###########################################################################
     # 5) VERSION CONTROL MODE (COMMANDS ONLY)
     ###########################################################################
-    def generate_version_control_help(self, request):
+    async def generate_version_control_help(self, request):
         # If user asks for code → give error
         forbidden_words = ["code", "program", "script", "build", "function"]
 
         if any(word in request.lower() for word in forbidden_words):
             return {"error": "This mode ONLY generates commands. Not code."}
 
-        prompt = f"""
-        User needs commands for: "{request}"
-
-        Generate ONLY commands (Git, Docker, CMD, PowerShell, Linux commands).
+        prompt = prompts.version_control_prompt(request)
 
-        Return STRICT JSON:
-        {{
-            "commands": "Complete guide text with commands and explanations"
-        }}
-
-        Format with clear sections and use markdown code blocks for commands.
-        """
-
-        result = self._call_api(prompt, json_response=True)
+        result = await self._call_api(prompt, json_response=True, feature="version_control")
         if isinstance(result, dict) and "error" in result:
             return result
         return result
 
-    def version_control_commands(self, request):
-        return self.generate_version_control_help(request)
+    async def version_control_commands(self, request):
+        return await self.generate_version_control_help(request)
 
     ###########################################################################
     # 6) MODERN HTML PORTFOLIO GENERATOR
     ###########################################################################
-    def generate_portfolio_html(self, data):
-        prompt = f"""
-        Create a MODERN portfolio HTML (FULL DOCUMENT) with animations.
-
-        USER INFO:
-        {json.dumps(data, indent=2)}
-
-        Requirements:
-        - Fully responsive modern UI
-        - Smooth animations
-        - Sections:
-            - Name
-            - Contact
-            - College Name
-            - About/Bio
-            - Tech Stack (grid)
-            - Projects (cards)
-            - Footer
-        - Clean CSS inside <style>
-        - Attractive buttons
-        - Glassmorphism style
-        - No external dependencies except Google Fonts
-
-        Return the complete HTML code as a string.
-        """
-
-        result = self._call_api(prompt)
+    def _portfolio_prompt(self, data):
+        return prompts.portfolio_prompt(data)
+
+    async def generate_portfolio_html(self, data):
+        result = await self._call_api(self._portfolio_prompt(data), feature="portfolio")
         if isinstance(result, dict) and "error" in result:
-            return {"html": "<html><body><h1>Error generating portfolio</h1></body></html>"}
+            # Let the caller fall back to its template instead of serving an error page
+            return result
         return {"html": result}
 
-    def generate_portfolio(self, data):
-        return self.generate_portfolio_html(data)
+    async def generate_portfolio(self, data):
+        return await self.generate_portfolio_html(data)
+
+    def stream_portfolio_html(self, data):
+        return self._stream_api(self._portfolio_prompt(data), feature="portfolio")
 
     ###########################################################################
     # 7) PROJECT PLANNER ROADMAP (for backward compatibility)
     ###########################################################################
-    def generate_project_roadmap(self, project_name, details, members, time_limit):
-        prompt = f"""
-        Create a detailed roadmap for a project.
-
-        PROJECT NAME: {project_name}
-        DETAILS: {details}
-        TEAM MEMBERS: {members}
-        TIME AVAILABLE: {time_limit}
-
-        Return STRICT JSON:
-        {{
-            "overview": "...",
-            "phases": [
-                {{
-                    "phase": "Planning",
-                    "duration": "2 days",
-                    "tasks": ["task1", "task2"]
-                }},
-                {{
-                    "phase": "Development",
-                    "duration": "2 weeks",
-                    "tasks": ["task1", "task2"]
-                }}
-            ],
-            "final_notes": "..."
-        }}
-        """
-
-        return self._call_api(prompt, json_response=True)
+    async def generate_project_roadmap(self, project_name, details, members, time_limit):
+        prompt = prompts.roadmap_prompt(project_name, details, members, time_limit)
+
+        return await self._call_api(prompt, json_response=True, feature="roadmap")
+
+###############################################################################
+# PROCESS-WIDE INSTANCE
+###############################################################################
+_instance = None
+
+def get_instance():
+    """Return the shared OpenRouterAI client, creating it on first use"""
+    global _instance
+    if _instance is None:
+        _instance = OpenRouterAI()
+    return _instance
+
+async def shutdown():
+    """Close the shared client's connection pool"""
+    global _instance
+    if _instance is not None:
+        await _instance.aclose()
+    _instance = None
 
 # END OF FILE
\ No newline at end of file
@@ -0,0 +1,103 @@
+-- PostgreSQL schema for postgres_storage.PostgresStorage: the same tables
+-- and keys as the SQLite schema after migrations/008. Applied on startup;
+-- every statement is idempotent, so later changes append statements here
+-- (ADD COLUMN IF NOT EXISTS etc.) rather than editing existing ones.
+--
+-- Timestamps are UTC TIMESTAMP(0) truncated to the second like SQLite's
+-- CURRENT_TIMESTAMP, so the formatted values and the project history keyset
+-- cursors match exactly.
+
+CREATE OR REPLACE FUNCTION utc_now() RETURNS TIMESTAMP(0) AS
+    $$ SELECT date_trunc('second', now() AT TIME ZONE 'utc') $$
+    LANGUAGE SQL STABLE;
+
+CREATE TABLE IF NOT EXISTS users
+    (id SERIAL PRIMARY KEY,
+     username TEXT UNIQUE NOT NULL,
+     password_hash TEXT NOT NULL,
+     email TEXT,
+     created_at TIMESTAMP(0) DEFAULT utc_now());
+
+CREATE TABLE IF NOT EXISTS student_profiles
+    (user_id INTEGER PRIMARY KEY REFERENCES users (id),
+     college_name TEXT,
+     branch TEXT,
+     semester TEXT,
+     skill_level TEXT CHECK (skill_level IN ('beginner', 'intermediate', 'advanced')),
+     current_projects TEXT,
+     created_at TIMESTAMP(0) DEFAULT utc_now(),
+     updated_at TIMESTAMP(0) DEFAULT utc_now(),
+     version INTEGER NOT NULL DEFAULT 0);
+
+CREATE TABLE IF NOT EXISTS project_history
+    (id SERIAL PRIMARY KEY,
+     user_id INTEGER REFERENCES users (id),
+     project_name TEXT,
+     project_type TEXT,
+     domain TEXT,
+     status TEXT DEFAULT 'planned',
+     created_date TIMESTAMP(0) DEFAULT utc_now(),
+     completed_date TIMESTAMP(0),
+     notes TEXT,
+     version INTEGER NOT NULL DEFAULT 0);
+
+CREATE TABLE IF NOT EXISTS skill_exercises
+    (id SERIAL PRIMARY KEY,
+     user_id INTEGER REFERENCES users (id),
+     exercise_type TEXT,
+     description TEXT,
+     completed BOOLEAN NOT NULL DEFAULT FALSE,
+     date_assigned TIMESTAMP(0) DEFAULT utc_now(),
+     date_completed TIMESTAMP(0),
+     video_url TEXT,
+     difficulty TEXT,
+     estimated_time TEXT,
+     version INTEGER NOT NULL DEFAULT 0);
+
+CREATE TABLE IF NOT EXISTS ai_exercises_cache
+    (id SERIAL PRIMARY KEY,
+     user_id INTEGER REFERENCES users (id),
+     skill_level TEXT,
+     field TEXT,
+     exercises_json TEXT,
+     created_at TIMESTAMP(0) DEFAULT utc_now());
+
+CREATE TABLE IF NOT EXISTS portfolio_data
+    (id SERIAL PRIMARY KEY,
+     user_id INTEGER UNIQUE REFERENCES users (id),
+     portfolio_json TEXT,
+     input_hash TEXT,
+     portfolio_html TEXT,
+     last_updated TIMESTAMP(0) DEFAULT utc_now());
+
+CREATE TABLE IF NOT EXISTS user_data_versions
+    (user_id INTEGER PRIMARY KEY REFERENCES users (id),
+     version INTEGER NOT NULL DEFAULT 0);
+
+CREATE TABLE IF NOT EXISTS refresh_tokens
+    (token_hash TEXT PRIMARY KEY,
+     user_id INTEGER NOT NULL REFERENCES users (id),
+     expires_at DOUBLE PRECISION NOT NULL,
+     revoked INTEGER NOT NULL DEFAULT 0,
+     created_at DOUBLE PRECISION NOT NULL);
+
+CREATE INDEX IF NOT EXISTS idx_project_history_user_created
+    ON project_history (user_id, created_date, id);
+
+CREATE INDEX IF NOT EXISTS idx_project_history_user_version
+    ON project_history (user_id, version);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_skill_exercises_user_type
+    ON skill_exercises (user_id, exercise_type);
+
+CREATE INDEX IF NOT EXISTS idx_skill_exercises_user_assigned
+    ON skill_exercises (user_id, date_assigned);
+
+CREATE INDEX IF NOT EXISTS idx_skill_exercises_user_version
+    ON skill_exercises (user_id, version);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_exercises_cache_shared_key
+    ON ai_exercises_cache (skill_level, field);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user
+    ON refresh_tokens (user_id);
@@ -0,0 +1,534 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+import database
+from storage import Storage
+
+# asyncpg pool shared by every request thread of this node; size it so that
+# nodes * POSTGRES_POOL_MAX stays under the server's max_connections
+POSTGRES_POOL_MIN = int(os.getenv('POSTGRES_POOL_MIN', '1'))
+POSTGRES_POOL_MAX = int(os.getenv('POSTGRES_POOL_MAX', '10'))
+POSTGRES_TIMEOUT = float(os.getenv('POSTGRES_TIMEOUT', '10'))  # seconds per storage call
+POSTGRES_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'postgres_schema.sql')
+
+# Serializes schema setup when several nodes start at once
+SCHEMA_LOCK_ID = 7261001
+
+TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS'
+TIMESTAMP_FIELDS = ('created_at', 'created_date', 'completed_date', 'date_assigned', 'date_completed')
+
+PROFILE_COLUMNS = 'college_name, branch, semester, skill_level, current_projects'
+
+DB_ERRORS = (OSError, TimeoutError) + ((asyncpg.PostgresError, asyncpg.InterfaceError) if asyncpg else ())
+
+def _column(name):
+    """Select a column, formatting timestamps the way SQLite returns them"""
+    if name in TIMESTAMP_FIELDS:
+        return f"to_char({name}, '{TIMESTAMP_FORMAT}') AS {name}"
+    return name
+
+def _columns(names):
+    return ', '.join(_column(name) for name in names)
+
+PROJECT_COLUMNS = _columns(database.PROJECT_HISTORY_FIELDS)
+EXERCISE_COLUMNS = _columns(('exercise_type', 'description', 'completed', 'date_assigned',
+                             'date_completed', 'video_url', 'difficulty', 'estimated_time'))
+
+def _storage_call(default):
+    """Run the decorated coroutine on the storage event loop from a sync caller.
+
+    Driver errors and timeouts are logged and turned into default, matching
+    how database.py reports failures.
+    """
+    def decorator(coro_func):
+        @functools.wraps(coro_func)
+        def wrapper(self, *args, **kwargs):
+            self._stats['calls'] += 1
+            try:
+                return self._call(coro_func(self, *args, **kwargs))
+            except DB_ERRORS as e:
+                self._stats['errors'] += 1
+                print(f"❌ Postgres error in {coro_func.__name__}: {e}")
+                return default
+        return wrapper
+    return decorator
+
+class PostgresStorage(Storage):
+    """Storage on PostgreSQL through an asyncpg connection pool.
+
+    The pool lives on a private event loop thread; the synchronous Storage
+    methods submit coroutines to it, so request threads, job workers and
+    async endpoints (via asyncio.to_thread) all share one pool. Concurrent
+    writers are handled by the server, so the write-behind buffer is not
+    used and wait= is accepted only for interface compatibility.
+    """
+
+    name = 'postgres'
+
+    def __init__(self, dsn, min_size=POSTGRES_POOL_MIN, max_size=POSTGRES_POOL_MAX, timeout=POSTGRES_TIMEOUT):
+        if asyncpg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres needs the asyncpg package")
+        self.timeout = timeout
+        self._stats = {'calls': 0, 'errors': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='postgres-storage', daemon=True)
+        self._thread.start()
+        self._pool = self._call(self._open_pool(dsn, min_size, max_size))
+        print(f"✅ Connected to PostgreSQL (pool {min_size}-{max_size})")
+
+    def _call(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def _open_pool(self, dsn, min_size, max_size):
+        pool = await asyncpg.create_pool(dsn, min_size=min_size, max_size=max_size,
+                                         command_timeout=self.timeout)
+        with open(POSTGRES_SCHEMA, 'r', encoding='utf-8') as f:
+            schema = f.read()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                await conn.execute(schema)
+        return pool
+
+    # Users and sessions
+    def create_user(self, username, password, email=None):
+        print(f"👤 Creating user: {username}")
+        if not username or not password:
+            print("❌ Username and password required")
+            return None
+
+        # bcrypt runs on the caller's thread, never on the storage event loop
+        password_hash = database.hash_password(password)
+        if not password_hash:
+            print("❌ Failed to hash password")
+            return None
+
+        user_id = self._insert_user(username, password_hash, email)
+        if user_id:
+            print(f"✅ User '{username}' created with ID: {user_id}")
+        elif user_id is not None:
+            print(f"⚠️ User '{username}' already exists")
+        return user_id or None
+
+    @_storage_call(default=None)
+    async def _insert_user(self, username, password_hash, email):
+        """New user id, 0 when the username is taken"""
+        user_id = await self._pool.fetchval(
+            '''INSERT INTO users (username, password_hash, email) VALUES ($1, $2, $3)
+               ON CONFLICT (username) DO NOTHING
+               RETURNING id''', username, password_hash, email)
+        return user_id or 0
+
+    def authenticate_user(self, username, password):
+        print(f"🔐 Authenticating user: {username}")
+        if not username or not password:
+            print("❌ Username and password required")
+            return None
+
+        user_data = self._get_credentials(username)
+        if not user_data:
+            print(f"❌ User '{username}' not found")
+            return None
+
+        user_id, stored_hash = user_data['id'], user_data['password_hash']
+        if not database.verify_password(password, stored_hash):
+            print(f"❌ Invalid password for user '{username}'")
+            return None
+
+        print(f"✅ Authentication successful for user '{username}'")
+        if database.password_needs_rehash(stored_hash):
+            new_hash = database.hash_password(password)
+            if new_hash:
+                self._update_password_hash(user_id, new_hash, stored_hash)
+        return user_id
+
+    @_storage_call(default=None)
+    async def _get_credentials(self, username):
+        return await self._pool.fetchrow("SELECT id, password_hash FROM users WHERE username = $1", username)
+
+    @_storage_call(default=False)
+    async def _update_password_hash(self, user_id, new_hash, old_hash):
+        # Unless the password changed meanwhile
+        await self._pool.execute("UPDATE users SET password_hash = $1 WHERE id = $2 AND password_hash = $3",
+                                 new_hash, user_id, old_hash)
+        print(f"🔐 Rehashed password for user_id {user_id} at cost {database.AUTH_BCRYPT_ROUNDS}")
+        return True
+
+    @_storage_call(default=None)
+    async def get_user_by_id(self, user_id):
+        user = await self._pool.fetchrow(
+            f"SELECT id, username, email, {_column('created_at')} FROM users WHERE id = $1", user_id)
+        return dict(user) if user else None
+
+    async def _session_skill_level(self, conn, user_id):
+        return await conn.fetchval("SELECT skill_level FROM student_profiles WHERE user_id = $1", user_id)
+
+    @_storage_call(default=None)
+    async def open_session(self, user_id, token_hash, expires_at):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                now = time.time()
+                await conn.execute('''DELETE FROM refresh_tokens
+                                      WHERE user_id = $1 AND (revoked = 1 OR expires_at <= $2)''',
+                                   user_id, now)
+                await conn.execute('''INSERT INTO refresh_tokens (token_hash, user_id, expires_at, created_at)
+                                      VALUES ($1, $2, $3, $4)''',
+                                   token_hash, user_id, expires_at, now)
+                return {'skill_level': await self._session_skill_level(conn, user_id)}
+
+    @_storage_call(default=None)
+    async def rotate_refresh_token(self, old_hash, new_hash, expires_at):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                now = time.time()
+                user_id = await conn.fetchval('''UPDATE refresh_tokens SET revoked = 1
+                                                 WHERE token_hash = $1 AND revoked = 0 AND expires_at > $2
+                                                 RETURNING user_id''', old_hash, now)
+                if user_id is None:
+                    return None
+                await conn.execute('''INSERT INTO refresh_tokens (token_hash, user_id, expires_at, created_at)
+                                      VALUES ($1, $2, $3, $4)''',
+                                   new_hash, user_id, expires_at, now)
+                return {'user_id': user_id, 'skill_level': await self._session_skill_level(conn, user_id)}
+
+    @_storage_call(default=False)
+    async def revoke_refresh_token(self, token_hash):
+        await self._pool.execute("UPDATE refresh_tokens SET revoked = 1 WHERE token_hash = $1", token_hash)
+        return True
+
+    # Per-user data versions
+    async def _bump_user_version(self, conn, user_id):
+        return await conn.fetchval('''INSERT INTO user_data_versions (user_id, version) VALUES ($1, 1)
+                                      ON CONFLICT (user_id) DO UPDATE
+                                      SET version = user_data_versions.version + 1
+                                      RETURNING version''', user_id)
+
+    async def _get_user_version(self, conn, user_id):
+        version = await conn.fetchval("SELECT version FROM user_data_versions WHERE user_id = $1", user_id)
+        return version or 0
+
+    @_storage_call(default=None)
+    async def get_user_version(self, user_id):
+        return await self._get_user_version(self._pool, user_id)
+
+    # Profiles
+    async def _insert_initial_exercises(self, conn, user_id, skill_level, version):
+        level = skill_level if skill_level in database.INITIAL_EXERCISES else 'beginner'
+        exercises = list(zip(*database.INITIAL_EXERCISES[level]))
+        added = await conn.fetch('''INSERT INTO skill_exercises
+                                    (user_id, exercise_type, description, video_url, difficulty,
+                                     estimated_time, version)
+                                    SELECT $1::integer, e.*, $7::integer
+                                    FROM unnest($2::text[], $3::text[], $4::text[], $5::text[], $6::text[]) AS e
+                                    ON CONFLICT (user_id, exercise_type) DO NOTHING
+                                    RETURNING id''', user_id, *exercises, version)
+        return len(added)
+
+    @_storage_call(default=False)
+    async def save_student_profile(self, user_id, college_name, branch, semester, skill_level, current_projects):
+        print(f"📝 Saving profile for user_id: {user_id}")
+        if not user_id:
+            print("❌ User ID is required")
+            return False
+
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                version = await self._bump_user_version(conn, user_id)
+                await conn.execute('''INSERT INTO student_profiles
+                                      (user_id, college_name, branch, semester, skill_level,
+                                       current_projects, version)
+                                      VALUES ($1, $2, $3, $4, $5, $6, $7)
+                                      ON CONFLICT (user_id) DO UPDATE SET
+                                          college_name = excluded.college_name,
+                                          branch = excluded.branch,
+                                          semester = excluded.semester,
+                                          skill_level = excluded.skill_level,
+                                          current_projects = excluded.current_projects,
+                                          updated_at = utc_now(),
+                                          version = excluded.version''',
+                                   user_id,
+                                   college_name or '',
+                                   branch or '',
+                                   semester or '',
+                                   skill_level or 'beginner',
+                                   current_projects or '',
+                                   version)
+                await self._insert_initial_exercises(conn, user_id, skill_level or 'beginner', version)
+        print(f"✅ Saved profile for user_id: {user_id}")
+        return True
+
+    @_storage_call(default=None)
+    async def get_student_profile(self, user_id):
+        if not user_id:
+            print("❌ User ID is required")
+            return None
+
+        profile = await self._pool.fetchrow(
+            f"SELECT {PROFILE_COLUMNS} FROM student_profiles WHERE user_id = $1", user_id)
+        if not profile:
+            print(f"⚠️ No profile found for user_id: {user_id}")
+            return None
+        return dict(profile)
+
+    # Project history
+    @_storage_call(default=False)
+    async def add_project_history(self, user_id, project_name, project_type, domain, status, notes, wait=True):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                version = await self._bump_user_version(conn, user_id)
+                project_id = await conn.fetchval('''INSERT INTO project_history
+                                                    (user_id, project_name, project_type, domain,
+                                                     status, notes, version)
+                                                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                                                    RETURNING id''',
+                                                 user_id,
+                                                 project_name or '',
+                                                 project_type or '',
+                                                 domain or '',
+                                                 status or 'planned',
+                                                 notes or '',
+                                                 version)
+        print(f"✅ Added project '{project_name}' to history for user_id: {user_id}")
+        return project_id
+
+    @_storage_call(default=[])
+    async def get_project_history(self, user_id):
+        rows = await self._pool.fetch(f'''SELECT {PROJECT_COLUMNS} FROM project_history
+                                          WHERE user_id = $1
+                                          ORDER BY created_date DESC''', user_id)
+        return [database._project_row_to_dict(project) for project in rows]
+
+    async def _query_project_page(self, conn, user_id, limit, after=None, fields=database.PROJECT_HISTORY_FIELDS):
+        """Keyset page on (created_date, id), as database._query_project_page"""
+        # Only whitelisted names ever reach the SQL text
+        fields = [field for field in fields if field in database.PROJECT_HISTORY_FIELDS]
+        columns = ''.join(', ' + _column(field) for field in fields)
+        query = f'''SELECT id, to_char(created_date, '{TIMESTAMP_FORMAT}') AS cursor_date{columns}
+                    FROM project_history
+                    WHERE user_id = $1'''
+        params = [user_id]
+        if after:
+            query += " AND (created_date, id) < ($2::text::timestamp, $3::integer)"
+            params.extend(after)
+        query += f" ORDER BY created_date DESC, id DESC LIMIT ${len(params) + 1}"
+        params.append(limit + 1)
+
+        rows = await conn.fetch(query, *params)
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1]['cursor_date'], rows[-1]['id'])
+
+        projects = [{field: row[field] for field in fields} for row in rows]
+        return projects, next_key
+
+    async def _count_projects(self, conn, user_id):
+        row = await conn.fetchrow('''SELECT COUNT(*) AS total,
+                                            COUNT(*) FILTER (WHERE notes IS NOT NULL AND notes != '')
+                                                AS with_notes
+                                     FROM project_history WHERE user_id = $1''', user_id)
+        return {'total': row['total'], 'with_notes': row['with_notes']}
+
+    @_storage_call(default=None)
+    async def get_project_history_page(self, user_id, limit, after=None, fields=None):
+        async with self._pool.acquire() as conn:
+            projects, next_key = await self._query_project_page(
+                conn, user_id, limit, after, fields or database.PROJECT_HISTORY_FIELDS)
+        return {'projects': projects, 'next_key': next_key}
+
+    @_storage_call(default=None)
+    async def count_project_history(self, user_id):
+        return await self._count_projects(self._pool, user_id)
+
+    # Exercises
+    @_storage_call(default=False)
+    async def assign_initial_exercises(self, user_id, skill_level):
+        async with self._pool.acquire() as conn:
+            transaction = conn.transaction()
+            await transaction.start()
+            try:
+                version = await self._bump_user_version(conn, user_id)
+                added = await self._insert_initial_exercises(conn, user_id, skill_level, version)
+            except BaseException:
+                await transaction.rollback()
+                raise
+            if added > 0:
+                await transaction.commit()
+                print(f"✅ Assigned {added} exercises for user_id: {user_id}")
+            else:
+                # Nothing new: keep the old version so cached copies stay valid
+                await transaction.rollback()
+        return True
+
+    async def _fetch_exercises(self, conn, user_id, since=None):
+        query = f"SELECT {EXERCISE_COLUMNS} FROM skill_exercises WHERE user_id = $1"
+        params = [user_id]
+        if since is not None:
+            query += " AND version > $2"
+            params.append(since)
+        rows = await conn.fetch(query + " ORDER BY date_assigned, id", *params)
+        return [database._exercise_row_to_dict(exercise) for exercise in rows]
+
+    @_storage_call(default=[])
+    async def get_skill_exercises(self, user_id):
+        return await self._fetch_exercises(self._pool, user_id)
+
+    @_storage_call(default=False)
+    async def complete_exercise(self, user_id, exercise_type, wait=True):
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                completed = await conn.fetchval('''SELECT bool_and(completed) FROM skill_exercises
+                                                   WHERE user_id = $1 AND exercise_type = $2''',
+                                                user_id, exercise_type)
+                if completed is None:
+                    print(f"⚠️ Exercise '{exercise_type}' not found for user_id: {user_id}")
+                    return False
+                if completed:
+                    # Already complete: no write, so the version and cached copies stay valid
+                    return True
+
+                version = await self._bump_user_version(conn, user_id)
+                await conn.execute('''UPDATE skill_exercises
+                                      SET completed = TRUE, date_completed = utc_now(),
+                                          version = $1
+                                      WHERE user_id = $2 AND exercise_type = $3 AND NOT completed''',
+                                   version, user_id, exercise_type)
+        print(f"✅ Marked exercise '{exercise_type}' as complete for user_id: {user_id}")
+        return True
+
+    # Shared AI exercise cache
+    @_storage_call(default=False)
+    async def save_ai_exercises_cache(self, user_id, skill_level, field, exercises_json):
+        await self._pool.execute('''INSERT INTO ai_exercises_cache
+                                    (user_id, skill_level, field, exercises_json)
+                                    VALUES ($1, $2, $3, $4)
+                                    ON CONFLICT (skill_level, field) DO UPDATE SET
+                                        user_id = excluded.user_id,
+                                        exercises_json = excluded.exercises_json,
+                                        created_at = utc_now() ''',
+                                 user_id, skill_level, field, exercises_json)
+        return True
+
+    @_storage_call(default=None)
+    async def get_ai_exercises_cache(self, skill_level, field, max_age_days=7):
+        cache = await self._pool.fetchrow(
+            '''SELECT exercises_json,
+                      EXTRACT(EPOCH FROM (now() AT TIME ZONE 'utc') - created_at)::float8 AS age_seconds
+               FROM ai_exercises_cache
+               WHERE skill_level = $1 AND field = $2''', skill_level, field)
+        if cache and cache['age_seconds'] < max_age_days * 86400:
+            return {
+                'exercises': json.loads(cache['exercises_json']),
+                'age_seconds': cache['age_seconds']
+            }
+        return None
+
+    # Portfolios
+    @_storage_call(default=False)
+    async def save_portfolio_data(self, user_id, portfolio_data, input_hash=None, portfolio_html=None):
+        await self._pool.execute('''INSERT INTO portfolio_data
+                                    (user_id, portfolio_json, input_hash, portfolio_html)
+                                    VALUES ($1, $2, $3, $4)
+                                    ON CONFLICT (user_id) DO UPDATE SET
+                                        portfolio_json = excluded.portfolio_json,
+                                        input_hash = excluded.input_hash,
+                                        portfolio_html = excluded.portfolio_html,
+                                        last_updated = utc_now() ''',
+                                 user_id, json.dumps(portfolio_data), input_hash, portfolio_html)
+        return True
+
+    @_storage_call(default=None)
+    async def get_portfolio_data(self, user_id):
+        portfolio_json = await self._pool.fetchval(
+            "SELECT portfolio_json FROM portfolio_data WHERE user_id = $1", user_id)
+        return json.loads(portfolio_json) if portfolio_json else None
+
+    @_storage_call(default=None)
+    async def get_cached_portfolio_html(self, user_id, input_hash):
+        return await self._pool.fetchval('''SELECT portfolio_html FROM portfolio_data
+                                            WHERE user_id = $1 AND input_hash = $2
+                                              AND portfolio_html IS NOT NULL''', user_id, input_hash)
+
+    # Sync and dashboard: one read-only snapshot each
+    def _snapshot(self, conn):
+        return conn.transaction(isolation='repeatable_read', readonly=True)
+
+    @_storage_call(default=None)
+    async def get_changes_since(self, user_id, since):
+        async with self._pool.acquire() as conn:
+            async with self._snapshot(conn):
+                version = await self._get_user_version(conn, user_id)
+                if version <= since:
+                    return {'version': version, 'profile': None, 'projects': [], 'exercises': []}
+
+                profile = await conn.fetchrow(f'''SELECT {PROFILE_COLUMNS} FROM student_profiles
+                                                  WHERE user_id = $1 AND version > $2''', user_id, since)
+                rows = await conn.fetch(f'''SELECT {PROJECT_COLUMNS} FROM project_history
+                                            WHERE user_id = $1 AND version > $2
+                                            ORDER BY created_date DESC, id DESC''', user_id, since)
+                exercises = await self._fetch_exercises(conn, user_id, since)
+
+        return {
+            'version': version,
+            'profile': dict(profile) if profile else None,
+            'projects': [database._project_row_to_dict(project) for project in rows],
+            'exercises': exercises
+        }
+
+    @_storage_call(default=None)
+    async def get_dashboard(self, user_id, project_limit=20, project_after=None, include_exercises=True):
+        async with self._pool.acquire() as conn:
+            async with self._snapshot(conn):
+                version = await self._get_user_version(conn, user_id)
+                profile = await conn.fetchrow(
+                    f"SELECT {PROFILE_COLUMNS} FROM student_profiles WHERE user_id = $1", user_id)
+                counts = await self._count_projects(conn, user_id)
+
+                projects, next_key = [], None
+                if project_limit > 0:
+                    projects, next_key = await self._query_project_page(conn, user_id, project_limit,
+                                                                        project_after)
+
+                exercises = await self._fetch_exercises(conn, user_id) if include_exercises else []
+
+        return {
+            'version': version,
+            'profile': dict(profile) if profile else None,
+            'projects': projects,
+            'next_key': next_key,
+            'project_count': counts['total'],
+            'projects_with_notes': counts['with_notes'],
+            'exercises': exercises
+        }
+
+    # Lifecycle
+    def close(self):
+        try:
+            self._call(self._pool.close())
+        except DB_ERRORS as e:
+            print(f"⚠️ Error closing PostgreSQL pool: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(self.timeout)
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            **self._stats,
+            'pool_size': self._pool.get_size(),
+            'pool_idle': self._pool.get_idle_size(),
+            'pool_max': self._pool.get_max_size(),
+        }
@@ -0,0 +1,177 @@
+import json
+import os
+import textwrap
+
+# Completion budget (max_tokens) per feature; override with a JSON object in AI_MAX_TOKENS
+AI_MAX_TOKENS = {
+    'version_control': 700,
+    'project_ideas': 1200,
+    'skill_recommendations': 1000,
+    'roadmap': 1200,
+    'code_snippet': 1500,
+    'documentation': 2000,
+    'portfolio': 2000,
+}
+AI_MAX_TOKENS.update(json.loads(os.getenv('AI_MAX_TOKENS', '{}')))
+AI_DEFAULT_MAX_TOKENS = int(os.getenv('AI_DEFAULT_MAX_TOKENS', '2000'))
+
+# Longest user-supplied text embedded in a prompt (characters)
+AI_MAX_INPUT_CHARS = int(os.getenv('AI_MAX_INPUT_CHARS', '4000'))
+AI_MAX_SHORT_INPUT_CHARS = 500
+
+def max_tokens_for(feature):
+    return AI_MAX_TOKENS.get(feature, AI_DEFAULT_MAX_TOKENS)
+
+def compact(text):
+    """Dedent, strip every line and drop blank lines"""
+    lines = (line.strip() for line in textwrap.dedent(text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+def compact_json(data):
+    """JSON without indentation or spaces after separators"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+def truncate(text, limit=AI_MAX_INPUT_CHARS):
+    """Cut oversized user input at a word boundary, marking the cut"""
+    text = str(text or "").strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(None, 1)[0] if " " in text[:limit] else text[:limit]
+    return cut + " [truncated]"
+
+def _drop_empty(value):
+    if isinstance(value, dict):
+        return {k: _drop_empty(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_drop_empty(v) for v in value if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return truncate(value, AI_MAX_SHORT_INPUT_CHARS)
+    return value
+
+class PromptTemplate:
+    """A prompt compacted once at import; render() fills it with str.format"""
+
+    def __init__(self, text):
+        self.text = compact(text)
+
+    def render(self, **fields):
+        return self.text.format(**fields)
+
+PROJECT_IDEAS = PromptTemplate("""
+    Generate {count} unique, practical {domain} project ideas suitable for {skill_level} students.
+    Return STRICT JSON:
+    {{"ideas": [{{"name": "...", "description": "...", "features": ["..."], "skills": ["..."], "timeline": "2–4 weeks", "difficulty": "Easy/Medium/Hard"}}]}}
+""")
+
+DOCUMENTATION = PromptTemplate("""
+    Generate FULL project documentation in clean TEXT format, no markdown.
+    PROJECT DETAILS:
+    {project_details}
+    INCLUDE: Overview, Objectives, Tech Stack, Architecture, Features, Installation, Usage, API Reference, Deployment, Future Enhancements.
+    Return plain text only.
+""")
+
+CODE_SNIPPET = PromptTemplate("""
+    Generate a {complexity} level {language} code snippet for: "{prompt}"
+    Return STRICT JSON:
+    {{"title": "Descriptive title", "code": "Complete code with formatting and comments", "explanation": "What the code does and how it works", "usage_example": "How to use or call the code"}}
+    Make the code suitable for {complexity} level programmers, with comments and error handling where appropriate.
+""")
+
+SKILL_RECOMMENDATIONS = PromptTemplate("""
+    Generate personalized skill exercises and learning recommendations for a {skill_level} level student.
+    Student interests: {interests}
+    Return STRICT JSON with an array of exercises:
+    [{{"title": "Exercise Title", "description": "Detailed description", "difficulty": "Beginner/Intermediate/Advanced", "estimated_time": "2-3 hours", "video_url": "YouTube search URL for relevant tutorials"}}]
+    Generate 3-5 practical, hands-on exercises covering different aspects of programming.
+""")
+
+VERSION_CONTROL = PromptTemplate("""
+    User needs commands for: "{request}"
+    Generate ONLY commands (Git, Docker, CMD, PowerShell, Linux commands).
+    Return STRICT JSON:
+    {{"commands": "Complete guide text with commands and explanations"}}
+    Format with clear sections and use markdown code blocks for commands.
+""")
+
+PORTFOLIO = PromptTemplate("""
+    Create a MODERN portfolio HTML (FULL DOCUMENT) with animations.
+    USER INFO (JSON):
+    {data}
+    Requirements: fully responsive modern UI; smooth animations; sections for Name, Contact, College Name, About/Bio, Tech Stack (grid), Projects (cards), Footer; clean CSS inside <style>; attractive buttons; glassmorphism style; no external dependencies except Google Fonts.
+    Return the complete HTML code as a string.
+""")
+
+ROADMAP = PromptTemplate("""
+    Create a detailed roadmap for a project.
+    PROJECT NAME: {project_name}
+    DETAILS: {details}
+    TEAM MEMBERS: {members}
+    TIME AVAILABLE: {time_limit}
+    Return STRICT JSON:
+    {{"overview": "...", "phases": [{{"phase": "Planning", "duration": "2 days", "tasks": ["task1", "task2"]}}], "final_notes": "..."}}
+""")
+
+def project_ideas_prompt(domain, skill_level, count):
+    return PROJECT_IDEAS.render(
+        domain=truncate(domain, AI_MAX_SHORT_INPUT_CHARS),
+        skill_level=truncate(skill_level, AI_MAX_SHORT_INPUT_CHARS),
+        count=count
+    )
+
+def documentation_prompt(project_details):
+    return DOCUMENTATION.render(project_details=truncate(project_details))
+
+def code_snippet_prompt(language, prompt, complexity):
+    return CODE_SNIPPET.render(
+        language=truncate(language, AI_MAX_SHORT_INPUT_CHARS),
+        prompt=truncate(prompt),
+        complexity=truncate(complexity, AI_MAX_SHORT_INPUT_CHARS)
+    )
+
+def skill_recommendations_prompt(skill_level, interests):
+    return SKILL_RECOMMENDATIONS.render(
+        skill_level=truncate(skill_level, AI_MAX_SHORT_INPUT_CHARS),
+        interests=truncate(interests, AI_MAX_SHORT_INPUT_CHARS)
+    )
+
+def version_control_prompt(request):
+    return VERSION_CONTROL.render(request=truncate(request, AI_MAX_SHORT_INPUT_CHARS))
+
+def portfolio_prompt(data):
+    return PORTFOLIO.render(data=compact_json(_drop_empty(data)))
+
+def roadmap_prompt(project_name, details, members, time_limit):
+    return ROADMAP.render(
+        project_name=truncate(project_name, AI_MAX_SHORT_INPUT_CHARS),
+        details=truncate(details),
+        members=truncate(members, AI_MAX_SHORT_INPUT_CHARS),
+        time_limit=truncate(time_limit, AI_MAX_SHORT_INPUT_CHARS)
+    )
+
+class TokenUsage:
+    """Prompt/completion token totals per feature, from the API's usage field"""
+
+    def __init__(self):
+        self._features = {}
+
+    def record(self, feature, usage):
+        if not isinstance(usage, dict):
+            return
+        totals = self._features.setdefault(feature or 'default', {
+            'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0
+        })
+        totals['requests'] += 1
+        totals['prompt_tokens'] += int(usage.get('prompt_tokens') or 0)
+        totals['completion_tokens'] += int(usage.get('completion_tokens') or 0)
+
+    def stats(self):
+        result = {}
+        for feature, totals in self._features.items():
+            requests = totals['requests']
+            result[feature] = {
+                **totals,
+                'avg_prompt_tokens': round(totals['prompt_tokens'] / requests, 1),
+                'avg_completion_tokens': round(totals['completion_tokens'] / requests, 1),
+            }
+        return result
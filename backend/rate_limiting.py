@@ -0,0 +1,216 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+# Global upstream concurrency (AIMD)
+AI_CONCURRENCY_INITIAL = int(os.getenv('AI_CONCURRENCY_INITIAL', '16'))
+AI_CONCURRENCY_MIN = int(os.getenv('AI_CONCURRENCY_MIN', '2'))
+AI_CONCURRENCY_MAX = int(os.getenv('AI_CONCURRENCY_MAX', '64'))
+AI_LATENCY_TARGET = float(os.getenv('AI_LATENCY_TARGET', '20'))     # seconds
+AI_QUEUE_MAX = int(os.getenv('AI_QUEUE_MAX', '100'))
+AI_QUEUE_TIMEOUT = float(os.getenv('AI_QUEUE_TIMEOUT', '10'))       # seconds
+
+# Per-user token bucket
+AI_USER_RATE = float(os.getenv('AI_USER_RATE', '0.2'))              # tokens per second
+AI_USER_BURST = float(os.getenv('AI_USER_BURST', '5'))
+AI_USER_MAX_TRACKED = int(os.getenv('AI_USER_MAX_TRACKED', '10000'))
+
+# Anonymous requests are keyed by client address; a class behind one campus
+# NAT shares it, so the address budget is much larger than a user's
+AI_IP_RATE = float(os.getenv('AI_IP_RATE', '2'))                    # tokens per second
+AI_IP_BURST = float(os.getenv('AI_IP_BURST', '60'))
+
+# Charge registered by the current request (see defer_charge)
+_deferred_charge = contextvars.ContextVar('ai_deferred_charge', default=None)
+
+def defer_charge(charge):
+    """Register charge() to run only if this request makes an upstream AI call.
+
+    OpenRouterAI spends it when the request leads a new upstream call, so
+    response cache hits and single-flight followers are not charged.
+    """
+    _deferred_charge.set(charge)
+
+def spend_deferred_charge():
+    """Run the current request's deferred charge once (may raise RateLimitExceeded)"""
+    charge = _deferred_charge.get()
+    if charge:
+        _deferred_charge.set(None)
+        charge()
+
+class RateLimitExceeded(Exception):
+    """Raised when a request should be answered with 429 Too Many Requests"""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent upstream calls.
+
+    The limit grows by one for every `limit` calls that finish under the
+    latency target, and is cut by `backoff` when a call is slow or the
+    upstream signals overload (at most once per latency window). Callers
+    over the limit wait in a FIFO queue; when the queue is full or the wait
+    exceeds queue_timeout they get RateLimitExceeded.
+    """
+
+    def __init__(self, initial=AI_CONCURRENCY_INITIAL, min_limit=AI_CONCURRENCY_MIN,
+                 max_limit=AI_CONCURRENCY_MAX, latency_target=AI_LATENCY_TARGET,
+                 max_queue=AI_QUEUE_MAX, queue_timeout=AI_QUEUE_TIMEOUT, backoff=0.75):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.latency_target = latency_target
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'decreases': 0,
+            'queue_time_total': 0.0,
+            'queue_time_max': 0.0,
+        }
+
+    def _has_capacity(self):
+        return self.in_flight < int(self.limit)
+
+    def _wake_next(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def _acquire(self):
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self._stats['rejected_queue_full'] += 1
+            raise RateLimitExceeded("AI service is busy, please retry shortly", retry_after=2.0)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats['queued'] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self._stats['rejected_timeout'] += 1
+            raise RateLimitExceeded("Timed out waiting for AI capacity", retry_after=5.0)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        queue_time = time.monotonic() - started
+        self._stats['queue_time_total'] += queue_time
+        self._stats['queue_time_max'] = max(self._stats['queue_time_max'], queue_time)
+        return queue_time
+
+    def _abandon(self, waiter):
+        if waiter.done() and not waiter.cancelled():
+            # Granted a slot just as the wait ended; hand it back
+            self.release(None, ok=True)
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def raise_if_saturated(self):
+        """Fail fast (before a response is started) when the wait queue is full"""
+        if len(self._waiters) >= self.max_queue:
+            self._stats['rejected_queue_full'] += 1
+            raise RateLimitExceeded("AI service is busy, please retry shortly", retry_after=2.0)
+
+    def release(self, latency, ok):
+        self.in_flight -= 1
+        now = time.monotonic()
+        overloaded = not ok or (latency is not None and latency > self.latency_target)
+
+        if overloaded:
+            if now - self._last_decrease > self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self._stats['decreases'] += 1
+        elif latency is not None:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, measure_latency=True):
+        """Hold one upstream slot; call report(ok) to feed the AIMD controller.
+
+        Streams hold their slot for the whole generation, so they pass
+        measure_latency=False and only feed failures back to the controller.
+        """
+        await self._acquire()
+        self._stats['admitted'] += 1
+        outcome = {'ok': True}
+        started = time.monotonic()
+        try:
+            yield lambda ok: outcome.update(ok=ok)
+        except Exception:
+            outcome['ok'] = False
+            raise
+        finally:
+            latency = time.monotonic() - started if measure_latency else None
+            self.release(latency, outcome['ok'])
+
+    def stats(self):
+        queued = self._stats['queued']
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            **{k: v for k, v in self._stats.items() if k != 'queue_time_total'},
+            'queue_time_avg': round(self._stats['queue_time_total'] / queued, 4) if queued else 0.0,
+        }
+
+class TokenBucketLimiter:
+    """Per-key token buckets (rate tokens/second, up to burst)"""
+
+    def __init__(self, rate=AI_USER_RATE, burst=AI_USER_BURST, max_keys=AI_USER_MAX_TRACKED,
+                 message="Too many AI requests, please slow down"):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.message = message
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._stats = {'allowed': 0, 'limited': 0}
+
+    def check(self, key):
+        """Take one token for key, or raise RateLimitExceeded"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            self._stats['limited'] += 1
+            raise RateLimitExceeded(self.message, retry_after=round((1 - tokens) / self.rate, 1))
+
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        self._stats['allowed'] += 1
+
+    def stats(self):
+        return {**self._stats, 'tracked_keys': len(self._buckets)}
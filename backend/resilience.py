@@ -0,0 +1,252 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+
+# Retries (decorrelated jitter between attempts, all within the call's timeout)
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '2'))
+AI_RETRY_BASE_DELAY = float(os.getenv('AI_RETRY_BASE_DELAY', '0.5'))   # seconds
+AI_RETRY_MAX_DELAY = float(os.getenv('AI_RETRY_MAX_DELAY', '8'))       # seconds
+
+# Hedging (off by default: a hedge is a second paid upstream request)
+AI_HEDGE = os.getenv('AI_HEDGE', '0').lower() in ('1', 'true', 'yes')
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', '95'))
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', '2'))       # seconds
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', '20'))
+
+# Circuit breaker (per model)
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', '5'))
+AI_BREAKER_COOLDOWN = float(os.getenv('AI_BREAKER_COOLDOWN', '30'))    # seconds
+
+class UpstreamFailure(Exception):
+    """One failed upstream attempt; retryable failures are retried and trip the breaker"""
+
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while a model's circuit is open"""
+
+def decorrelated_jitter(previous, base=AI_RETRY_BASE_DELAY, cap=AI_RETRY_MAX_DELAY):
+    """Next backoff delay: uniform between base and 3x the previous delay, capped"""
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (only the delta-seconds form)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open every call is rejected; after `cooldown` seconds one probe is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=AI_BREAKER_FAILURES, cooldown=AI_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def allow(self):
+        now = time.monotonic()
+        if self.state == 'open':
+            if now - self._opened_at < self.cooldown:
+                self._stats['rejected'] += 1
+                return False
+            self.state = 'half_open'
+            self._probe_started = None
+
+        if self.state == 'half_open':
+            # One probe at a time; a probe that never reported (cancelled) expires
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                self._stats['rejected'] += 1
+                return False
+            self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                self._stats['opened'] += 1
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+
+    def stats(self):
+        return {'state': self.state, 'consecutive_failures': self.failures, **self._stats}
+
+class LatencyTracker:
+    """Sliding window of successful attempt latencies"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, pct):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+class Resilience:
+    """Retry, hedge and circuit-break calls to an upstream, keyed by model.
+
+    Breakers and the latency window that sets the hedge delay are per key.
+    """
+
+    def __init__(self, max_retries=AI_MAX_RETRIES, base_delay=AI_RETRY_BASE_DELAY,
+                 max_delay=AI_RETRY_MAX_DELAY, hedge=AI_HEDGE,
+                 hedge_percentile=AI_HEDGE_PERCENTILE, hedge_min_delay=AI_HEDGE_MIN_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self._latency = {}
+        self._breakers = {}
+        self._stats = {
+            'calls': 0,
+            'retries': 0,
+            'failures': 0,
+            'short_circuited': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+        }
+
+    def breaker(self, key):
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker()
+        return self._breakers[key]
+
+    def latency(self, key):
+        if key not in self._latency:
+            self._latency[key] = LatencyTracker()
+        return self._latency[key]
+
+    def admit(self, key):
+        """Raise CircuitOpenError if the key's circuit is rejecting calls"""
+        if not self.breaker(key).allow():
+            self._stats['short_circuited'] += 1
+            raise CircuitOpenError(f"AI service for {key} is temporarily unavailable")
+
+    def hedge_delay(self, key):
+        latency = self.latency(key)
+        if not self.hedge or len(latency) < AI_HEDGE_MIN_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, latency.percentile(self.hedge_percentile))
+
+    async def _timed(self, key, attempt, timeout):
+        started = time.monotonic()
+        result = await attempt(timeout)
+        self.latency(key).record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, key, attempt, timeout):
+        """Run attempt; if it outlives the latency percentile, race a second copy"""
+        delay = self.hedge_delay(key)
+        if delay is None or delay >= timeout:
+            return await self._timed(key, attempt, timeout)
+
+        primary = asyncio.ensure_future(self._timed(key, attempt, timeout))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._stats['hedges'] += 1
+        hedge = asyncio.ensure_future(self._timed(key, attempt, timeout - delay))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._stats['hedge_wins'] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, key, attempt, timeout):
+        """Await attempt(remaining_timeout) with retries, hedging and a breaker.
+
+        attempt raises UpstreamFailure; retryable ones are retried with
+        decorrelated jitter (honouring Retry-After) while the timeout budget
+        allows. Raises CircuitOpenError without calling upstream when open.
+        """
+        self.admit(key)
+        self._stats['calls'] += 1
+        breaker = self.breaker(key)
+        deadline = time.monotonic() + timeout
+        delay = self.base_delay
+        retries = 0
+
+        while True:
+            try:
+                result = await self._hedged(key, attempt, deadline - time.monotonic())
+            except UpstreamFailure as e:
+                if not e.retryable:
+                    # Upstream answered; the request itself was bad
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+
+                delay = decorrelated_jitter(delay, self.base_delay, self.max_delay)
+                if e.retry_after is not None:
+                    delay = max(delay, min(e.retry_after, self.max_delay))
+                if (retries >= self.max_retries or breaker.state == 'open'
+                        or time.monotonic() + delay >= deadline):
+                    self._stats['failures'] += 1
+                    raise
+                retries += 1
+                self._stats['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                breaker.record_failure()
+                self._stats['failures'] += 1
+                raise
+
+            breaker.record_success()
+            return result
+
+    def stats(self):
+        latency = {}
+        for key, tracker in self._latency.items():
+            p95 = tracker.percentile(95)
+            latency[key] = {
+                'p95': round(p95, 3) if p95 is not None else None,
+                'hedge_delay': self.hedge_delay(key),
+            }
+        return {
+            **self._stats,
+            'latency': latency,
+            'breakers': {key: b.stats() for key, b in self._breakers.items()},
+        }
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+# Time-to-live per feature in seconds (0 disables caching for that feature)
+AI_CACHE_TTLS = {
+    'project_ideas': 24 * 3600,
+    'documentation': 6 * 3600,
+    'code_snippet': 24 * 3600,
+    'skill_recommendations': 7 * 24 * 3600,
+    'version_control': 7 * 24 * 3600,
+    'portfolio': 0,  # personal data, never shared
+    'roadmap': 6 * 3600,
+}
+AI_CACHE_DEFAULT_TTL = int(os.getenv('AI_CACHE_DEFAULT_TTL', '3600'))
+
+AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '512'))
+AI_CACHE_MAX_ENTRY_BYTES = int(os.getenv('AI_CACHE_MAX_ENTRY_BYTES', '262144'))
+AI_CACHE_DISK_MAX_ROWS = int(os.getenv('AI_CACHE_DISK_MAX_ROWS', '10000'))
+AI_CACHE_PRUNE_EVERY = 100  # disk writes between prune passes
+
+def make_cache_key(model, prompt, temperature, json_response):
+    """Content address for an upstream request"""
+    material = json.dumps([model, prompt, temperature, bool(json_response)], ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Two-tier cache for OpenRouter responses: in-memory LRU over SQLite.
+
+    Values are stored as JSON text so every hit hands back a fresh copy that
+    callers are free to mutate.
+    """
+
+    def __init__(self, max_entries=AI_CACHE_MAX_ENTRIES, max_entry_bytes=AI_CACHE_MAX_ENTRY_BYTES,
+                 disk_max_rows=AI_CACHE_DISK_MAX_ROWS, enabled=AI_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.disk_max_rows = disk_max_rows
+        self.enabled = enabled
+
+        self._memory = OrderedDict()  # key -> (expires_at, response_json)
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'skipped_too_large': 0,
+        }
+
+    def ttl_for(self, feature):
+        return AI_CACHE_TTLS.get(feature, AI_CACHE_DEFAULT_TTL)
+
+    def _remember(self, key, expires_at, response_json):
+        with self._lock:
+            self._memory[key] = (expires_at, response_json)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    async def get(self, key, feature=None):
+        """Return the cached value for key, or None"""
+        if not self.enabled or self.ttl_for(feature) <= 0:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return json.loads(entry[1])
+            if entry:
+                del self._memory[key]
+
+        row = await asyncio.to_thread(database.get_ai_response_cache, key)
+        if row:
+            response_json, expires_at = row
+            self._remember(key, expires_at, response_json)
+            self._stats['disk_hits'] += 1
+            return json.loads(response_json)
+
+        self._stats['misses'] += 1
+        return None
+
+    async def set(self, key, value, feature=None):
+        """Store value under key using the feature's TTL"""
+        ttl = self.ttl_for(feature)
+        if not self.enabled or ttl <= 0:
+            return
+
+        response_json = json.dumps(value)
+        if len(response_json) > self.max_entry_bytes:
+            self._stats['skipped_too_large'] += 1
+            return
+
+        expires_at = time.time() + ttl
+        self._remember(key, expires_at, response_json)
+        self._stats['stores'] += 1
+
+        await asyncio.to_thread(database.save_ai_response_cache, key, feature, response_json, expires_at)
+        self._disk_writes += 1
+        if self._disk_writes % AI_CACHE_PRUNE_EVERY == 0:
+            await asyncio.to_thread(database.prune_ai_response_cache, self.disk_max_rows)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        lookups = self._stats['memory_hits'] + self._stats['disk_hits'] + self._stats['misses']
+        hits = self._stats['memory_hits'] + self._stats['disk_hits']
+        return {
+            **self._stats,
+            'memory_entries': len(self._memory),
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+
+# HMAC key for access tokens. Without AUTH_SESSION_SECRET a random key is
+# used, so access tokens die with the process (clients fall back to their
+# refresh token). That is only allowed for a single worker on SQLite: with
+# several workers or nodes each would reject the others' tokens, so startup
+# fails instead.
+AUTH_SESSION_SECRET = os.getenv('AUTH_SESSION_SECRET', '')
+AUTH_ACCESS_TTL = int(os.getenv('AUTH_ACCESS_TTL', '900'))              # seconds
+AUTH_REFRESH_TTL = int(os.getenv('AUTH_REFRESH_TTL', str(30 * 86400)))  # seconds
+AUTH_REVOKED_MAX = int(os.getenv('AUTH_REVOKED_MAX', '10000'))
+# With this off, requests without a token are still served (rollout aid);
+# a token that is present is always checked
+AUTH_REQUIRE_TOKEN = os.getenv('AUTH_REQUIRE_TOKEN', '1').lower() in ('1', 'true', 'yes')
+
+def _shared_deployment():
+    """Why this process may not be the only one verifying tokens, or None"""
+    backend = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+    if backend in ('postgres', 'postgresql'):
+        return f"STORAGE_BACKEND={backend}"
+    # uvicorn and gunicorn take their default worker count from WEB_CONCURRENCY
+    workers = os.getenv('WEB_CONCURRENCY', '1')
+    if workers.isdigit() and int(workers) > 1:
+        return f"WEB_CONCURRENCY={workers}"
+    return None
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def hash_refresh_token(token):
+    """Refresh tokens are stored as SHA-256 digests, never in the clear"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def new_refresh_token():
+    return secrets.token_urlsafe(32)
+
+class RevokedTokens:
+    """LRU of revoked access token ids (jti -> expiry); entries past expiry are dropped"""
+
+    def __init__(self, max_size=AUTH_REVOKED_MAX):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def add(self, jti, expires_at):
+        self._entries[jti] = expires_at
+        self._entries.move_to_end(jti)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, jti):
+        expires_at = self._entries.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at < time.time():
+            del self._entries[jti]
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+class SessionTokens:
+    """Short-lived HMAC-SHA256 access tokens: base64url(claims).base64url(signature).
+
+    Claims are sub (user id), lvl (skill level), exp and jti. verify() is pure
+    in-memory work: no database lookup per request.
+    """
+
+    def __init__(self, secret=AUTH_SESSION_SECRET, ttl=AUTH_ACCESS_TTL):
+        if not secret:
+            shared = _shared_deployment()
+            if shared:
+                raise RuntimeError(f"AUTH_SESSION_SECRET must be set with {shared}: "
+                                   "every worker needs the same key to verify access tokens")
+            print("⚠️ AUTH_SESSION_SECRET not set; access tokens will not survive a restart")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode('utf-8')
+        self.ttl = ttl
+        self.revoked = RevokedTokens()
+        self._stats = {'issued': 0, 'verified': 0, 'rejected': 0, 'revoked': 0}
+
+    def _sign(self, body):
+        return _b64encode(hmac.new(self._key, body.encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, user_id, skill_level=None):
+        """Signed access token for user_id; returns (token, claims)"""
+        claims = {
+            'sub': user_id,
+            'lvl': skill_level,
+            'exp': int(time.time()) + self.ttl,
+            'jti': secrets.token_hex(8)
+        }
+        body = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        self._stats['issued'] += 1
+        return f"{body}.{self._sign(body)}", claims
+
+    def verify(self, token):
+        """Claims for a valid, unexpired, unrevoked token, else None"""
+        try:
+            body, signature = token.split('.')
+            if not hmac.compare_digest(signature, self._sign(body)):
+                raise ValueError("bad signature")
+            claims = json.loads(_b64decode(body))
+            if claims['exp'] < time.time() or claims['jti'] in self.revoked:
+                raise ValueError("expired or revoked")
+        except (ValueError, KeyError, TypeError, UnicodeError):
+            self._stats['rejected'] += 1
+            return None
+
+        self._stats['verified'] += 1
+        return claims
+
+    def revoke(self, claims):
+        self.revoked.add(claims['jti'], claims['exp'])
+        self._stats['revoked'] += 1
+
+    def stats(self):
+        return {**self._stats, 'revoked_tracked': len(self.revoked), 'ttl': self.ttl}
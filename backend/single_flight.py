@@ -0,0 +1,41 @@
+import asyncio
+import copy
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    running await the same task. A cancelled caller only stops waiting - the
+    shared task keeps running for the others. Exceptions reach every caller.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {'leaders': 0, 'followers': 0}
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn):
+        """Run fn() once per key at a time; every caller gets its own copy of the result"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self._stats['leaders'] += 1
+        else:
+            self._stats['followers'] += 1
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def stats(self):
+        return {**self._stats, 'in_flight': len(self._calls)}
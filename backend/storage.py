@@ -0,0 +1,238 @@
+import os
+from abc import ABC, abstractmethod
+
+# Where user data lives: 'sqlite' (database.py, one file on one node) or
+# 'postgres' (postgres_storage.py, shared by every app node behind a load
+# balancer). AI jobs and the AI response cache stay in the node-local
+# SQLite file either way.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+
+class Storage(ABC):
+    """Repository interface for user data: users and sessions, profiles,
+    project history, exercises, the shared AI exercise cache and portfolios.
+
+    Methods are synchronous and mirror the database.py functions of the same
+    name, including their return values on success and failure (None, False
+    or [] rather than exceptions). Every data method is abstract, so a
+    backend missing one fails when instantiated; storage_conformance.py
+    checks the behaviour against this contract.
+    """
+
+    name = 'base'
+
+    # Users and sessions
+    @abstractmethod
+    def create_user(self, username, password, email=None):
+        ...
+
+    @abstractmethod
+    def authenticate_user(self, username, password):
+        ...
+
+    @abstractmethod
+    def get_user_by_id(self, user_id):
+        ...
+
+    @abstractmethod
+    def open_session(self, user_id, token_hash, expires_at):
+        ...
+
+    @abstractmethod
+    def rotate_refresh_token(self, old_hash, new_hash, expires_at):
+        ...
+
+    @abstractmethod
+    def revoke_refresh_token(self, token_hash):
+        ...
+
+    # Profiles
+    @abstractmethod
+    def save_student_profile(self, user_id, college_name, branch, semester, skill_level, current_projects):
+        ...
+
+    @abstractmethod
+    def get_student_profile(self, user_id):
+        ...
+
+    # Project history
+    @abstractmethod
+    def add_project_history(self, user_id, project_name, project_type, domain, status, notes, wait=True):
+        ...
+
+    @abstractmethod
+    def get_project_history(self, user_id):
+        ...
+
+    @abstractmethod
+    def get_project_history_page(self, user_id, limit, after=None, fields=None):
+        ...
+
+    @abstractmethod
+    def count_project_history(self, user_id):
+        ...
+
+    # Exercises
+    @abstractmethod
+    def assign_initial_exercises(self, user_id, skill_level):
+        ...
+
+    @abstractmethod
+    def get_skill_exercises(self, user_id):
+        ...
+
+    @abstractmethod
+    def complete_exercise(self, user_id, exercise_type, wait=True):
+        ...
+
+    # Shared AI exercise cache
+    @abstractmethod
+    def save_ai_exercises_cache(self, user_id, skill_level, field, exercises_json):
+        ...
+
+    @abstractmethod
+    def get_ai_exercises_cache(self, skill_level, field, max_age_days=7):
+        ...
+
+    # Portfolios
+    @abstractmethod
+    def save_portfolio_data(self, user_id, portfolio_data, input_hash=None, portfolio_html=None):
+        ...
+
+    @abstractmethod
+    def get_portfolio_data(self, user_id):
+        ...
+
+    @abstractmethod
+    def get_cached_portfolio_html(self, user_id, input_hash):
+        ...
+
+    # Versions, sync and dashboard snapshots
+    @abstractmethod
+    def get_user_version(self, user_id):
+        ...
+
+    @abstractmethod
+    def get_changes_since(self, user_id, since):
+        ...
+
+    @abstractmethod
+    def get_dashboard(self, user_id, project_limit=20, project_after=None, include_exercises=True):
+        ...
+
+    # Lifecycle
+    def close(self):
+        """Flush pending writes and release connections (call on shutdown)"""
+
+    def stats(self):
+        return {'backend': self.name}
+
+class SQLiteStorage(Storage):
+    """The existing database.py implementation behind the Storage interface"""
+
+    name = 'sqlite'
+
+    def __init__(self):
+        import database
+        self.db = database
+
+    def create_user(self, username, password, email=None):
+        return self.db.create_user(username, password, email)
+
+    def authenticate_user(self, username, password):
+        return self.db.authenticate_user(username, password)
+
+    def get_user_by_id(self, user_id):
+        return self.db.get_user_by_id(user_id)
+
+    def open_session(self, user_id, token_hash, expires_at):
+        return self.db.open_session(user_id, token_hash, expires_at)
+
+    def rotate_refresh_token(self, old_hash, new_hash, expires_at):
+        return self.db.rotate_refresh_token(old_hash, new_hash, expires_at)
+
+    def revoke_refresh_token(self, token_hash):
+        return self.db.revoke_refresh_token(token_hash)
+
+    def save_student_profile(self, user_id, college_name, branch, semester, skill_level, current_projects):
+        return self.db.save_student_profile(user_id, college_name, branch, semester, skill_level,
+                                            current_projects)
+
+    def get_student_profile(self, user_id):
+        return self.db.get_student_profile(user_id)
+
+    def add_project_history(self, user_id, project_name, project_type, domain, status, notes, wait=True):
+        return self.db.add_project_history(user_id, project_name, project_type, domain, status, notes,
+                                           wait=wait)
+
+    def get_project_history(self, user_id):
+        return self.db.get_project_history(user_id)
+
+    def get_project_history_page(self, user_id, limit, after=None, fields=None):
+        return self.db.get_project_history_page(user_id, limit, after,
+                                                fields or self.db.PROJECT_HISTORY_FIELDS)
+
+    def count_project_history(self, user_id):
+        return self.db.count_project_history(user_id)
+
+    def assign_initial_exercises(self, user_id, skill_level):
+        return self.db.assign_initial_exercises(user_id, skill_level)
+
+    def get_skill_exercises(self, user_id):
+        return self.db.get_skill_exercises(user_id)
+
+    def complete_exercise(self, user_id, exercise_type, wait=True):
+        return self.db.complete_exercise(user_id, exercise_type, wait=wait)
+
+    def save_ai_exercises_cache(self, user_id, skill_level, field, exercises_json):
+        return self.db.save_ai_exercises_cache(user_id, skill_level, field, exercises_json)
+
+    def get_ai_exercises_cache(self, skill_level, field, max_age_days=7):
+        return self.db.get_ai_exercises_cache(skill_level, field, max_age_days)
+
+    def save_portfolio_data(self, user_id, portfolio_data, input_hash=None, portfolio_html=None):
+        return self.db.save_portfolio_data(user_id, portfolio_data, input_hash, portfolio_html)
+
+    def get_portfolio_data(self, user_id):
+        return self.db.get_portfolio_data(user_id)
+
+    def get_cached_portfolio_html(self, user_id, input_hash):
+        return self.db.get_cached_portfolio_html(user_id, input_hash)
+
+    def get_user_version(self, user_id):
+        return self.db.get_user_version(user_id)
+
+    def get_changes_since(self, user_id, since):
+        return self.db.get_changes_since(user_id, since)
+
+    def get_dashboard(self, user_id, project_limit=20, project_after=None, include_exercises=True):
+        return self.db.get_dashboard(user_id, project_limit, project_after, include_exercises)
+
+    def close(self):
+        # The pool itself is closed with the node-local tables (database.close_pool)
+        self.db.flush_writes()
+
+    def stats(self):
+        return {'backend': self.name, 'path': os.path.abspath(self.db.DB_PATH),
+                'write_behind': self.db.write_buffer_stats()}
+
+def create_storage(backend=STORAGE_BACKEND, url=DATABASE_URL):
+    """Build the configured storage backend"""
+    if backend == 'sqlite':
+        return SQLiteStorage()
+    if backend in ('postgres', 'postgresql'):
+        if not url:
+            raise RuntimeError("STORAGE_BACKEND=postgres needs DATABASE_URL")
+        from postgres_storage import PostgresStorage
+        return PostgresStorage(url)
+    raise RuntimeError(f"Unknown STORAGE_BACKEND '{backend}' (expected sqlite or postgres)")
+
+_storage = None
+
+def get_storage():
+    """The process-wide storage backend, created on first use"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+        print(f"🗄️ Storage backend: {_storage.name}")
+    return _storage
@@ -0,0 +1,203 @@
+"""Conformance check for storage backends (see storage.Storage).
+
+Runs one scenario through the Storage interface - users and sessions,
+profiles, exercises, project history paging, sync, dashboard, AI cache and
+portfolios - and reports every result that differs from the contract, so
+the SQLite and PostgreSQL backends can be held to the same behaviour.
+
+SQLite runs against a throwaway database in a temporary directory, as does
+the node-local SQLite file in postgres mode. PostgreSQL uses DATABASE_URL;
+a local instance is fine, the run only adds its own uniquely named users
+and cache keys.
+
+Usage: python storage_conformance.py [sqlite|postgres]
+"""
+import contextlib
+import io
+import json
+import os
+import re
+import secrets
+import sys
+import tempfile
+import time
+
+TIMESTAMP = re.compile(r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d$')
+PROJECT_KEYS = {'project_name', 'project_type', 'domain', 'status', 'created_date', 'completed_date', 'notes'}
+EXERCISE_KEYS = {'exercise_type', 'title', 'description', 'completed', 'date_assigned', 'date_completed',
+                 'video_url', 'difficulty', 'estimated_time', 'learning_outcome'}
+
+def is_timestamp(value):
+    return isinstance(value, str) and bool(TIMESTAMP.match(value))
+
+def run(storage, initial_exercises):
+    """Exercise storage; returns (checks run, [failed check names])"""
+    results = []
+
+    def check(name, condition):
+        results.append((name, bool(condition)))
+
+    suffix = secrets.token_hex(4)
+    username = f"conformance_{suffix}"
+
+    # Users
+    user_id = storage.create_user(username, "password123", "student@example.com")
+    check("create_user returns the new id", isinstance(user_id, int))
+    check("create_user rejects a taken username", storage.create_user(username, "another") is None)
+    check("authenticate_user accepts the password", storage.authenticate_user(username, "password123") == user_id)
+    check("authenticate_user rejects a wrong password", storage.authenticate_user(username, "wrong") is None)
+    check("authenticate_user rejects an unknown user",
+          storage.authenticate_user(f"nobody_{suffix}", "password123") is None)
+    user = storage.get_user_by_id(user_id)
+    check("get_user_by_id", user and user['id'] == user_id and user['username'] == username
+          and user['email'] == "student@example.com" and is_timestamp(user['created_at']))
+
+    # Profiles
+    check("version is 0 before the first write", storage.get_user_version(user_id) == 0)
+    check("get_student_profile is None before saving", storage.get_student_profile(user_id) is None)
+    check("save_student_profile", storage.save_student_profile(
+        user_id, "College", "CSE", "5", "beginner", "Todo app") is True)
+    check("get_student_profile", storage.get_student_profile(user_id) == {
+        'college_name': "College", 'branch': "CSE", 'semester': "5",
+        'skill_level': "beginner", 'current_projects': "Todo app"})
+    check("save_student_profile bumps the version", storage.get_user_version(user_id) == 1)
+
+    # Exercises
+    exercises = storage.get_skill_exercises(user_id)
+    check("saving a profile assigns the level's exercises",
+          sorted(exercise['exercise_type'] for exercise in exercises)
+          == sorted(exercise[0] for exercise in initial_exercises['beginner']))
+    check("exercise fields", exercises and all(
+        set(exercise) == EXERCISE_KEYS and exercise['completed'] is False
+        and is_timestamp(exercise['date_assigned']) and exercise['date_completed'] is None
+        for exercise in exercises))
+    storage.save_student_profile(user_id, "College", "CSE", "6", "beginner", "Todo app")
+    check("re-saving a profile adds no exercises", len(storage.get_skill_exercises(user_id)) == len(exercises))
+    check("assign_initial_exercises keeps assigned exercises and the version",
+          storage.assign_initial_exercises(user_id, 'beginner') is True and storage.get_user_version(user_id) == 2)
+
+    exercise_type = exercises[0]['exercise_type'] if exercises else 'form_validation'
+    check("complete_exercise", storage.complete_exercise(user_id, exercise_type, wait=True) is True)
+    check("complete_exercise on an unknown exercise",
+          storage.complete_exercise(user_id, "no_such_exercise", wait=True) is False)
+    completed = {exercise['exercise_type']: exercise for exercise in storage.get_skill_exercises(user_id)}
+    check("completed exercise is marked with a date", completed.get(exercise_type, {}).get('completed') is True
+          and is_timestamp(completed[exercise_type]['date_completed']))
+    version = storage.get_user_version(user_id)
+    storage.complete_exercise(user_id, exercise_type, wait=True)
+    check("completing twice keeps the version", storage.get_user_version(user_id) == version)
+
+    # Project history
+    project_ids = [storage.add_project_history(user_id, f"Project {i}", "web", "general", "planned",
+                                               "notes" if i % 2 else "", wait=True)
+                   for i in range(5)]
+    check("add_project_history returns distinct ids",
+          all(isinstance(project_id, int) for project_id in project_ids) and len(set(project_ids)) == 5)
+    check("count_project_history", storage.count_project_history(user_id) == {'total': 5, 'with_notes': 2})
+    history = storage.get_project_history(user_id)
+    check("get_project_history", len(history) == 5 and all(
+        set(project) == PROJECT_KEYS and is_timestamp(project['created_date']) for project in history))
+
+    names, after, pages = [], None, 0
+    while pages < 10:
+        page = storage.get_project_history_page(user_id, 2, after)
+        if not page:
+            break
+        names.extend(project['project_name'] for project in page['projects'])
+        pages += 1
+        if not page['next_key']:
+            break
+        # Cursors travel through JSON (main.encode_project_cursor)
+        after = tuple(json.loads(json.dumps(page['next_key'])))
+    check("keyset pages visit every project once, newest first",
+          names == [f"Project {i}" for i in reversed(range(5))] and pages == 3)
+    page = storage.get_project_history_page(user_id, 10, None, ('project_name', 'status'))
+    check("get_project_history_page projects the requested fields",
+          page and all(set(project) == {'project_name', 'status'} for project in page['projects']))
+
+    # Sync and dashboard
+    changes = storage.get_changes_since(user_id, version)
+    current = storage.get_user_version(user_id)
+    check("get_changes_since returns rows written after the version",
+          changes and changes['version'] == current and changes['profile'] is None
+          and [project['project_name'] for project in changes['projects']]
+          == [f"Project {i}" for i in reversed(range(5))] and changes['exercises'] == [])
+    check("get_changes_since at the current version is empty", storage.get_changes_since(user_id, current) == {
+        'version': current, 'profile': None, 'projects': [], 'exercises': []})
+    check("get_changes_since from 0 returns everything",
+          (storage.get_changes_since(user_id, 0) or {}).get('profile', {}).get('semester') == "6")
+
+    dashboard = storage.get_dashboard(user_id, project_limit=3)
+    check("get_dashboard", dashboard and dashboard['version'] == current
+          and dashboard['profile']['semester'] == "6" and len(dashboard['projects']) == 3
+          and dashboard['next_key'] and dashboard['project_count'] == 5
+          and dashboard['projects_with_notes'] == 2 and len(dashboard['exercises']) == len(exercises))
+    dashboard = storage.get_dashboard(user_id, project_limit=0, include_exercises=False)
+    check("get_dashboard without projects or exercises", dashboard and dashboard['projects'] == []
+          and dashboard['next_key'] is None and dashboard['exercises'] == [] and dashboard['project_count'] == 5)
+
+    # Shared AI exercise cache
+    field = f"conformance_{suffix}"
+    check("get_ai_exercises_cache misses an unknown key", storage.get_ai_exercises_cache('beginner', field) is None)
+    storage.save_ai_exercises_cache(user_id, 'beginner', field, json.dumps([{'round': 1}]))
+    check("save_ai_exercises_cache", storage.save_ai_exercises_cache(
+        user_id, 'beginner', field, json.dumps([{'round': 2}])) is True)
+    cached = storage.get_ai_exercises_cache('beginner', field)
+    check("get_ai_exercises_cache returns the latest entry with its age",
+          cached and cached['exercises'] == [{'round': 2}] and 0 <= cached['age_seconds'] < 60)
+    check("get_ai_exercises_cache honours max_age_days",
+          storage.get_ai_exercises_cache('beginner', field, max_age_days=0) is None)
+
+    # Portfolios
+    check("get_portfolio_data is None before saving", storage.get_portfolio_data(user_id) is None)
+    check("save_portfolio_data", storage.save_portfolio_data(user_id, {'round': 1}, "hash1", "<html>1</html>") is True)
+    storage.save_portfolio_data(user_id, {'round': 2}, "hash2", "<html>2</html>")
+    check("get_portfolio_data", storage.get_portfolio_data(user_id) == {'round': 2})
+    check("get_cached_portfolio_html matches the input hash",
+          storage.get_cached_portfolio_html(user_id, "hash2") == "<html>2</html>"
+          and storage.get_cached_portfolio_html(user_id, "hash1") is None)
+
+    # Sessions
+    hashes = [secrets.token_hex(32) for _ in range(5)]
+    expires_at = time.time() + 3600
+    check("open_session", storage.open_session(user_id, hashes[0], expires_at) == {'skill_level': 'beginner'})
+    check("rotate_refresh_token", storage.rotate_refresh_token(hashes[0], hashes[1], expires_at)
+          == {'user_id': user_id, 'skill_level': 'beginner'})
+    check("a refresh token works only once", storage.rotate_refresh_token(hashes[0], hashes[2], expires_at) is None)
+    check("revoke_refresh_token", storage.revoke_refresh_token(hashes[1]) is True
+          and storage.rotate_refresh_token(hashes[1], hashes[2], expires_at) is None)
+    storage.open_session(user_id, hashes[3], time.time() - 1)
+    check("an expired refresh token is refused",
+          storage.rotate_refresh_token(hashes[3], hashes[4], expires_at) is None)
+
+    return len(results), [name for name, passed in results if not passed]
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'sqlite'
+
+    # database opens (and migrates) DB_PATH on import, for either backend:
+    # point it at a throwaway file so the repo's database is never touched
+    os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='storage_conformance_'),
+                                         'project_assistant.db')
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database
+        import storage as storage_module
+        database.AUTH_BCRYPT_ROUNDS = 4  # storage is under test, not bcrypt
+        storage = storage_module.create_storage(backend)
+
+    start = time.perf_counter()
+    # Every storage call logs; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        total, failures = run(storage, database.INITIAL_EXERCISES)
+        storage.close()
+    elapsed = time.perf_counter() - start
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        print(f"{storage.name}: {len(failures)} of {total} checks failed")
+        sys.exit(1)
+    print(f"✅ {storage.name}: all {total} checks passed in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
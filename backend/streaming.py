@@ -0,0 +1,78 @@
+import json
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # stop reverse proxies from buffering the stream
+}
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class JsonStreamAssembler:
+    """Assemble a JSON object from streamed text deltas.
+
+    Tracks brace depth (outside of string literals) as text arrives, so the
+    top-level value is parsed as soon as it closes instead of re-parsing the
+    whole buffer on every delta.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self.result = None
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    @property
+    def complete(self):
+        return self.result is not None
+
+    def feed(self, delta):
+        """Add a delta; returns the parsed object once the top-level value closes"""
+        if self.complete:
+            return self.result
+        self._parts.append(delta)
+
+        for ch in delta:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                self._started = True
+            elif ch in "}]":
+                self._depth -= 1
+                if self._started and self._depth == 0:
+                    self.result = self._parse()
+                    if self.complete:
+                        break
+        return self.result
+
+    def finish(self):
+        """Parse whatever has been received once the stream ends"""
+        if not self.complete:
+            self.result = self._parse()
+        return self.result
+
+    def _parse(self):
+        text = self.text
+        start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+        if start == -1:
+            return None
+        try:
+            value, _ = json.JSONDecoder().raw_decode(text, start)
+            return value
+        except ValueError:
+            return None
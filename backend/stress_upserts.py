@@ -0,0 +1,85 @@
+"""Concurrency check for the upsert write paths.
+
+Many threads write the same keys at once through create_user,
+save_student_profile, save_ai_exercises_cache and save_portfolio_data;
+afterwards every key must have exactly one row and no call may have errored.
+Runs against a throwaway database in a temporary directory.
+
+Usage: python stress_upserts.py [threads] [rounds]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def hammer(name, threads, rounds, func):
+    """Call func(i) threads * rounds times from threads workers; returns the results"""
+    start = time.perf_counter()
+    # The database layer logs every call; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(func, range(threads * rounds)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {len(results):6d} calls  {elapsed / len(results) * 1e3:7.2f} ms/call")
+    return results
+
+def count(database, sql, params=()):
+    conn = database.get_connection()
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    # database opens project_assistant.db in the working directory on import
+    os.chdir(tempfile.mkdtemp(prefix='stress_upserts_'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database
+    database.AUTH_BCRYPT_ROUNDS = 4  # the database paths are under test, not bcrypt
+
+    usernames = [f"student{i}" for i in range(threads)]
+    user_ids = hammer("create_user", threads, rounds,
+                      lambda i: database.create_user(usernames[i % threads], "password123"))
+    created = [user_id for user_id in user_ids if user_id]
+    owner = created[0]
+    saved_profiles = hammer("save_student_profile", threads, rounds,
+                            lambda i: database.save_student_profile(
+                                owner, "College", "CSE", str(i % 8), "beginner", f"round {i}"))
+    saved_cache = hammer("save_ai_exercises_cache", threads, rounds,
+                         lambda i: database.save_ai_exercises_cache(
+                             owner, "beginner", "web", f'[{{"round": {i}}}]'))
+    saved_portfolios = hammer("save_portfolio_data", threads, rounds,
+                              lambda i: database.save_portfolio_data(owner, {"round": i}))
+
+    failures = []
+    if len(created) != threads or len(set(created)) != threads:
+        failures.append(f"create_user: {len(created)} ids for {threads} usernames")
+    if count(database, "SELECT COUNT(*) FROM users") != threads:
+        failures.append("users: duplicate rows")
+    for name, results in (("save_student_profile", saved_profiles),
+                          ("save_ai_exercises_cache", saved_cache),
+                          ("save_portfolio_data", saved_portfolios)):
+        if not all(results):
+            failures.append(f"{name}: {results.count(False)} failed calls")
+    if count(database, "SELECT COUNT(*) FROM student_profiles WHERE user_id = ?", (owner,)) != 1:
+        failures.append("student_profiles: expected one row")
+    if count(database, "SELECT COUNT(*) FROM ai_exercises_cache") != 1:
+        failures.append("ai_exercises_cache: expected one row")
+    if count(database, "SELECT COUNT(*) FROM portfolio_data WHERE user_id = ?", (owner,)) != 1:
+        failures.append("portfolio_data: expected one row")
+    if count(database, "SELECT COUNT(*) FROM skill_exercises WHERE user_id = ?", (owner,)) != 3:
+        failures.append("skill_exercises: expected the three initial exercises")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Every key has exactly one row")
+
+if __name__ == "__main__":
+    main()
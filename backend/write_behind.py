@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+
+# Group commit for small writes: queued writes are applied by one background
+# thread in a single transaction every WRITE_BEHIND_INTERVAL_MS, or sooner
+# once WRITE_BEHIND_MAX_ROWS are waiting. Off by default: a fire-and-forget
+# write still in the queue is lost if the process dies
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', '0').lower() in ('1', 'true', 'yes')
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv('WRITE_BEHIND_INTERVAL_MS', '50'))
+WRITE_BEHIND_MAX_ROWS = int(os.getenv('WRITE_BEHIND_MAX_ROWS', '200'))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', '10000'))
+WRITE_BEHIND_WAIT_TIMEOUT = float(os.getenv('WRITE_BEHIND_WAIT_TIMEOUT', '10'))  # seconds
+
+class _PendingWrite:
+    __slots__ = ('op', 'args', 'done', 'result', 'error')
+
+    def __init__(self, op, args, wait):
+        self.op = op
+        self.args = args
+        self.done = threading.Event() if wait else None
+        self.result = None
+        self.error = None
+
+class WriteBehindBuffer:
+    """Batches op(cursor, *args) calls into one transaction per flush.
+
+    submit(wait=False) returns at once; the write lands within one flush
+    interval. submit(wait=True) blocks until the batch holding the write has
+    committed and returns op's result, so callers that need confirmation
+    still share the commit (group commit). Each write runs under its own
+    SAVEPOINT: a failing write is rolled back alone and the rest of the
+    batch commits.
+    """
+
+    def __init__(self, connect, interval=WRITE_BEHIND_INTERVAL_MS / 1000, max_batch=WRITE_BEHIND_MAX_ROWS,
+                 max_pending=WRITE_BEHIND_MAX_PENDING):
+        self.connect = connect
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._pending = []
+        self._waiters = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._stats = {'submitted': 0, 'written': 0, 'failed': 0, 'batches': 0,
+                       'largest_batch': 0, 'direct': 0}
+
+    def submit(self, op, *args, wait=False, timeout=WRITE_BEHIND_WAIT_TIMEOUT):
+        with self._cond:
+            if self._closed or len(self._pending) >= self.max_pending:
+                direct = True
+            else:
+                direct = False
+                item = _PendingWrite(op, args, wait)
+                self._pending.append(item)
+                self._waiters += wait
+                self._stats['submitted'] += 1
+                self._ensure_thread()
+                # Wake the flusher to open a batch window, or to cut it short
+                if wait or len(self._pending) in (1, self.max_batch):
+                    self._cond.notify()
+
+        if direct:
+            # Shut down or backed up: write through on the caller's thread
+            self._stats['direct'] += 1
+            item = _PendingWrite(op, args, False)
+            self._write_batch([item])
+            if item.error:
+                raise item.error
+            return item.result
+
+        if not wait:
+            return None
+        if not item.done.wait(timeout):
+            raise TimeoutError("Write not committed in time")
+        if item.error:
+            raise item.error
+        return item.result
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # Give fire-and-forget writes one interval to gather; a waiting
+                # caller is flushed at once, together with whatever queued up
+                # during the previous commit
+                deadline = time.monotonic() + self.interval
+                while len(self._pending) < self.max_batch and not self._waiters and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._waiters -= sum(1 for item in batch if item.done)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        conn = self.connect()
+        try:
+            if not conn:
+                raise RuntimeError("No database connection")
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            for item in batch:
+                c.execute("SAVEPOINT write_behind_item")
+                try:
+                    item.result = item.op(c, *item.args)
+                    c.execute("RELEASE write_behind_item")
+                except Exception as e:
+                    c.execute("ROLLBACK TO write_behind_item")
+                    c.execute("RELEASE write_behind_item")
+                    item.error = e
+            conn.commit()
+        except Exception as e:
+            print(f"❌ Write-behind batch of {len(batch)} failed: {e}")
+            if conn:
+                conn.rollback()
+            for item in batch:
+                item.error = item.error or e
+        finally:
+            if conn:
+                conn.close()
+
+        failed = sum(1 for item in batch if item.error)
+        self._stats['batches'] += 1
+        self._stats['written'] += len(batch) - failed
+        self._stats['failed'] += failed
+        self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+        for item in batch:
+            if item.error and not item.done:
+                print(f"⚠️ Write-behind {item.op.__name__} failed: {item.error}")
+            if item.done:
+                item.done.set()
+
+    def close(self, timeout=WRITE_BEHIND_WAIT_TIMEOUT):
+        """Stop accepting buffered writes and flush what is queued"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def stats(self):
+        batches = self._stats['batches']
+        return {
+            **self._stats,
+            'pending': len(self._pending),
+            'avg_batch': round((self._stats['written'] + self._stats['failed']) / batches, 1) if batches else 0,
+            'interval_ms': self.interval * 1000,
+        }
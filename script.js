@@ -7,6 +7,7 @@ const OPENROUTER_API_URL = 'https://openrouter.ai/api/v1/chat/completions';
 let currentUser = JSON.parse(localStorage.getItem('currentUser')) || null;
 let userProfile = JSON.parse(localStorage.getItem('userProfile')) || null;
 let projectHistory = JSON.parse(localStorage.getItem('projectHistory')) || [];
+let projectHistoryCursor = null; // next page of /project-history, null when all loaded
 
 // DOM Elements
 const elements = {
@@ -42,9 +43,6 @@ const elements = {
 document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
     checkAuthStatus();
-    loadProjectHistory();
-    loadSkillExercises();
-    loadProjectChecklist();
 });
 
 // Initialize Event Listeners
@@ -137,7 +135,9 @@ async function handleLogin(e) {
             const data = await response.json();
             currentUser = {
                 id: data.user_id,
-                username: username
+                username: username,
+                accessToken: data.access_token,
+                refreshToken: data.refresh_token
             };
             localStorage.setItem('currentUser', JSON.stringify(currentUser));
             await fetchUserProfile();
@@ -189,13 +189,19 @@ async function handleStudentProfile(e) {
     };
     
     try {
-        const response = await fetch(`${API_BASE_URL}/save-profile`, {
+        const response = await apiFetch('/save-profile', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(profileData)
         });
         
         if (response.ok) {
+            // A changed skill level comes back in a fresh access token
+            const data = await response.json();
+            if (data.access_token) {
+                currentUser.accessToken = data.access_token;
+                localStorage.setItem('currentUser', JSON.stringify(currentUser));
+            }
             userProfile = profileData;
             localStorage.setItem('userProfile', JSON.stringify(userProfile));
             showDashboard();
@@ -209,18 +215,70 @@ async function handleStudentProfile(e) {
     }
 }
 
+// Session Management
+// Authenticated calls send the short-lived access token; on 401 the refresh
+// token is swapped once for a new pair and the request retried.
+let refreshInFlight = null;
+
+async function apiFetch(path, options = {}, retry = true) {
+    const headers = { ...(options.headers || {}) };
+    if (currentUser && currentUser.accessToken) {
+        headers['Authorization'] = `Bearer ${currentUser.accessToken}`;
+    }
+    
+    const response = await fetch(`${API_BASE_URL}${path}`, { ...options, headers });
+    if (response.status === 401 && retry && currentUser) {
+        if (await refreshSession()) {
+            return apiFetch(path, options, false);
+        }
+        clearSession();
+        showError('Session expired. Please log in again.');
+    }
+    return response;
+}
+
+function refreshSession() {
+    // Refresh tokens are single-use: concurrent 401s share one refresh
+    if (!refreshInFlight) {
+        refreshInFlight = doRefreshSession().finally(() => {
+            refreshInFlight = null;
+        });
+    }
+    return refreshInFlight;
+}
+
+async function doRefreshSession() {
+    if (!currentUser || !currentUser.refreshToken) return false;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refreshToken })
+        });
+        if (!response.ok) return false;
+        
+        const data = await response.json();
+        currentUser.accessToken = data.access_token;
+        currentUser.refreshToken = data.refresh_token;
+        localStorage.setItem('currentUser', JSON.stringify(currentUser));
+        return true;
+    } catch (error) {
+        console.error('Session refresh error:', error);
+        return false;
+    }
+}
+
 // Profile Management
 async function fetchUserProfile() {
     try {
-        const response = await fetch(`${API_BASE_URL}/get-profile/${currentUser.id}`);
-        if (response.ok) {
-            userProfile = await response.json();
-            localStorage.setItem('userProfile', JSON.stringify(userProfile));
-            showDashboard();
-            loadSkillExercises();
-            loadProjectHistory();
-            loadProjectChecklist();
-        } else {
+        // One request for profile, projects, exercises and checklist.
+        // cache: 'no-cache' makes the browser revalidate its copy with
+        // If-None-Match, so an unchanged dashboard comes back as an empty 304.
+        if (await loadDashboard()) {
+            showDashboard(false);
+        } else if (currentUser) {
+            // Still signed in (not an expired session): no profile yet
             showForm('student');
         }
     } catch (error) {
@@ -259,7 +317,7 @@ function showForm(formType) {
     }
 }
 
-function showDashboard() {
+function showDashboard(reload = true) {
     // Hide forms
     document.querySelectorAll('.form-container').forEach(el => {
         el.classList.remove('active');
@@ -273,9 +331,41 @@ function showDashboard() {
     updateUserInfo();
     
     // Load initial data
-    loadSkillExercises();
-    loadProjectHistory();
-    loadProjectChecklist();
+    if (reload) {
+        loadDashboard();
+    }
+}
+
+// Dashboard data: profile, first page of projects, exercises and checklist
+async function loadDashboard() {
+    if (!currentUser) return false;
+    
+    try {
+        const response = await apiFetch(`/dashboard/${currentUser.id}`, { cache: 'no-cache' });
+        if (!response.ok) return false;
+        
+        const data = await response.json();
+        userProfile = data.profile;
+        projectHistory = data.projects;
+        projectHistoryCursor = data.pagination.next_cursor;
+        localStorage.setItem('userProfile', JSON.stringify(userProfile));
+        localStorage.setItem('projectHistory', JSON.stringify(projectHistory));
+        
+        updateUserInfo();
+        displayProjectHistory(projectHistory);
+        displayProjectChecklist(data.checklist, data.score);
+        
+        if (data.exercises && data.exercises.length) {
+            displayDefaultSkills();
+            displaySkillExercises(data.exercises);
+        } else {
+            loadSkillExercises();
+        }
+        return true;
+    } catch (error) {
+        console.error('Error loading dashboard:', error);
+        return false;
+    }
 }
 
 function updateUserInfo() {
@@ -666,19 +756,13 @@ async function generateDocumentation() {
     showLoading('docsResult', 'Generating AI documentation...');
     
     try {
-        const response = await fetch(`${API_BASE_URL}/generate-documentation`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ project_details: projectDetails })
-        });
+        // Render tokens as they arrive, then the final document
+        const data = await streamFromAPI('/generate-documentation/stream',
+            { project_details: projectDetails },
+            (text) => showStreamingText('docsResult', 'Generating Documentation...', text));
         
-        if (response.ok) {
-            const data = await response.json();
-            displayDocumentation(data.documentation);
-            downloadDocumentation(data.documentation);
-        } else {
-            throw new Error('Failed to generate documentation');
-        }
+        displayDocumentation(data.documentation);
+        downloadDocumentation(data.documentation);
     } catch (error) {
         console.error('Error generating docs:', error);
         const fallbackDocs = generateFallbackDocs(projectDetails);
@@ -841,22 +925,11 @@ async function generateCodeSnippet() {
     showLoading('snippetResult', 'Generating AI code snippet...');
     
     try {
-        const response = await fetch(`${API_BASE_URL}/generate-code-snippet`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ 
-                language: language,
-                prompt: prompt,
-                complexity: complexity
-            })
-        });
+        const data = await streamFromAPI('/generate-code-snippet/stream',
+            { language: language, prompt: prompt, complexity: complexity },
+            (text) => showStreamingText('snippetResult', 'Generating Code Snippet...', text));
         
-        if (response.ok) {
-            const data = await response.json();
-            displayCodeSnippet(data);
-        } else {
-            throw new Error('Failed to generate code snippet');
-        }
+        displayCodeSnippet(data.snippet);
     } catch (error) {
         console.error('Error generating code:', error);
         displayCodeSnippet(getFallbackSnippet(prompt, language, complexity));
@@ -1017,6 +1090,77 @@ function copyGeneratedSnippet() {
     }
 }
 
+// Server-Sent Events helper: POSTs to a streaming endpoint, calls onDelta with
+// the accumulated text for every "delta" event and resolves with the "result" payload
+async function streamFromAPI(path, body, onDelta = null) {
+    const response = await apiFetch(path, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify(body)
+    });
+    
+    if (!response.ok || !response.body) {
+        throw new Error(`Stream request failed: ${response.status}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let result = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (!data) continue;
+            
+            const payload = JSON.parse(data);
+            if (event === 'delta') {
+                text += payload.text;
+                if (onDelta) onDelta(text);
+            } else if (event === 'result') {
+                result = payload;
+            } else if (event === 'error') {
+                console.warn('Stream error:', payload.message);
+            }
+        }
+    }
+    
+    if (!result) {
+        throw new Error('Stream ended without a result');
+    }
+    return result;
+}
+
+function showStreamingText(elementId, title, text) {
+    const element = document.getElementById(elementId);
+    if (!element) return;
+    
+    let pre = element.querySelector('pre.streaming-output');
+    if (!pre) {
+        element.innerHTML = `<h4>${title}</h4><div class="docs-content"><pre class="streaming-output"></pre></div>`;
+        pre = element.querySelector('pre.streaming-output');
+    }
+    pre.textContent = text;
+}
+
 // OpenRouter API Helper
 async function fetchOpenRouterResponse(prompt, jsonResponse = false) {
     if (!OPENROUTER_API_KEY) {
@@ -1074,7 +1218,7 @@ async function loadSkillExercises() {
     displayDefaultSkills();
     
     try {
-        const response = await fetch(`${API_BASE_URL}/get-skill-exercises`, {
+        const response = await apiFetch('/get-skill-exercises', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ 
@@ -1299,7 +1443,7 @@ async function completeExercise(exerciseType) {
     if (!currentUser) return;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/complete-exercise/${currentUser.id}/${exerciseType}`, {
+        const response = await apiFetch(`/complete-exercise/${currentUser.id}/${exerciseType}`, {
             method: 'POST'
         });
         
@@ -1603,22 +1747,35 @@ function copyVCCommands() {
 }
 
 // Project History Functions
-async function loadProjectHistory() {
+async function loadProjectHistory(append = false) {
     if (!currentUser) return;
     
+    let url = `/project-history/${currentUser.id}?limit=20`;
+    if (append && projectHistoryCursor) {
+        url += `&cursor=${encodeURIComponent(projectHistoryCursor)}`;
+    }
+    
     try {
-        const response = await fetch(`${API_BASE_URL}/project-history/${currentUser.id}`);
+        const response = await apiFetch(url, { cache: 'no-cache' });
         if (response.ok) {
             const data = await response.json();
-            displayProjectHistory(data.projects);
-            projectHistory = data.projects;
-            localStorage.setItem('projectHistory', JSON.stringify(data.projects));
+            projectHistory = append ? projectHistory.concat(data.projects) : data.projects;
+            projectHistoryCursor = data.next_cursor;
+            displayProjectHistory(projectHistory);
+            // Only the first page is kept offline
+            if (!append) {
+                localStorage.setItem('projectHistory', JSON.stringify(data.projects));
+            }
         }
     } catch (error) {
         console.error('Error loading project history:', error);
     }
 }
 
+function loadMoreProjects() {
+    loadProjectHistory(true);
+}
+
 function displayProjectHistory(projects) {
     if (!elements.projectHistoryDiv) return;
     
@@ -1668,9 +1825,71 @@ function displayProjectHistory(projects) {
         `;
     });
     
+    if (projectHistoryCursor) {
+        html += `
+            <button class="btn-small" onclick="loadMoreProjects()">
+                <i class="fas fa-chevron-down"></i> Load More Projects
+            </button>
+        `;
+    }
+    
     elements.projectHistoryDiv.innerHTML = html;
 }
 
+// Project Checklist Functions
+async function loadProjectChecklist() {
+    if (!currentUser || !elements.projectChecklist) return;
+    
+    try {
+        const response = await apiFetch(`/project-checklist/${currentUser.id}`, { cache: 'no-cache' });
+        if (response.ok) {
+            const data = await response.json();
+            displayProjectChecklist(data.checklist, data.score);
+        }
+    } catch (error) {
+        console.error('Error loading checklist:', error);
+    }
+}
+
+function displayProjectChecklist(checklist, score) {
+    if (!elements.projectChecklist || !checklist) return;
+    
+    const labels = {
+        idea_defined: ['fa-lightbulb', 'Project idea defined'],
+        profile_complete: ['fa-user-check', 'Student profile complete'],
+        documentation_started: ['fa-file-alt', 'Documentation started'],
+        code_structured: ['fa-code', 'Code structured'],
+        testing_done: ['fa-vial', 'Testing done'],
+        deployment_ready: ['fa-rocket', 'Deployment ready']
+    };
+    
+    let html = `
+        <div class="score-header">
+            <span class="score-text">Readiness Score</span>
+            <span class="score-value">${score || 0}%</span>
+        </div>
+    `;
+    
+    Object.entries(checklist).forEach(([key, done]) => {
+        const [icon, label] = labels[key] || ['fa-check', key.replace(/_/g, ' ')];
+        html += `
+            <div class="checklist-item ${done ? 'completed' : ''}">
+                <div class="checklist-check">
+                    <input type="checkbox" id="check-${key}" ${done ? 'checked' : ''} disabled>
+                    <span class="checkmark"></span>
+                </div>
+                <div class="checklist-content">
+                    <i class="fas ${icon}"></i>
+                    <label for="check-${key}">${label}</label>
+                    ${done ? '<span class="check-status">✓</span>' : ''}
+                </div>
+            </div>
+        `;
+    });
+    
+    elements.projectChecklist.innerHTML = html;
+}
+
 function showProjectDetails(projectName) {
     alert(`Project: ${projectName}\nDetails feature coming soon!`);
 }
@@ -1709,7 +1928,7 @@ async function handleAddProject(e) {
     };
     
     try {
-        const response = await fetch(`${API_BASE_URL}/add-project-history`, {
+        const response = await apiFetch('/add-project-history', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(projectData)
@@ -1847,27 +2066,18 @@ async function generatePortfolio() {
         
         portfolioData.projects = selectedProjects;
         
-        // Generate portfolio using backend API
-        const response = await fetch(`${API_BASE_URL}/generate-portfolio`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(portfolioData)
-        });
+        // Generate portfolio using backend API (streamed)
+        const data = await streamFromAPI('/generate-portfolio/stream', portfolioData);
         
-        if (response.ok) {
-            const data = await response.json();
-            if (data.portfolio_html) {
-                // Open portfolio in new tab
-                const newTab = window.open();
-                newTab.document.write(data.portfolio_html);
-                newTab.document.close();
-                
-                // Also offer download
-                downloadPortfolioFile(data.portfolio_html, data.filename || 'portfolio.html');
-                showSuccess('Portfolio generated and opened in new tab!');
-            }
-        } else {
-            throw new Error('Failed to generate portfolio');
+        if (data.portfolio_html) {
+            // Open portfolio in new tab
+            const newTab = window.open();
+            newTab.document.write(data.portfolio_html);
+            newTab.document.close();
+            
+            // Also offer download
+            downloadPortfolioFile(data.portfolio_html, data.filename || 'portfolio.html');
+            showSuccess('Portfolio generated and opened in new tab!');
         }
     } catch (error) {
         console.error('Error generating portfolio:', error);
@@ -2581,6 +2791,19 @@ function checkAuthStatus() {
 }
 
 function handleLogout() {
+    if (currentUser && currentUser.refreshToken) {
+        // Best effort: revoke the tokens server-side
+        apiFetch('/logout', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refreshToken })
+        }, false).catch(error => console.error('Logout error:', error));
+    }
+    clearSession();
+    showSuccess('Logged out successfully!');
+}
+
+function clearSession() {
     currentUser = null;
     userProfile = null;
     projectHistory = [];
@@ -2588,7 +2811,6 @@ function handleLogout() {
     localStorage.removeItem('userProfile');
     localStorage.removeItem('projectHistory');
     showForm('login');
-    showSuccess('Logged out successfully!');
 }
 
 // Make functions globally available